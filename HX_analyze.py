@@ -1,10 +1,21 @@
 #!/usr/bin/env python3
 
+import collections
+import functools
+import threading
+
 import numpy as np
-import sympy as sp
-from sympy.solvers import solve
-from sympy import Symbol
-import yaml
+
+# sympy is only needed by the backend='sympy' solvers and is imported on first use
+
+try:
+    from . import HX_boundary_cond as bc
+    from . import HX_instrument as hxi
+    from . import HX_properties as hxp
+except ImportError:
+    import HX_boundary_cond as bc
+    import HX_instrument as hxi
+    import HX_properties as hxp
 
 
 def log_mean_temp_diff_counter(temp_hot_in,temp_hot_out,temp_cold_in,temp_cold_out):
@@ -56,6 +67,40 @@ def log_mean_temp_diff_parallel(temp_hot_in,temp_hot_out,temp_cold_in,temp_cold_
     return (del_t_1 - del_t_2)/np.log(del_t_1/del_t_2)
 
 
+def log_mean_temp_diff_array(temp_hot_in, temp_hot_out, temp_cold_in, temp_cold_out, hx_type = 'counter'):
+    """Computes the LMTD element by element. hx_type are parallel or counter.
+    
+    Array counterpart of log_mean_temp_diff_counter and log_mean_temp_diff_parallel. 
+    Equal end temperature differences give their common value, and instead of 
+    raising, non-physical elements are flagged.
+    
+    Args:
+        temp_hot_in (int, float, numpy.ndarray): Hot side inlet temeprature.
+        temp_hot_out (int, float, numpy.ndarray): Hot side outlet temeprature.
+        temp_cold_in (int, float, numpy.ndarray): Cold side inlet temeprature.
+        temp_cold_out (int, float, numpy.ndarray): Cold side outlet temeprature.
+        hx_type (str): parallel or counter.
+        
+    Returns:
+        numpy.ndarray (x2): The LMTD values (NaN where invalid) and the boolean error mask.
+    """
+    
+    temp_hot_in, temp_hot_out, temp_cold_in, temp_cold_out = np.broadcast_arrays(
+            *(np.asarray(t, dtype=np.float64) for t in (temp_hot_in, temp_hot_out, temp_cold_in, temp_cold_out)))
+    if hx_type == 'counter':
+        del_t_1, del_t_2 = temp_hot_in - temp_cold_out, temp_hot_out - temp_cold_in
+    elif hx_type == 'parallel':
+        del_t_1, del_t_2 = temp_hot_in - temp_cold_in, temp_hot_out - temp_cold_out
+    else:
+        raise ValueError("An invalid HX type was given.")
+    invalid = ((del_t_1 <= 0) | (del_t_2 <= 0) | (temp_hot_in < temp_hot_out) | (temp_cold_in > temp_cold_out)
+               | ~np.isfinite(del_t_1) | ~np.isfinite(del_t_2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        equal = del_t_1 == del_t_2
+        lmtd = np.where(equal, del_t_1, (del_t_1 - del_t_2)/np.log(del_t_1/np.where(equal, 1, del_t_2)))
+    return np.where(invalid, np.nan, lmtd), invalid
+
+@hxi.stage("q_lmtd_counter")
 def q_lmtd_counter(temp_hot_in,temp_hot_out,temp_cold_in,temp_cold_out, name):
     """ Computes the heat rate for a counter-current Heat Exchanger (HX) 
     
@@ -66,14 +111,13 @@ def q_lmtd_counter(temp_hot_in,temp_hot_out,temp_cold_in,temp_cold_out, name):
         temp_hot_out (int, float): Hot side outelet temeprature.
         temp_cold_in (int, float): Cold side inlet temeprature.
         temp_cold_out (int, float): Cold side outelet temeprature.
-        name (str): This is the name of the input file
+        name (str, HXInputs): This is the name of the input file, or preloaded inputs
         
     Returns:
         int, float: The value of the heat removed be the HX 
     """
     
-    with open(name, 'r') as f:
-        inputs = yaml.safe_load(f)
+    inputs = bc.resolve_inputs(name)
     
     h_cold = inputs["h_cold"]
     area_cold = inputs["area_cold"]
@@ -95,6 +139,7 @@ def q_lmtd_counter(temp_hot_in,temp_hot_out,temp_cold_in,temp_cold_out, name):
         return q_lmtd_counter
 
 
+@hxi.stage("q_lmtd_parallel")
 def q_lmtd_parallel(temp_hot_in,temp_hot_out,temp_cold_in,temp_cold_out, name):
     """ Computes the heat rate LMTD for a parallel Heat Exchanger (HX) 
     
@@ -106,14 +151,13 @@ def q_lmtd_parallel(temp_hot_in,temp_hot_out,temp_cold_in,temp_cold_out, name):
         temp_hot_out (int, float): Hot side outelet temeprature.
         temp_cold_in (int, float): Cold side inlet temeprature.
         temp_cold_out (int, float): Cold side outelet temeprature.
-        name (str): This is the name of the input file
+        name (str, HXInputs): This is the name of the input file, or preloaded inputs
         
     Returns:
         int, float: The value of the heat removed be the HX 
     """
     
-    with open(name, 'r') as f:
-        inputs = yaml.safe_load(f)
+    inputs = bc.resolve_inputs(name)
     
     h_cold = inputs["h_cold"]
     area_cold = inputs["area_cold"]
@@ -233,20 +277,175 @@ def q_ntu(epsilon, c_min, temp_hot_in, temp_cold_in):
     
     return epsilon*c_min*(temp_hot_in-temp_cold_in)
 
+C_R_UNITY_TOL = 1e-9
+
+
+def c_min_array(mass_flow_rate_hot, spec_heat_hot, mass_flow_rate_cold, spec_heat_cold):
+    """Computes the minimum C value for NTU calculations element by element
+    
+    Array counterpart of c_min. Instead of raising, invalid elements are flagged.
+    
+    Args:
+        mass_flow_rate_hot (int, float, numpy.ndarray): Hot side mass flow rate.
+        spec_heat_hot (int, float, numpy.ndarray): Hot side fluid specific heat.
+        mass_flow_rate_cold (int, float, numpy.ndarray): Cold side mass_flow_rate_cold.
+        spec_heat_cold (int, float, numpy.ndarray): Cold side fluid specific heat.
+        
+    Returns:
+        numpy.ndarray (x2): The minimum c values (NaN where invalid) and the boolean error mask.
+    """
+    
+    c_hot, c_cold, invalid = _c_hot_cold(mass_flow_rate_hot, spec_heat_hot, mass_flow_rate_cold, spec_heat_cold)
+    return np.where(invalid, np.nan, np.minimum(c_hot, c_cold)), invalid
+
+def c_max_array(mass_flow_rate_hot, spec_heat_hot, mass_flow_rate_cold, spec_heat_cold):
+    """Computes the maximum C value for NTU calculations element by element
+    
+    Array counterpart of c_max. Instead of raising, invalid elements are flagged.
+    
+    Args:
+        mass_flow_rate_hot (int, float, numpy.ndarray): Hot side mass flow rate.
+        spec_heat_hot (int, float, numpy.ndarray): Hot side fluid specific heat.
+        mass_flow_rate_cold (int, float, numpy.ndarray): Cold side mass_flow_rate_cold.
+        spec_heat_cold (int, float, numpy.ndarray): Cold side fluid specific heat.
+        
+    Returns:
+        numpy.ndarray (x2): The maximum c values (NaN where invalid) and the boolean error mask.
+    """
+    
+    c_hot, c_cold, invalid = _c_hot_cold(mass_flow_rate_hot, spec_heat_hot, mass_flow_rate_cold, spec_heat_cold)
+    return np.where(invalid, np.nan, np.maximum(c_hot, c_cold)), invalid
+
+def _c_hot_cold(mass_flow_rate_hot, spec_heat_hot, mass_flow_rate_cold, spec_heat_cold):
+    c_hot = np.multiply(mass_flow_rate_hot, spec_heat_hot, dtype=np.float64)
+    c_cold = np.multiply(mass_flow_rate_cold, spec_heat_cold, dtype=np.float64)
+    c_hot, c_cold = np.broadcast_arrays(c_hot, c_cold)
+    invalid = (c_hot == 0) | (c_cold == 0) | ~np.isfinite(c_hot) | ~np.isfinite(c_cold)
+    return c_hot, c_cold, invalid
+
+def q_max_ntu_array(c_min, temp_hot_in, temp_cold_in):
+    """Computes the maximum q value for the NTU method element by element
+
+    Args:
+        c_min (int, float, numpy.ndarray): minimum C value for NTU calculations.
+        temp_hot_in (int, float, numpy.ndarray): Hot side inlet temeprature.
+        temp_cold_in (int, float, numpy.ndarray): Cold side inlet temeprature.
+        
+    Returns:
+        numpy.ndarray (x2): The maximum q values and the boolean error mask of non-finite results.
+    """
+    
+    q_max = np.multiply(c_min, np.subtract(temp_hot_in, temp_cold_in, dtype=np.float64))
+    return q_max, ~np.isfinite(q_max)
+
+@hxi.stage("epsilon_ntu_array", points=lambda result: result[0].size)
+def epsilon_ntu_array(ntu, c_min, c_max, hx_type = 'parallel'):
+    """Computes the effectiveness for the NTU method element by element. hx_type are parallel, counter, or shell.
+    
+    Array counterpart of epsilon_ntu. For counter flow the C_r = 1 limit is evaluated 
+    on a mask (|1 - C_r| <= C_R_UNITY_TOL) and elements with C_r > 1 are flagged.
+    
+    Args:
+        ntu (int, float, numpy.ndarray): number of transfer units.
+        c_min (int, float, numpy.ndarray): minimum C value for NTU calculations.
+        c_max (int, float, numpy.ndarray): maximum C value for NTU calculations.
+        hx_type (str): the type of HX being analyzed. Options are parallel, counter, and shell. Other values yield an error
+
+    Returns:
+        numpy.ndarray (x2): The effectiveness values (NaN where invalid) and the boolean error mask.
+    """
+    
+    ntu, c_min, c_max = np.broadcast_arrays(np.asarray(ntu, dtype=np.float64), 
+                                            np.asarray(c_min, dtype=np.float64), 
+                                            np.asarray(c_max, dtype=np.float64))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        c_r = c_min/c_max
+        invalid = ~np.isfinite(c_r) | ~np.isfinite(ntu)
+        if hx_type == 'parallel':
+            epsilon = (1-np.exp(-ntu*(1+c_r)))/(1+c_r)
+        elif hx_type == 'counter':
+            unity = np.abs(1 - c_r) <= C_R_UNITY_TOL
+            invalid |= (c_r > 1) & ~unity
+            c_r_safe = np.where(unity | invalid, 0, c_r)
+            decay = np.exp(-ntu*(1-c_r_safe))
+            epsilon = np.where(unity, ntu/(1+ntu), (1-decay)/(1-c_r_safe*decay))
+        elif hx_type == 'shell':
+            root = (1+c_r**2)**.5
+            decay = np.exp(-ntu*root)
+            epsilon = 2*(1+c_r+root*((1+decay)/(1-decay)))**-1
+        else:
+            raise ValueError("An invalid HX type was given.")
+    invalid |= ~np.isfinite(epsilon)
+    return np.where(invalid, np.nan, epsilon), invalid
+
+@hxi.stage("ntu_from_epsilon", points=lambda result: result[0].size)
+def ntu_from_epsilon(epsilon, c_min, c_max, hx_type = 'parallel'):
+    """Computes the NTU that gives an effectiveness, element by element. hx_type are parallel, counter, or shell.
+    
+    Explicit inverse of epsilon_ntu_array, from the closed form of each relation. 
+    Effectivenesses at or above the limit of infinite NTU are flagged.
+    
+    Args:
+        epsilon (int, float, numpy.ndarray): The value of the effectivness for the HX.
+        c_min (int, float, numpy.ndarray): minimum C value for NTU calculations.
+        c_max (int, float, numpy.ndarray): maximum C value for NTU calculations.
+        hx_type (str): the type of HX being analyzed. Options are parallel, counter, and shell.
+
+    Returns:
+        numpy.ndarray (x2): The NTU values (NaN where invalid) and the boolean error mask.
+    """
+    
+    epsilon, c_min, c_max = np.broadcast_arrays(np.asarray(epsilon, dtype=np.float64), 
+                                                np.asarray(c_min, dtype=np.float64), 
+                                                np.asarray(c_max, dtype=np.float64))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        c_r = c_min/c_max
+        invalid = ~np.isfinite(c_r) | ~np.isfinite(epsilon) | (epsilon < 0) | (c_r < 0)
+        if hx_type == 'parallel':
+            ntu = -np.log1p(-epsilon*(1+c_r))/(1+c_r)
+        elif hx_type == 'counter':
+            unity = np.abs(1 - c_r) <= C_R_UNITY_TOL
+            invalid |= (c_r > 1) & ~unity
+            c_r_safe = np.where(unity | invalid, 0, c_r)
+            ntu = np.where(unity, epsilon/(1-epsilon), np.log((1-epsilon*c_r_safe)/(1-epsilon))/(1-c_r_safe))
+        elif hx_type == 'shell':
+            root = (1+c_r**2)**.5
+            e = (2/epsilon - (1+c_r))/root
+            ntu = np.log((e+1)/(e-1))/root
+        else:
+            raise ValueError("An invalid HX type was given.")
+    invalid |= ~np.isfinite(ntu) | (ntu < 0)
+    return np.where(invalid, np.nan, ntu), invalid
+
+def q_ntu_array(epsilon, c_min, temp_hot_in, temp_cold_in):
+    """Computes the q value for the NTU method element by element
+    
+    Args:
+        epsilon (int, float, numpy.ndarray): The value of the effectivness for the HX.
+        c_min (int, float, numpy.ndarray): minimum C value for NTU calculations.
+        temp_hot_in (int, float, numpy.ndarray): Hot side inlet temeprature.
+        temp_cold_in (int, float, numpy.ndarray): Cold side inlet temeprature.
+
+    Returns:
+        numpy.ndarray (x2): The q values and the boolean error mask of non-finite results.
+    """
+    
+    q = np.multiply(epsilon, c_min, dtype=np.float64)*np.subtract(temp_hot_in, temp_cold_in, dtype=np.float64)
+    return q, ~np.isfinite(q)
+
+@hxi.stage("q_fin", points=lambda result: len(result[0]))
 def q_fin(temp_lmtd,name):
     """Computes the q value for a finned HX using the LMTD method
     
     Args:
         temp_lmtd (int, float): The value of the log mean temperature difference.
-        name (str): name of the input file.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
 
     Returns:
         int, float: The value of the removal for a finned HX.
     """
     
-#    inputs = bcs.read_bc(name)
-    with open(name, 'r') as f:
-        inputs = yaml.safe_load(f)
+    inputs = bc.resolve_inputs(name)
     
     h_cold = inputs["h_cold"]
     area_cold = inputs["area_cold"]
@@ -280,26 +479,25 @@ def q_fin(temp_lmtd,name):
                     ua_inverted.append(1/(eta_not_cold[counter]*h_cold*(area_cold+num_fins[i]*fin_length[j]*fin_width[k])) + (wall_thickness/(wall_k*area_hot)) + 1/(eta_not_hot[counter]*h_hot*(area_hot+num_fins[i]*fin_length[j]*fin_width[k])))
                     ua.append(1/ua_inverted[counter])
                     q.append(ua[counter]*temp_lmtd)
-                    variables.append([num_fins[i], fin_length[j], fin_width[k], fin_thickness[k]])
+                    variables.append([num_fins[i], fin_length[j], fin_width[k], fin_thickness[l]])
                     counter += 1
 
 
     return q, variables
 
+@hxi.stage("q_tube", points=lambda result: len(result[0]))
 def q_tube(temp_lmtd,name):
     """Computes the q value for a tubed HX using the LMTD method
     
     Args:
         temp_lmtd (int, float): The value of the log mean temperature difference.
-        name (str): name of the input file.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
 
     Returns:
         int, float: The value of the removal for a tubular HX.
     """
     
-#    inputs = bcs.read_bc(name)
-    with open(name, 'r') as f:
-        inputs = yaml.safe_load(f)
+    inputs = bc.resolve_inputs(name)
     
     h_cold = inputs["h_cold"]
     area_cold = inputs["area_cold"]
@@ -328,123 +526,936 @@ def q_tube(temp_lmtd,name):
                     ua_inverted.append(1/(h_cold*(area_cold+num_tubes[i]*tube_length[j]*(tube_diameter[k]-2*tube_thickness[l])*np.pi)) + ((np.log(tube_diameter[k]/(tube_diameter[k]-2*tube_thickness[l]))/(2*np.pi*wall_k*tube_length[j]))) + 1/(h_hot*(area_hot+num_tubes[i]*tube_length[j]*tube_diameter[k]*np.pi)))
                     ua.append(1/ua_inverted[counter])
                     q.append(ua[counter]*temp_lmtd)
-                    variables.append([num_tubes[i], tube_length[j], tube_diameter[k], tube_thickness[k]])
+                    variables.append([num_tubes[i], tube_length[j], tube_diameter[k], tube_thickness[l]])
                     counter += 1
 
 
     return q, variables
 
-def temp_ntu_solver(q, epsilon, c_min, temp_hot_in = 0, temp_cold_in = 0, temp_type = 'cold'):
+FIN_PARAM_DTYPE = np.dtype([("num_fins", np.int32), ("fin_length", np.float64),
+                            ("fin_width", np.float64), ("fin_thickness", np.float64)])
+
+TUBE_PARAM_DTYPE = np.dtype([("num_tubes", np.int32), ("tube_length", np.float64),
+                             ("tube_outer_diameter", np.float64), ("tube_thickness", np.float64)])
+
+
+def grid_size(axes):
+    """Computes the number of designs in the Cartesian product of the design lists
+    
+    Args:
+        axes (list): One list of values per design parameter.
+
+    Returns:
+        int: The number of designs.
+    """
+    
+    return int(np.prod([len(axis) for axis in axes], dtype=np.int64))
+
+def product_params(axes, dtype, start=0, stop=None):
+    """Builds the Cartesian product of the design lists as a structured array
+    
+    The ordering matches the nested loops of q_fin and q_tube, i.e. the last 
+    field varies fastest. A slice [start, stop) of the flat design index can be 
+    requested so large grids can be built piece by piece.
+    
+    Args:
+        axes (list): One list of values per field of dtype, in field order.
+        dtype (numpy.dtype): Structured dtype of the parameter records.
+        start (int): First flat design index.
+        stop (int): One past the last flat design index. Defaults to the grid size.
+
+    Returns:
+        numpy.ndarray: Contiguous structured array with one record per design.
+    """
+    
+    return params_at(axes, dtype, grid_index(axes, start, stop))
+
+def params_at(axes, dtype, index):
+    """Builds the designs at given positions of the design lists as a structured array
+    
+    Args:
+        axes (list): One list of values per field of dtype, in field order.
+        dtype (numpy.dtype): Structured dtype of the parameter records.
+        index (tuple): numpy.ndarray of positions into each design list, e.g. from grid_index.
+
+    Returns:
+        numpy.ndarray: Contiguous structured array with one record per design.
+    """
+    
+    params = np.empty(len(index[0]), dtype=dtype)
+    for field, axis, coord in zip(dtype.names, axes, index):
+        params[field] = np.asarray(axis, dtype=np.float64)[coord]
+    return params
+
+def grid_index(axes, start=0, stop=None):
+    """Converts the flat design indices [start, stop) into one index array per design list
+    
+    Args:
+        axes (list): One list of values per design parameter.
+        start (int): First flat design index.
+        stop (int): One past the last flat design index. Defaults to the grid size.
+
+    Returns:
+        tuple: numpy.ndarray of positions into each design list.
+    """
+    
+    if stop is None:
+        stop = grid_size(axes)
+    return np.unravel_index(np.arange(start, stop, dtype=np.int64), tuple(len(axis) for axis in axes))
+
+def _check_count_axis(axis, dtype):
+    """Raises ValueError unless the design counts are whole numbers that fit the count field of dtype"""
+    
+    field = dtype.names[0]
+    info = np.iinfo(dtype[field])
+    values = np.asarray(axis, dtype=np.float64)
+    if not np.all((values == np.floor(values)) & (values >= info.min) & (values <= info.max)):
+        raise ValueError("Input " + field + " must be a list of whole numbers between " +
+                         str(info.min) + " and " + str(info.max))
+    return axis
+
+def fin_design_axes(inputs):
+    """Returns the finned HX design lists in FIN_PARAM_DTYPE field order
+    
+    A num_fins value that is not a whole number within the range of FIN_PARAM_DTYPE raises ValueError.
+    
+    Args:
+        inputs (HXInputs): The input values read from the input file.
+
+    Returns:
+        list: The num_fins, fin_length, fin_width and fin_thickness lists.
+    """
+    
+    return [_check_count_axis(inputs["num_fins"], FIN_PARAM_DTYPE), inputs["fin_length"], inputs["fin_width"],
+            inputs["fin_thickness"]]
+
+def tube_design_axes(inputs):
+    """Returns the tubed HX design lists in TUBE_PARAM_DTYPE field order
+    
+    A num_tubes value that is not a whole number within the range of TUBE_PARAM_DTYPE raises ValueError.
+    
+    Args:
+        inputs (HXInputs): The input values read from the input file.
+
+    Returns:
+        list: The num_tubes, tube_length, tube_outer_diameter and tube_thickness lists.
+    """
+    
+    return [_check_count_axis(inputs["num_tubes"], TUBE_PARAM_DTYPE), inputs["tube_length"],
+            inputs["tube_outer_diameter"], inputs["tube_thickness"]]
+
+@hxi.stage("fin_ua", points=lambda result: np.size(result[0]))
+def fin_ua(num_fins, fin_length, fin_width, fin_thickness, h_cold, area_cold, h_hot, area_hot, wall_k, wall_thickness):
+    """Computes the UA value and overall fin efficiencies of a finned HX
+    
+    All geometric arguments may be arrays and are broadcast against each other.
+    
+    Args:
+        num_fins (int, float, numpy.ndarray): Number of fins.
+        fin_length (float, numpy.ndarray): Fin length.
+        fin_width (float, numpy.ndarray): Fin width.
+        fin_thickness (float, numpy.ndarray): Fin thickness.
+        h_cold (int, float): Cold side heat transfer coefficient.
+        area_cold (int, float): Cold side area.
+        h_hot (int, float): Hot side heat transfer coefficient.
+        area_hot (int, float): Hot side area.
+        wall_k (int, float): Wall thermal conductivity.
+        wall_thickness (int, float): Wall thickness.
+
+    Returns:
+        numpy.ndarray (x3): The UA value and the cold and hot side overall fin efficiencies.
+    """
+    
+    fin_area = num_fins*fin_length*fin_width
+    m_cold = np.sqrt(h_cold*(2*fin_thickness + 2*fin_width)/(wall_k*fin_thickness*fin_width))
+    m_hot = np.sqrt(h_hot*(2*fin_thickness + 2*fin_width)/(wall_k*fin_thickness*fin_width))
+    eta_not_cold = 1-(fin_area*(1-np.tanh(m_cold*(fin_length/2))/(m_cold*fin_length/2)))/area_cold
+    eta_not_hot = 1-(fin_area*(1-np.tanh(m_hot*(fin_length/2))/(m_hot*fin_length/2)))/area_hot
+    ua_inverted = 1/(eta_not_cold*h_cold*(area_cold+fin_area)) + (wall_thickness/(wall_k*area_hot)) + 1/(eta_not_hot*h_hot*(area_hot+fin_area))
+    return 1/ua_inverted, eta_not_cold, eta_not_hot
+
+@hxi.stage("tube_ua", points=np.size)
+def tube_ua(num_tubes, tube_length, tube_diameter, tube_thickness, h_cold, area_cold, h_hot, area_hot, wall_k):
+    """Computes the UA value of a tubed HX
+    
+    All geometric arguments may be arrays and are broadcast against each other.
+    
+    Args:
+        num_tubes (int, float, numpy.ndarray): Number of tubes.
+        tube_length (float, numpy.ndarray): Tube length.
+        tube_diameter (float, numpy.ndarray): Tube outer diameter.
+        tube_thickness (float, numpy.ndarray): Tube wall thickness.
+        h_cold (int, float): Cold side heat transfer coefficient.
+        area_cold (int, float): Cold side area.
+        h_hot (int, float): Hot side heat transfer coefficient.
+        area_hot (int, float): Hot side area.
+        wall_k (int, float): Wall thermal conductivity.
+
+    Returns:
+        numpy.ndarray: The UA value.
+    """
+    
+    ua_inverted = (1/(h_cold*(area_cold+num_tubes*tube_length*(tube_diameter-2*tube_thickness)*np.pi)) 
+                   + ((np.log(tube_diameter/(tube_diameter-2*tube_thickness))/(2*np.pi*wall_k*tube_length))) 
+                   + 1/(h_hot*(area_hot+num_tubes*tube_length*tube_diameter*np.pi)))
+    return 1/ua_inverted
+
+def fin_ua_params(params, inputs):
+    """Evaluates fin_ua for a structured array of FIN_PARAM_DTYPE designs
+    
+    Args:
+        params (numpy.ndarray): Structured array of finned HX designs.
+        inputs (HXInputs): The input values read from the input file.
+
+    Returns:
+        numpy.ndarray (x3): The UA value and the cold and hot side overall fin efficiencies.
+    """
+    
+    return fin_ua(params["num_fins"].astype(np.float64), params["fin_length"], params["fin_width"], 
+                  params["fin_thickness"], inputs["h_cold"], inputs["area_cold"], inputs["h_hot"], 
+                  inputs["area_hot"], inputs["wall_k"], inputs["wall_thickness"])
+
+def tube_ua_params(params, inputs):
+    """Evaluates tube_ua for a structured array of TUBE_PARAM_DTYPE designs
+    
+    Args:
+        params (numpy.ndarray): Structured array of tubed HX designs.
+        inputs (HXInputs): The input values read from the input file.
+
+    Returns:
+        numpy.ndarray: The UA value.
+    """
+    
+    return tube_ua(params["num_tubes"].astype(np.float64), params["tube_length"], 
+                   params["tube_outer_diameter"], params["tube_thickness"], 
+                   inputs["h_cold"], inputs["area_cold"], inputs["h_hot"], inputs["area_hot"], inputs["wall_k"])
+
+FIN_SENSITIVITY_KEYS = ("num_fins", "fin_length", "fin_width", "fin_thickness", "h_cold", "h_hot", "wall_k")
+
+TUBE_SENSITIVITY_KEYS = ("num_tubes", "tube_length", "tube_outer_diameter", "tube_thickness", 
+                         "h_cold", "h_hot", "wall_k")
+
+
+def _fin_efficiency(m, fin_length):
+    """Returns tanh(u)/u with u = m*L/2, and its derivative with respect to u"""
+    
+    u = m*fin_length/2
+    small = np.abs(u) < 1e-4
+    u_safe = np.where(small, 1, u)
+    tanh = np.tanh(u_safe)
+    eta = np.where(small, 1 - u**2/3, tanh/u_safe)
+    d_eta = np.where(small, -2*u/3, (1 - tanh**2)/u_safe - tanh/u_safe**2)
+    return eta, d_eta
+
+@hxi.stage("fin_ua_jacobian", points=lambda result: np.size(result[0]))
+def fin_ua_jacobian(num_fins, fin_length, fin_width, fin_thickness, h_cold, area_cold, h_hot, area_hot, wall_k, wall_thickness):
+    """Computes the UA value of a finned HX and its derivatives in one pass
+    
+    The derivatives are those of the expressions of fin_ua, taken by hand: with 
+    m = sqrt(h*(2t + 2w)/(k*t*w)) and u = m*L/2, the fin efficiency tanh(u)/u, 
+    the overall efficiencies, and the three series resistances are differentiated 
+    and combined with dUA = -UA**2 dR. All arguments may be arrays.
+    
+    Args:
+        See fin_ua.
+
+    Returns:
+        numpy.ndarray (x2): The UA value and the Jacobian, whose last axis holds 
+        dUA/dx for x in FIN_SENSITIVITY_KEYS.
+    """
+    
+    n, L, w, t = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (num_fins, fin_length, fin_width, fin_thickness)))
+    fin_area = n*L*w
+    d_fin_area = {"num_fins": L*w, "fin_length": n*w, "fin_width": n*L}
+    # d ln(m)/dx for m**2 = h*(2t + 2w)/(k*t*w), the same on both sides except for h
+    d_log_m = {"fin_width": (1/(t + w) - 1/w)/2, "fin_thickness": (1/(t + w) - 1/t)/2, "wall_k": -1/(2*wall_k)}
+    
+    ua_inverted = wall_thickness/(wall_k*area_hot)
+    d_ua_inverted = {key: 0 for key in FIN_SENSITIVITY_KEYS}
+    d_ua_inverted["wall_k"] = -ua_inverted/wall_k
+    for h, area, h_key in ((h_cold, area_cold, "h_cold"), (h_hot, area_hot, "h_hot")):
+        m = np.sqrt(h*(2*t + 2*w)/(wall_k*t*w))
+        eta, d_eta = _fin_efficiency(m, L)
+        eta_not = 1 - fin_area*(1 - eta)/area
+        resistance = 1/(eta_not*h*(area + fin_area))
+        ua_inverted = ua_inverted + resistance
+        d_log_side = dict(d_log_m, **{h_key: 1/(2*h)})
+        for key in FIN_SENSITIVITY_KEYS:
+            d_area = d_fin_area.get(key, 0)
+            d_u = (m/2 if key == "fin_length" else 0) + m*L/2*d_log_side.get(key, 0)
+            d_eta_not = (fin_area*d_eta*d_u - (1 - eta)*d_area)/area
+            d_log_r = d_eta_not/eta_not + d_area/(area + fin_area) + (1/h if key == h_key else 0)
+            d_ua_inverted[key] = d_ua_inverted[key] - resistance*d_log_r
+    
+    ua = 1/ua_inverted
+    jacobian = np.stack([np.broadcast_to(-ua**2*d_ua_inverted[key], ua.shape) for key in FIN_SENSITIVITY_KEYS], axis=-1)
+    return ua, jacobian
+
+@hxi.stage("tube_ua_jacobian", points=lambda result: np.size(result[0]))
+def tube_ua_jacobian(num_tubes, tube_length, tube_diameter, tube_thickness, h_cold, area_cold, h_hot, area_hot, wall_k):
+    """Computes the UA value of a tubed HX and its derivatives in one pass
+    
+    The derivatives are those of the expressions of tube_ua, taken by hand from 
+    its two film resistances and the log wall resistance. All arguments may be arrays.
+    
+    Args:
+        See tube_ua.
+
+    Returns:
+        numpy.ndarray (x2): The UA value and the Jacobian, whose last axis holds 
+        dUA/dx for x in TUBE_SENSITIVITY_KEYS.
+    """
+    
+    n, L, d, t = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (num_tubes, tube_length, tube_diameter, tube_thickness)))
+    inner = d - 2*t
+    surface_cold = area_cold + n*L*inner*np.pi
+    surface_hot = area_hot + n*L*d*np.pi
+    r_cold = 1/(h_cold*surface_cold)
+    r_hot = 1/(h_hot*surface_hot)
+    r_wall = np.log(d/inner)/(2*np.pi*wall_k*L)
+    
+    d_ua_inverted = {
+        "num_tubes": -r_cold*L*inner*np.pi/surface_cold - r_hot*L*d*np.pi/surface_hot,
+        "tube_length": -r_cold*n*inner*np.pi/surface_cold - r_wall/L - r_hot*n*d*np.pi/surface_hot,
+        "tube_outer_diameter": (-r_cold*n*L*np.pi/surface_cold + (1/d - 1/inner)/(2*np.pi*wall_k*L) 
+                                - r_hot*n*L*np.pi/surface_hot),
+        "tube_thickness": 2*r_cold*n*L*np.pi/surface_cold + 2/inner/(2*np.pi*wall_k*L),
+        "h_cold": -r_cold/h_cold,
+        "h_hot": -r_hot/h_hot,
+        "wall_k": -r_wall/wall_k,
+    }
+    ua = 1/(r_cold + r_wall + r_hot)
+    jacobian = np.stack([np.broadcast_to(-ua**2*d_ua_inverted[key], ua.shape) for key in TUBE_SENSITIVITY_KEYS], axis=-1)
+    return ua, jacobian
+
+def fin_ua_jacobian_params(params, inputs):
+    """Evaluates fin_ua_jacobian for a structured array of FIN_PARAM_DTYPE designs"""
+    
+    return fin_ua_jacobian(params["num_fins"].astype(np.float64), params["fin_length"], params["fin_width"], 
+                           params["fin_thickness"], inputs["h_cold"], inputs["area_cold"], inputs["h_hot"], 
+                           inputs["area_hot"], inputs["wall_k"], inputs["wall_thickness"])
+
+def tube_ua_jacobian_params(params, inputs):
+    """Evaluates tube_ua_jacobian for a structured array of TUBE_PARAM_DTYPE designs"""
+    
+    return tube_ua_jacobian(params["num_tubes"].astype(np.float64), params["tube_length"], 
+                            params["tube_outer_diameter"], params["tube_thickness"], 
+                            inputs["h_cold"], inputs["area_cold"], inputs["h_hot"], inputs["area_hot"], inputs["wall_k"])
+
+KERNEL_CACHE_SIZE = 64
+
+
+@functools.lru_cache(maxsize=KERNEL_CACHE_SIZE)
+@hxi.stage("fin_factor_table", points=np.size)
+def fin_factor_table(h, wall_k, fin_length, fin_width, fin_thickness):
+    """Tabulates the fin term 1 - tanh(mL/2)/(mL/2) once per unique fin geometry
+    
+    The term depends on h, k and the fin length, width and thickness only, so it 
+    is computed on the (length, width, thickness) grid and reused for every 
+    num_fins value. Results are kept in a bounded cache, so counter and parallel 
+    flow runs of the same deck share them.
+    
+    Args:
+        h (int, float): Heat transfer coefficient of the side.
+        wall_k (int, float): Wall thermal conductivity.
+        fin_length (tuple): Fin lengths.
+        fin_width (tuple): Fin widths.
+        fin_thickness (tuple): Fin thicknesses.
+
+    Returns:
+        numpy.ndarray: Read-only table of shape (length, width, thickness).
+    """
+    
+    length = np.asarray(fin_length, dtype=np.float64)[:, None, None]
+    width = np.asarray(fin_width, dtype=np.float64)[None, :, None]
+    thickness = np.asarray(fin_thickness, dtype=np.float64)[None, None, :]
+    m = np.sqrt(h*(2*thickness + 2*width)/(wall_k*thickness*width))
+    table = 1-np.tanh(m*(length/2))/(m*length/2)
+    table.flags.writeable = False
+    return table
+
+@functools.lru_cache(maxsize=KERNEL_CACHE_SIZE)
+@hxi.stage("wall_resistance_table", points=np.size)
+def wall_resistance_table(wall_k, tube_length, tube_diameter, tube_thickness):
+    """Tabulates the tube wall resistance log(D_o/D_i)/(2 pi k L) once per unique tube geometry
+    
+    Args:
+        wall_k (int, float): Wall thermal conductivity.
+        tube_length (tuple): Tube lengths.
+        tube_diameter (tuple): Tube outer diameters.
+        tube_thickness (tuple): Tube wall thicknesses.
+
+    Returns:
+        numpy.ndarray: Read-only table of shape (length, diameter, thickness).
+    """
+    
+    length = np.asarray(tube_length, dtype=np.float64)[:, None, None]
+    diameter = np.asarray(tube_diameter, dtype=np.float64)[None, :, None]
+    thickness = np.asarray(tube_thickness, dtype=np.float64)[None, None, :]
+    table = np.log(diameter/(diameter-2*thickness))/(2*np.pi*wall_k*length)
+    table.flags.writeable = False
+    return table
+
+def clear_kernel_cache():
+    """Empties the caches of the fin and tube wall tables and of the UA grids built from them"""
+    
+    fin_factor_table.cache_clear()
+    wall_resistance_table.cache_clear()
+    clear_ua_cache()
+
+@hxi.stage("fin_ua_grid", points=lambda result: len(result[0]))
+def fin_ua_grid(inputs, start=0, stop=None):
+    """Evaluates the designs [start, stop) of the deck's fin grid using cached fin tables
+    
+    Args:
+        inputs (HXInputs): The input values read from the input file.
+        start (int): First flat design index.
+        stop (int): One past the last flat design index. Defaults to the grid size.
+
+    Returns:
+        numpy.ndarray (x4): The structured FIN_PARAM_DTYPE designs, the UA value, and 
+        the cold and hot side overall fin efficiencies.
+    """
+    
+    axes = fin_design_axes(inputs)
+    index = grid_index(axes, start, stop)
+    params = params_at(axes, FIN_PARAM_DTYPE, index)
+    
+    h_cold, area_cold = inputs["h_cold"], inputs["area_cold"]
+    h_hot, area_hot = inputs["h_hot"], inputs["area_hot"]
+    wall_k, wall_thickness = inputs["wall_k"], inputs["wall_thickness"]
+    geometry = tuple(tuple(axis) for axis in axes[1:])
+    fin_cold = fin_factor_table(h_cold, wall_k, *geometry)[index[1:]]
+    fin_hot = fin_factor_table(h_hot, wall_k, *geometry)[index[1:]]
+    
+    fin_area = params["num_fins"].astype(np.float64)*params["fin_length"]*params["fin_width"]
+    eta_not_cold = 1-(fin_area*fin_cold)/area_cold
+    eta_not_hot = 1-(fin_area*fin_hot)/area_hot
+    ua_inverted = 1/(eta_not_cold*h_cold*(area_cold+fin_area)) + (wall_thickness/(wall_k*area_hot)) + 1/(eta_not_hot*h_hot*(area_hot+fin_area))
+    return params, 1/ua_inverted, eta_not_cold, eta_not_hot
+
+@hxi.stage("tube_ua_grid", points=lambda result: len(result[0]))
+def tube_ua_grid(inputs, start=0, stop=None):
+    """Evaluates the designs [start, stop) of the deck's tube grid using cached wall tables
+    
+    Args:
+        inputs (HXInputs): The input values read from the input file.
+        start (int): First flat design index.
+        stop (int): One past the last flat design index. Defaults to the grid size.
+
+    Returns:
+        numpy.ndarray (x2): The structured TUBE_PARAM_DTYPE designs and the UA value.
+    """
+    
+    axes = tube_design_axes(inputs)
+    index = grid_index(axes, start, stop)
+    params = params_at(axes, TUBE_PARAM_DTYPE, index)
+    
+    h_cold, area_cold = inputs["h_cold"], inputs["area_cold"]
+    h_hot, area_hot = inputs["h_hot"], inputs["area_hot"]
+    wall = wall_resistance_table(inputs["wall_k"], *(tuple(axis) for axis in axes[1:]))[index[1:]]
+    
+    num_tubes = params["num_tubes"].astype(np.float64)
+    tube_length = params["tube_length"]
+    tube_diameter = params["tube_outer_diameter"]
+    tube_thickness = params["tube_thickness"]
+    ua_inverted = (1/(h_cold*(area_cold+num_tubes*tube_length*(tube_diameter-2*tube_thickness)*np.pi)) 
+                   + wall 
+                   + 1/(h_hot*(area_hot+num_tubes*tube_length*tube_diameter*np.pi)))
+    return params, 1/ua_inverted
+
+FIN_UA_KEYS = ("h_cold", "area_cold", "h_hot", "area_hot", "wall_k", "wall_thickness",
+               "num_fins", "fin_length", "fin_width", "fin_thickness")
+
+TUBE_UA_KEYS = ("h_cold", "area_cold", "h_hot", "area_hot", "wall_k",
+                "num_tubes", "tube_length", "tube_outer_diameter", "tube_thickness")
+
+# Total bytes of the UA grids kept by each of the fin and tube caches. Grids are
+# evicted least recently used first; a grid larger than the bound is not kept.
+UA_CACHE_MAX_BYTES = 256*2**20
+
+CacheInfo = collections.namedtuple("CacheInfo", ["hits", "misses", "max_bytes", "bytes"])
+
+
+def _byte_lru(function):
+    """LRU cache of tuples of arrays bounded by their total size in bytes, like functools.lru_cache"""
+    
+    cache = collections.OrderedDict()
+    lock = threading.Lock()
+    stats = [0, 0, 0]
+    
+    @functools.wraps(function)
+    def wrapper(key):
+        with lock:
+            if key in cache:
+                cache.move_to_end(key)
+                stats[0] += 1
+                return cache[key]
+            stats[1] += 1
+        result = function(key)
+        size = sum(array.nbytes for array in result)
+        with lock:
+            if key not in cache and size <= wrapper.max_bytes:
+                cache[key] = result
+                stats[2] += size
+                while stats[2] > wrapper.max_bytes:
+                    stats[2] -= sum(array.nbytes for array in cache.popitem(last=False)[1])
+        return result
+    
+    def cache_info():
+        return CacheInfo(stats[0], stats[1], wrapper.max_bytes, stats[2])
+    
+    def cache_clear():
+        with lock:
+            cache.clear()
+            stats[:] = [0, 0, 0]
+    
+    wrapper.max_bytes = UA_CACHE_MAX_BYTES
+    wrapper.cache_info = cache_info
+    wrapper.cache_clear = cache_clear
+    return wrapper
+
+def _ua_key(inputs, keys):
+    values = (inputs[key] for key in keys)
+    return tuple(zip(keys, (tuple(v) if isinstance(v, (list, tuple)) else v for v in values)))
+
+@_byte_lru
+def _fin_ua_cached(key):
+    result = fin_ua_grid(dict(key))
+    for array in result:
+        array.flags.writeable = False
+    return result
+
+@_byte_lru
+def _tube_ua_cached(key):
+    result = tube_ua_grid(dict(key))
+    for array in result:
+        array.flags.writeable = False
+    return result
+
+def fin_ua_cached(inputs):
+    """Returns the UA grid of a finned HX deck, computed once per geometry
+    
+    The cache key holds only the inputs UA depends on (FIN_UA_KEYS), so decks 
+    that differ in their temperatures share one UA grid while a change of any 
+    of those keys causes a recomputation. The cache holds at most UA_CACHE_MAX_BYTES 
+    of grids, see set_ua_cache_limit.
+    
+    Args:
+        inputs (HXInputs): The input values read from the input file.
+
+    Returns:
+        numpy.ndarray (x4): Read-only designs, UA, and cold and hot side overall fin efficiencies.
+    """
+    
+    return _fin_ua_cached(_ua_key(inputs, FIN_UA_KEYS))
+
+def tube_ua_cached(inputs):
+    """Returns the UA grid of a tubed HX deck, computed once per geometry
+    
+    The cache key holds only the inputs UA depends on (TUBE_UA_KEYS).
+    
+    Args:
+        inputs (HXInputs): The input values read from the input file.
+
+    Returns:
+        numpy.ndarray (x2): Read-only designs and UA.
+    """
+    
+    return _tube_ua_cached(_ua_key(inputs, TUBE_UA_KEYS))
+
+def clear_ua_cache():
+    """Empties the caches of fin and tube UA grids"""
+    
+    _fin_ua_cached.cache_clear()
+    _tube_ua_cached.cache_clear()
+
+def set_ua_cache_limit(max_bytes = UA_CACHE_MAX_BYTES):
+    """Sets the size bound of the fin and tube UA grid caches
+    
+    Long-lived processes with large decks can lower it; 0 turns the caches off.
+    
+    Args:
+        max_bytes (int): Total bytes kept by each cache.
+    """
+    
+    for cached in (_fin_ua_cached, _tube_ua_cached):
+        cached.max_bytes = max_bytes
+    clear_ua_cache()
+
+def q_fin_scenarios(temp_lmtd, name):
+    """Computes the q value of every finned HX design for many temperature scenarios
+    
+    Args:
+        temp_lmtd (list, numpy.ndarray): One LMTD per scenario.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+
+    Returns:
+        numpy.ndarray (x2): q with shape (scenarios, designs) and the structured designs.
+    """
+    
+    params, ua, _, _ = fin_ua_cached(bc.resolve_inputs(name))
+    return np.multiply.outer(np.asarray(temp_lmtd, dtype=np.float64), ua), params
+
+def q_tube_scenarios(temp_lmtd, name):
+    """Computes the q value of every tubed HX design for many temperature scenarios
+    
+    Args:
+        temp_lmtd (list, numpy.ndarray): One LMTD per scenario.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+
+    Returns:
+        numpy.ndarray (x2): q with shape (scenarios, designs) and the structured designs.
+    """
+    
+    params, ua = tube_ua_cached(bc.resolve_inputs(name))
+    return np.multiply.outer(np.asarray(temp_lmtd, dtype=np.float64), ua), params
+
+def _q_cases(name, flow, scenarios):
+    results = {}
+    for inputs, names, temperatures in bc.plan_cases(bc.load_cases(name)):
+        lmtd, _ = log_mean_temp_diff_array(*np.array(temperatures, dtype=np.float64).T, hx_type = flow)
+        q, params = scenarios(lmtd, inputs)
+        results.update((case, (row, params)) for case, row in zip(names, q))
+    return results
+
+def q_fin_cases(name, flow = 'counter'):
+    """Computes the q value of every finned HX design for every case of a deck
+    
+    Cases are grouped by geometry with plan_cases, so each group's UA grid is 
+    computed once and multiplied by the LMTD of each of its cases.
+    
+    Args:
+        name (str, dict, HXInputs): name of the input file, or preloaded inputs.
+        flow (str): parallel or counter.
+
+    Returns:
+        dict: case name -> (q, structured array of designs). q is NaN for a case 
+        with non-physical temperatures.
+    """
+    
+    return _q_cases(name, flow, q_fin_scenarios)
+
+def q_tube_cases(name, flow = 'counter'):
+    """Computes the q value of every tubed HX design for every case of a deck
+    
+    Args:
+        name (str, dict, HXInputs): name of the input file, or preloaded inputs.
+        flow (str): parallel or counter.
+
+    Returns:
+        dict: case name -> (q, structured array of designs), see q_fin_cases.
+    """
+    
+    return _q_cases(name, flow, q_tube_scenarios)
+
+@hxi.stage("q_fin_grid", points=lambda result: len(result[0]))
+def q_fin_grid(temp_lmtd, name, properties = False):
+    """Computes the q value for every design of a finned HX in a single vectorized pass
+    
+    This is the array counterpart of q_fin, which is kept as the reference implementation.
+    The UA grid is cached per geometry (fin_ua_cached), so a new temp_lmtd costs one multiply.
+    
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        properties (bool): Take h_hot, h_cold and wall_k from the deck's property tables
+            at the mean stream temperatures, see HX_properties.mean_properties.
+
+    Returns:
+        numpy.ndarray (x5): q, UA, cold and hot side overall fin efficiencies, and the 
+        structured array of design parameters (FIN_PARAM_DTYPE). All but q are read-only.
+    """
+    
+    inputs = bc.resolve_inputs(name)
+    if properties:
+        inputs = hxp.mean_properties(inputs)
+    
+    params, ua, eta_not_cold, eta_not_hot = fin_ua_cached(inputs)
+    q = ua*temp_lmtd
+    return q, ua, eta_not_cold, eta_not_hot, params
+
+@hxi.stage("q_tube_grid", points=lambda result: len(result[0]))
+def q_tube_grid(temp_lmtd, name, properties = False):
+    """Computes the q value for every design of a tubed HX in a single vectorized pass
+    
+    This is the array counterpart of q_tube, which is kept as the reference implementation.
+    The UA grid is cached per geometry (tube_ua_cached), so a new temp_lmtd costs one multiply.
+    
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        properties (bool): Take h_hot, h_cold and wall_k from the deck's property tables
+            at the mean stream temperatures, see HX_properties.mean_properties.
+
+    Returns:
+        numpy.ndarray (x3): q, UA, and the structured array of design parameters (TUBE_PARAM_DTYPE). 
+        All but q are read-only.
+    """
+    
+    inputs = bc.resolve_inputs(name)
+    if properties:
+        inputs = hxp.mean_properties(inputs)
+    
+    params, ua = tube_ua_cached(inputs)
+    q = ua*temp_lmtd
+    return q, ua, params
+
+@hxi.stage("q_fin_sensitivity", points=lambda result: len(result[0]))
+def q_fin_sensitivity(temp_lmtd, name):
+    """Computes the q value of every finned HX design and its Jacobian in one pass
+    
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+
+    Returns:
+        numpy.ndarray (x3): q, the Jacobian of shape (designs, len(FIN_SENSITIVITY_KEYS)) 
+        holding dq/dx for x in FIN_SENSITIVITY_KEYS, and the structured array of designs.
+    """
+    
+    inputs = bc.resolve_inputs(name)
+    params = product_params(fin_design_axes(inputs), FIN_PARAM_DTYPE)
+    ua, jacobian = fin_ua_jacobian_params(params, inputs)
+    return ua*temp_lmtd, jacobian*temp_lmtd, params
+
+@hxi.stage("q_tube_sensitivity", points=lambda result: len(result[0]))
+def q_tube_sensitivity(temp_lmtd, name):
+    """Computes the q value of every tubed HX design and its Jacobian in one pass
+    
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+
+    Returns:
+        numpy.ndarray (x3): q, the Jacobian of shape (designs, len(TUBE_SENSITIVITY_KEYS)) 
+        holding dq/dx for x in TUBE_SENSITIVITY_KEYS, and the structured array of designs.
+    """
+    
+    inputs = bc.resolve_inputs(name)
+    params = product_params(tube_design_axes(inputs), TUBE_PARAM_DTYPE)
+    ua, jacobian = tube_ua_jacobian_params(params, inputs)
+    return ua*temp_lmtd, jacobian*temp_lmtd, params
+
+LMTD_SOLVER_TOL = 1e-12
+LMTD_SOLVER_MAX_ITER = 100
+
+
+def _as_result(value):
+    """Returns a float for 0-d results and the array otherwise"""
+    
+    value = np.asarray(value, dtype=np.float64)
+    return float(value) if value.ndim == 0 else value
+
+def _check_backend(backend, backends = ('numeric', 'sympy')):
+    if backend not in backends:
+        raise ValueError("An invalid solver backend was given. Please select " + 
+                         ", ".join(backends[:-1]) + " or " + backends[-1] + ".")
+
+@hxi.stage("lmtd_delta", points=np.size)
+def lmtd_delta(lmtd, delta_known):
+    """Computes the unknown end temperature difference for a specified LMTD
+    
+    Solves (d - d_k)/ln(d/d_k) = lmtd for d. With x = d/d_k and y = ln(x) this is 
+    (exp(y) - 1)/y = lmtd/d_k, whose left hand side increases monotonically in y, 
+    so the root is found with a bracketed Newton iteration that falls back to 
+    bisection whenever a Newton step leaves the bracket. All arguments may be arrays.
+    
+    Args:
+        lmtd (int, float, numpy.ndarray): The value of the LMTD.
+        delta_known (int, float, numpy.ndarray): The known end temperature difference.
+
+    Returns:
+        float, numpy.ndarray: The unknown end temperature difference. NaN where no 
+        positive solution exists.
+    """
+    
+    lmtd, delta_known = np.broadcast_arrays(np.asarray(lmtd, dtype=np.float64), 
+                                            np.asarray(delta_known, dtype=np.float64))
+    valid = (lmtd > 0) & (delta_known > 0)
+    ratio = np.where(valid, lmtd/np.where(valid, delta_known, 1), 1)
+    
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        lower = np.where(ratio < 1, -1/ratio - 1, 0)
+        upper = np.where(ratio < 1, 0, 2*np.log(ratio) + 2)
+        guess_below = -np.minimum(2*(1 - ratio)/ratio, -np.expm1(-1/ratio)/ratio)
+        guess_above = np.log(ratio) + np.log1p(np.log(np.maximum(ratio, 1)))
+        y = np.clip(np.where(ratio < 1, guess_below, guess_above), lower, upper)
+        for _ in range(LMTD_SOLVER_MAX_ITER):
+            small = np.abs(y) < 1e-8
+            y_safe = np.where(small, 1, y)
+            g = np.where(small, 1 + y/2, np.expm1(y_safe)/y_safe) - ratio
+            dg = np.where(small, 0.5 + y/3, (y_safe*np.exp(y_safe) - np.expm1(y_safe))/y_safe**2)
+            lower = np.where(g < 0, y, lower)
+            upper = np.where(g > 0, y, upper)
+            y_new = y - g/dg
+            outside = (y_new < lower) | (y_new > upper) | ~np.isfinite(y_new)
+            y_new = np.where(outside, (lower + upper)/2, y_new)
+            converged = np.abs(y_new - y) <= LMTD_SOLVER_TOL*(1 + np.abs(y))
+            y = y_new
+            if np.all(converged):
+                break
+    
+    return _as_result(np.where(valid, delta_known*np.exp(y), np.nan))
+
+@hxi.stage("sympy_solve", points=np.size)
+def _lmtd_delta_sympy(lmtd, delta_known):
+    """Reference SymPy solution of lmtd_delta for scalar or array inputs"""
+    
+    import sympy as sp
+    from sympy import Symbol, solve
+    
+    def solve_one(lmtd, delta_known):
+        delta = Symbol('delta')
+        return float(solve((delta - delta_known)/sp.log(delta/delta_known)-lmtd, delta)[0])
+    
+    if np.ndim(lmtd) == 0 and np.ndim(delta_known) == 0:
+        return solve_one(lmtd, delta_known)
+    return np.vectorize(solve_one, otypes=[np.float64])(lmtd, delta_known)
+
+def _lmtd_delta_backend(lmtd, delta_known, backend):
+    _check_backend(backend, ('numeric', 'table', 'sympy'))
+    if backend == 'sympy':
+        return _lmtd_delta_sympy(lmtd, delta_known)
+    if backend == 'table':
+        try:
+            from . import HX_surrogate as surrogate
+        except ImportError:
+            import HX_surrogate as surrogate
+        return _as_result(surrogate.lmtd_delta(lmtd, delta_known))
+    return lmtd_delta(lmtd, delta_known)
+
+def temp_ntu_solver(q, epsilon, c_min, temp_hot_in = 0, temp_cold_in = 0, temp_type = 'cold', backend = 'numeric'):
     """Computes the temp for the NTU method. temp_type options are hot or cold. This are for the inlet to the HX
     
     Args:
-        q (int, float): The value of the heat removal for the NTU method 
-        epsilon (int, float): The value of the effectivness for the HX.
-        c_min (int, float): minimum C value for NTU calculations.
-        temp_hot_in (int, float): Hot side inlet temeprature.
-        temp_cold_in (int, float): Cold side inlet temeprature.
+        q (int, float, numpy.ndarray): The value of the heat removal for the NTU method 
+        epsilon (int, float, numpy.ndarray): The value of the effectivness for the HX.
+        c_min (int, float, numpy.ndarray): minimum C value for NTU calculations.
+        temp_hot_in (int, float, numpy.ndarray): Hot side inlet temeprature.
+        temp_cold_in (int, float, numpy.ndarray): Cold side inlet temeprature.
         temp_type(str): What temperature is to be solved for. Options are hot or cold. 
+        backend (str): numeric solves the linear relation directly, sympy uses sympy.solve for cross-checking.
 
     Returns:
-        int, float: The value of the temperature.
+        int, float, numpy.ndarray: The value of the temperature.
     """
     
-    if temp_type == 'cold':
-        temp_cold_in = Symbol('temp_cold_in')
-        return solve(epsilon*c_min*(temp_hot_in-temp_cold_in) - q, temp_cold_in)[0]
-    elif temp_type == 'hot':
-        temp_hot_in = Symbol('temp_hot_in')
-        return solve(epsilon*c_min*(temp_hot_in-temp_cold_in) - q, temp_hot_in)[0]
-    else:
+    _check_backend(backend)
+    if temp_type not in ('cold', 'hot'):
         raise ValueError("An incorrect input for the temp_type has been provided. Please select cold or hot.")
     
-def lmtd_solver(q, U,area):
+    if backend == 'numeric':
+        delta_t = np.asarray(q, dtype=np.float64)/(np.asarray(epsilon, dtype=np.float64)*c_min)
+        if temp_type == 'cold':
+            return _as_result(temp_hot_in - delta_t)
+        return _as_result(temp_cold_in + delta_t)
+    
+    from sympy import Symbol, solve
+    
+    with hxi.timer("sympy_solve", 1):
+        if temp_type == 'cold':
+            temp_cold_in = Symbol('temp_cold_in')
+            return solve(epsilon*c_min*(temp_hot_in-temp_cold_in) - q, temp_cold_in)[0]
+        else:
+            temp_hot_in = Symbol('temp_hot_in')
+            return solve(epsilon*c_min*(temp_hot_in-temp_cold_in) - q, temp_hot_in)[0]
+    
+def lmtd_solver(q, U,area, backend = 'numeric'):
     """Computes the lmtd for a specified q value.
     
     Args:
-        q (int, float): The value of the heat removal for the NTU method 
-        U (int, float): The value of the resistance of the HX
-        area (int, float): The surface area of the HX.
+        q (int, float, numpy.ndarray): The value of the heat removal for the NTU method 
+        U (int, float, numpy.ndarray): The value of the resistance of the HX
+        area (int, float, numpy.ndarray): The surface area of the HX.
+        backend (str): numeric solves the linear relation directly, sympy uses sympy.solve for cross-checking.
 
     Returns:
-        int, float: The value of the LMTD.
+        int, float, numpy.ndarray: The value of the LMTD.
     """
     
+    _check_backend(backend)
+    if backend == 'numeric':
+        return _as_result(np.asarray(q, dtype=np.float64)/(np.asarray(U, dtype=np.float64)*area))
+    
+    from sympy import Symbol, solve
+    
     lmtd = Symbol('lmtd')
-    return solve(U*area*lmtd - q,lmtd)[0]
+    with hxi.timer("sympy_solve", 1):
+        return solve(U*area*lmtd - q,lmtd)[0]
 
-def temp_lmtd_solver_parallel(lmtd, temp_hot_in = 0 ,temp_hot_out = 0,temp_cold_in = 0,temp_cold_out = 0, temp_type = "hot_in"):
+def temp_lmtd_solver_parallel(lmtd, temp_hot_in = 0 ,temp_hot_out = 0,temp_cold_in = 0,temp_cold_out = 0, temp_type = "hot_in", backend = 'numeric'):
     """ Computes the temperature from a specified q value for a parallel HX using the LMTD method
     
     For the temperature of the unknown variable, input 0. 
     
     Args:
-        lmtd (int, float): The value of the LMTD 
-        temp_hot_in (int, float): Hot side inlet temeprature.
-        temp_hot_out (int, float): Hot side outelet temeprature.
-        temp_cold_in (int, float): Cold side inlet temeprature.
-        temp_cold_out (int, float): Cold side outelet temeprature.
+        lmtd (int, float, numpy.ndarray): The value of the LMTD 
+        temp_hot_in (int, float, numpy.ndarray): Hot side inlet temeprature.
+        temp_hot_out (int, float, numpy.ndarray): Hot side outelet temeprature.
+        temp_cold_in (int, float, numpy.ndarray): Cold side inlet temeprature.
+        temp_cold_out (int, float, numpy.ndarray): Cold side outelet temeprature.
         temp_type(str): What temperature is to be solved for. Options are hot_in, hot_out, cold_in, or cold_out. 
+        backend (str): numeric uses lmtd_delta, table the HX_surrogate lookup table, 
+            sympy uses sympy.solve for cross-checking.
 
     Returns:
-        int, float: The value of the temperature.
+        int, float, numpy.ndarray: The value of the temperature.
     """
     
     if temp_type == "hot_in" or temp_type == "cold_in":
-        del_t_2 = temp_hot_out - temp_cold_out
-        del_t_1 =  Symbol('del_t_1')
-        delta_t = float(solve((del_t_1 - del_t_2)/sp.log(del_t_1/del_t_2)-lmtd, del_t_1)[0])
+        del_t_2 = np.subtract(temp_hot_out, temp_cold_out)
+        delta_t = _lmtd_delta_backend(lmtd, del_t_2, backend)
         if temp_type == "hot_in":
-            return delta_t + temp_cold_in
+            return _as_result(delta_t + np.asarray(temp_cold_in))
         else:
-            return temp_hot_in - delta_t
+            return _as_result(temp_hot_in - np.asarray(delta_t))
         
     elif temp_type == "hot_out" or temp_type == "cold_out":
-        del_t_1 = temp_hot_in - temp_cold_in
-        del_t_2 =  Symbol('del_t_2')
-        delta_t = float(solve((del_t_1 - del_t_2)/sp.log(del_t_1/del_t_2)-lmtd, del_t_2)[0])
+        del_t_1 = np.subtract(temp_hot_in, temp_cold_in)
+        delta_t = _lmtd_delta_backend(lmtd, del_t_1, backend)
         if temp_type == "hot_out":
-            return delta_t + temp_cold_out
+            return _as_result(delta_t + np.asarray(temp_cold_out))
         else:
-            return temp_hot_out - delta_t
+            return _as_result(temp_hot_out - np.asarray(delta_t))
         
     else:
         raise ValueError("An incorrect input for the temp_type has been provided. Please select cold_in, cold_out, hot_in, or hot_out.")
 
-def temp_lmtd_solver_counter(lmtd, temp_hot_in = 0 ,temp_hot_out = 0,temp_cold_in = 0,temp_cold_out = 0, temp_type = "hot_in"):
+def temp_lmtd_solver_counter(lmtd, temp_hot_in = 0 ,temp_hot_out = 0,temp_cold_in = 0,temp_cold_out = 0, temp_type = "hot_in", backend = 'numeric'):
     """ Computes the temperature from a specified q value for a counter-flow HX using the LMTD method
     
     For the temperature of the unknown variable, input 0. 
     
     Args:
-        lmtd (int, float): The value of the LMTD 
-        temp_hot_in (int, float): Hot side inlet temeprature.
-        temp_hot_out (int, float): Hot side outelet temeprature.
-        temp_cold_in (int, float): Cold side inlet temeprature.
-        temp_cold_out (int, float): Cold side outelet temeprature.
+        lmtd (int, float, numpy.ndarray): The value of the LMTD 
+        temp_hot_in (int, float, numpy.ndarray): Hot side inlet temeprature.
+        temp_hot_out (int, float, numpy.ndarray): Hot side outelet temeprature.
+        temp_cold_in (int, float, numpy.ndarray): Cold side inlet temeprature.
+        temp_cold_out (int, float, numpy.ndarray): Cold side outelet temeprature.
         temp_type(str): What temperature is to be solved for. Options are hot_in, hot_out, cold_in, or cold_out. 
+        backend (str): numeric uses lmtd_delta, table the HX_surrogate lookup table, 
+            sympy uses sympy.solve for cross-checking.
 
     Returns:
-        int, float: The value of the temperature.
+        int, float, numpy.ndarray: The value of the temperature.
     """
     
     if temp_type == "hot_in" or temp_type == "cold_out":
-        del_t_2 = temp_hot_out - temp_cold_in
-        del_t_1 =  Symbol('del_t_1')
-        delta_t = float(solve((del_t_1 - del_t_2)/sp.log(del_t_1/del_t_2)-lmtd, del_t_1)[0])
+        del_t_2 = np.subtract(temp_hot_out, temp_cold_in)
+        delta_t = _lmtd_delta_backend(lmtd, del_t_2, backend)
         if temp_type == "hot_in":
-            return delta_t + temp_cold_out
+            return _as_result(delta_t + np.asarray(temp_cold_out))
         else:
-            return temp_hot_in - delta_t
+            return _as_result(temp_hot_in - np.asarray(delta_t))
         
     elif temp_type == "hot_out" or temp_type == "cold_in":
-        del_t_1 = temp_hot_in - temp_cold_out
-        del_t_2 =  Symbol('del_t_2')
-        delta_t = float(solve((del_t_1 - del_t_2)/sp.log(del_t_1/del_t_2)-lmtd, del_t_2)[0])
+        del_t_1 = np.subtract(temp_hot_in, temp_cold_out)
+        delta_t = _lmtd_delta_backend(lmtd, del_t_1, backend)
         if temp_type == "hot_out":
-            return delta_t + temp_cold_in
+            return _as_result(delta_t + np.asarray(temp_cold_in))
         else:
-            return temp_hot_out - delta_t
+            return _as_result(temp_hot_out - np.asarray(delta_t))
         
     else:
         raise ValueError("An incorrect input for the temp_type has been provided. Please select cold_in, cold_out, hot_in, or hot_out.")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import argparse
+import concurrent.futures
+import json
+import sys
+
+try:
+    from . import HX_analyze as hx
+    from . import HX_boundary_cond as bc
+    from . import HX_results as hxr
+except ImportError:
+    import HX_analyze as hx
+    import HX_boundary_cond as bc
+    import HX_results as hxr
+
+# Runs the finned and tubed HX analysis of HX_example over many input decks in a
+# pool of worker processes and collects one JSON record per deck in a single file.
+#
+#     python HX_batch.py decks/*.yaml -j 8 -o results.jsonl
+
+
+def best_designs(result):
+    """Returns the largest q of a sweep and every design that reaches it
+
+    Args:
+        result (SweepResult): The result of a sweep.
+
+    Returns:
+        float, list: The largest q and the list of designs with that q.
+    """
+
+    best = result[result.argmax()]
+    return float(best.q[0]), [list(p) for p in best.params.tolist()]
+
+def analyze_case(inputs, properties = False):
+    """Runs the counter and parallel flow fin and tube sweeps of one case
+
+    Sweeps are skipped when the case does not provide their design lists.
+
+    Args:
+        inputs (HXInputs): The inputs of the case.
+        properties (bool): Take h_hot, h_cold and wall_k from the deck's property
+            tables at the mean stream temperatures, see HX_properties.mean_properties.
+
+    Returns:
+        dict: The LMTD values, and the largest q and best designs of each sweep.
+    """
+
+    temps = bc.set_temp_boundary_conditions(inputs)
+    record = {"case": inputs.case, "status": "ok",
+              "lmtd_counter": float(hx.log_mean_temp_diff_counter(*temps)),
+              "lmtd_parallel": float(hx.log_mean_temp_diff_parallel(*temps))}
+
+    for flow in ("counter", "parallel"):
+        lmtd = record["lmtd_" + flow]
+        if "num_fins" in inputs:
+            result = hxr.SweepResult.fin(lmtd, inputs, properties)
+            record["fin_" + flow] = dict(zip(("q_max", "designs"), best_designs(result)))
+        if "num_tubes" in inputs:
+            result = hxr.SweepResult.tube(lmtd, inputs, properties)
+            record["tube_" + flow] = dict(zip(("q_max", "designs"), best_designs(result)))
+    return record
+
+def analyze_deck(name, properties = False):
+    """Runs the counter and parallel flow fin and tube sweeps of one input deck
+
+    A deck with several cases gives one record per case, keyed by case name. The 
+    cases are run group by group (see HX_boundary_cond.plan_cases), so cases that 
+    share their geometry reuse its UA grids.
+
+    Args:
+        name (str): name of the input file.
+        properties (bool): See analyze_case.
+
+    Returns:
+        dict: The record of analyze_case, or for a multi-case deck the records 
+        of every case under cases.
+    """
+
+    cases = bc.load_cases(name)
+    if len(cases) == 1:
+        record = {"deck": name}
+        record.update(analyze_case(cases[0], properties))
+        return record
+    by_name = {inputs.case: inputs for inputs in cases}
+    records = {}
+    for _, names, _ in bc.plan_cases(cases):
+        for case in names:
+            try:
+                records[case] = analyze_case(by_name[case], properties)
+            except ValueError as error:
+                records[case] = {"case": case, "status": "error", "error": type(error).__name__ + ": " + str(error)}
+    status = "ok" if all(record["status"] == "ok" for record in records.values()) else "error"
+    return {"deck": name, "status": status, "cases": {case: records[case] for case in by_name}}
+
+def _analyze_deck_safe(name, properties = False):
+    try:
+        return analyze_deck(name, properties)
+    except Exception as error:
+        return {"deck": name, "status": "error", "error": type(error).__name__ + ": " + str(error)}
+
+def _init_worker():
+    """Warms up a worker process so every deck it runs reuses loaded modules"""
+
+    hx.log_mean_temp_diff_counter(2, 1, 0, 0.5)
+
+def run_batch(names, workers = None, ordered = True, properties = False):
+    """Analyzes many input decks in a pool of worker processes
+
+    A deck that fails yields an error record and does not stop the others.
+
+    Args:
+        names (list): names of the input files.
+        workers (int): number of worker processes. Defaults to the number of CPUs.
+        ordered (bool): yield records in the order of names instead of as they finish.
+        properties (bool): See analyze_case.
+
+    Returns:
+        generator: One result record (dict) per deck.
+    """
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(_analyze_deck_safe, name, properties): name for name in names}
+        done = futures if ordered else concurrent.futures.as_completed(futures)
+        for future in done:
+            try:
+                yield future.result()
+            except Exception as error:
+                yield {"deck": futures[future], "status": "error",
+                       "error": type(error).__name__ + ": " + str(error)}
+
+def write_results(records, output):
+    """Writes result records to a JSON lines file as they arrive
+
+    Args:
+        records (iterable): result records from run_batch.
+        output (str): name of the output file.
+
+    Returns:
+        int: The number of decks that failed.
+    """
+
+    failed = 0
+    with open(output, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            failed += record["status"] != "ok"
+    return failed
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Run the CompHX analysis over many input decks.")
+    parser.add_argument("decks", nargs="+", help="input .yaml files")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="consolidated output file")
+    parser.add_argument("--unordered", action="store_true", help="write results as decks finish")
+    parser.add_argument("--properties", action="store_true",
+                        help="take h and wall_k from the decks' property tables at the mean stream temperatures")
+    args = parser.parse_args(argv)
+
+    failed = write_results(run_batch(args.decks, args.workers, not args.unordered, args.properties), args.output)
+    if failed:
+        print(str(failed) + " of " + str(len(args.decks)) + " decks failed, see " + args.output, file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    from . import HX_analyze as hx
+    from . import HX_boundary_cond as bc
+except ImportError:
+    import HX_analyze as hx
+    import HX_boundary_cond as bc
+
+# Performance benchmarks of the analysis functions on synthetic decks of increasing
+# size. Results are written as a JSON baseline that later runs are compared against.
+#
+#     python HX_bench.py --output baseline.json
+#     python HX_bench.py --compare baseline.json --tolerance 0.25
+
+DEFAULT_SIZES = (10**2, 10**4, 10**6)
+
+# Scalar functions are called in a Python loop, so their call count is capped
+SCALAR_CALLS = 10**4
+
+
+def synthetic_inputs(points):
+    """Builds a deck whose fin and tube grids have about the given number of designs
+
+    Args:
+        points (int): The requested number of grid points.
+
+    Returns:
+        HXInputs: The synthetic inputs.
+    """
+
+    base = max(1, int(round(points**0.25)))
+    lengths = [base]*3 + [max(1, int(round(points/base**3)))]
+    def axis(n, low, high):
+        return list(np.linspace(low, high, n))
+    values = {"case": "benchmark", "hot_temp_in": 300, "hot_temp_out": 150, "cold_temp_in": 20,
+              "cold_temp_out": 120, "h_cold": 10, "area_cold": 2.75, "h_hot": 150, "area_hot": 2.75,
+              "wall_k": 200, "wall_thickness": .01,
+              "num_fins": list(range(20, 20 + 4*lengths[0], 4)),
+              "fin_length": axis(lengths[1], .02, .06), "fin_width": axis(lengths[2], .75, 1.25),
+              "fin_thickness": axis(lengths[3], .002, .006),
+              "num_tubes": list(range(20, 20 + 4*lengths[0], 4)),
+              "tube_length": axis(lengths[1], .4, .8), "tube_outer_diameter": axis(lengths[2], .02, .04),
+              "tube_thickness": axis(lengths[3], .002, .006)}
+    return bc.HXInputs(values)
+
+def _bench_q_fin(inputs, points):
+    return len(hx.q_fin_grid(100, inputs)[0])
+
+def _bench_q_tube(inputs, points):
+    return len(hx.q_tube_grid(100, inputs)[0])
+
+def _bench_q_lmtd(inputs, points):
+    calls = min(points, SCALAR_CALLS)
+    for _ in range(calls):
+        hx.q_lmtd_counter(300, 150, 20, 120, inputs)
+        hx.q_lmtd_parallel(300, 150, 20, 120, inputs)
+    return 2*calls
+
+def _bench_epsilon_ntu(inputs, points):
+    ntu = np.linspace(0, 5, points)
+    c_min = np.linspace(.1, 1, points)
+    for hx_type in ('parallel', 'counter', 'shell'):
+        hx.epsilon_ntu_array(ntu, c_min, 1, hx_type)
+    return 3*points
+
+def _bench_inverse_lmtd(inputs, points):
+    hx.temp_lmtd_solver_counter(np.linspace(1, 150, points), 300, 150, 20, 0, temp_type = "cold_out")
+    return points
+
+BENCHMARKS = {
+    "q_fin_grid": _bench_q_fin,
+    "q_tube_grid": _bench_q_tube,
+    "q_lmtd": _bench_q_lmtd,
+    "epsilon_ntu_array": _bench_epsilon_ntu,
+    "temp_lmtd_solver_counter": _bench_inverse_lmtd,
+}
+
+
+def run_benchmarks(sizes = DEFAULT_SIZES, repeat = 3, names = None):
+    """Times every benchmark for every deck size
+
+    Args:
+        sizes (list): requested grid sizes.
+        repeat (int): runs per benchmark, the fastest is kept.
+        names (list): benchmarks to run. Defaults to all of BENCHMARKS.
+
+    Returns:
+        list: One dict per (benchmark, size) with the points evaluated, seconds,
+        throughput in points/s and the peak traced memory in bytes.
+    """
+
+    records = []
+    for size in sizes:
+        inputs = synthetic_inputs(size)
+        points = hx.grid_size(hx.fin_design_axes(inputs))
+        for name in names or BENCHMARKS:
+            function = BENCHMARKS[name]
+            best = np.inf
+            for _ in range(repeat):
+                # Cached tables and UA grids would turn later repeats into cache hits
+                hx.clear_kernel_cache()
+                start = time.perf_counter()
+                evaluated = function(inputs, points)
+                best = min(best, time.perf_counter() - start)
+            hx.clear_kernel_cache()
+            tracemalloc.start()
+            function(inputs, points)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            records.append({"name": name, "size": size, "points": evaluated, "seconds": best,
+                            "points_per_second": evaluated/best if best > 0 else float("inf"),
+                            "peak_bytes": peak})
+    return records
+
+def write_baseline(records, path):
+    """Writes benchmark records and the platform they ran on to a JSON file"""
+
+    with open(path, 'w') as f:
+        json.dump({"python": platform.python_version(), "numpy": np.__version__,
+                   "machine": platform.machine(), "records": records}, f, indent=1)
+
+def compare(records, baseline, tolerance = 0.25):
+    """Compares benchmark records with a baseline
+
+    A regression is a throughput below (1 - tolerance) times the baseline, or a
+    peak memory above (1 + tolerance) times the baseline.
+
+    Args:
+        records (list): records of the current run.
+        baseline (dict): contents of a baseline file.
+        tolerance (float): relative tolerance.
+
+    Returns:
+        list: One message per regression.
+    """
+
+    reference = {(r["name"], r["size"]): r for r in baseline["records"]}
+    regressions = []
+    for record in records:
+        old = reference.get((record["name"], record["size"]))
+        if old is None:
+            continue
+        label = record["name"] + " @ " + str(record["size"])
+        if record["points_per_second"] < (1 - tolerance)*old["points_per_second"]:
+            regressions.append(label + ": throughput " + format(record["points_per_second"], ".4g") +
+                               " points/s vs " + format(old["points_per_second"], ".4g"))
+        if record["peak_bytes"] > (1 + tolerance)*old["peak_bytes"]:
+            regressions.append(label + ": peak memory " + str(record["peak_bytes"]) +
+                               " bytes vs " + str(old["peak_bytes"]))
+    return regressions
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Benchmark the CompHX analysis functions.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="grid sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the fastest is kept")
+    parser.add_argument("--output", help="write the results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative tolerance for --compare")
+    args = parser.parse_args(argv)
+
+    records = run_benchmarks(args.sizes, args.repeat)
+    for record in records:
+        print("{name:>26} {size:>9} {points_per_second:14.4g} points/s {peak_bytes:>12} bytes".format(**record))
+    if args.output:
+        write_baseline(records, args.output)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(records, json.load(f), args.tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,281 @@
 #!/usr/bin/env python3
 
-import yaml
+import copy
+import functools
+import numbers
+import os
+from types import MappingProxyType
+
+try:
+    from . import HX_instrument as hxi
+except ImportError:
+    import HX_instrument as hxi
+
+SCALAR_KEYS = ("hot_temp_in", "hot_temp_out", "cold_temp_in", "cold_temp_out",
+               "h_cold", "area_cold", "h_hot", "area_hot", "wall_k", "wall_thickness")
+
+DESIGN_KEYS = ("num_fins", "fin_thickness", "fin_length", "fin_width",
+               "num_tubes", "tube_thickness", "tube_length", "tube_outer_diameter")
+
+TEMPERATURE_KEYS = SCALAR_KEYS[:4]
+
+# Inputs that set the UA of a design; cases that agree on all of them share their UA grids
+GEOMETRY_KEYS = SCALAR_KEYS[4:] + DESIGN_KEYS
+
+INPUT_CACHE_SIZE = 128
+
+
+class HXInputs:
+    """Validated, immutable set of input values parsed from an input file
+    
+    Values are available as attributes or with dictionary-style indexing, so 
+    an HXInputs object can be used anywhere the dictionary returned by 
+    yaml.safe_load was used before. Design lists are stored as tuples. Keys 
+    that are not known to CompHX are kept read-only in extras. source is the 
+    absolute path of the input file, None for inputs built from values, and 
+    is not one of the values.
+    """
+    
+    __slots__ = ("case",) + SCALAR_KEYS + DESIGN_KEYS + ("source", "extras")
+    
+    def __init__(self, values, source = None):
+        missing = [key for key in SCALAR_KEYS if key not in values]
+        if missing:
+            raise ValueError("Missing required inputs: " + ", ".join(missing))
+        
+        for key in SCALAR_KEYS:
+            if not _is_number(values[key]):
+                raise ValueError("Input " + key + " must be a number")
+            object.__setattr__(self, key, values[key])
+        
+        for key in DESIGN_KEYS:
+            value = values.get(key)
+            if value is not None:
+                if not isinstance(value, (list, tuple)) or not all(_is_number(v) for v in value):
+                    raise ValueError("Input " + key + " must be a list of numbers")
+                value = tuple(value)
+            object.__setattr__(self, key, value)
+        
+        object.__setattr__(self, "case", values.get("case"))
+        object.__setattr__(self, "source", source)
+        known = set(self.__slots__[:-2])
+        object.__setattr__(self, "extras", MappingProxyType(
+                {key: value for key, value in values.items() if key not in known}))
+    
+    def __setattr__(self, key, value):
+        raise AttributeError("HXInputs is immutable")
+    
+    def __delattr__(self, key):
+        raise AttributeError("HXInputs is immutable")
+    
+    def __getitem__(self, key):
+        if key in self.__slots__[:-2]:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        return self.extras[key]
+    
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+    
+    def get(self, key, default=None):
+        """Returns the value of key, or default when it was not provided"""
+        
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def to_dict(self):
+        """Returns the inputs as a plain dictionary, as yaml.safe_load would"""
+        
+        values = {}
+        for key in self.__slots__[:-2]:
+            value = getattr(self, key)
+            if value is not None:
+                values[key] = list(value) if isinstance(value, tuple) else value
+        # Nested extras are copied, so editing the result never changes the cached inputs
+        values.update(copy.deepcopy(dict(self.extras)))
+        return values
+    
+    def __eq__(self, other):
+        if not isinstance(other, HXInputs):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return "HXInputs(case=" + repr(self.case) + ")"
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+@functools.lru_cache(maxsize=INPUT_CACHE_SIZE)
+@hxi.stage("parse_inputs")
+def _load_inputs_cached(path, mtime_ns, size):
+    import yaml
+    
+    with open(path, 'r') as f:
+        return HXInputs(yaml.safe_load(f), path)
+
+@hxi.stage("load_inputs")
+def load_inputs(name):
+    """ Parses and validates an input file, reusing earlier results
+    
+    Parsed files are kept in an LRU cache keyed on the absolute path, the 
+    modification time and the size of the file, so an edited file is re-read.
+    
+    Args:
+        name (str): This is the name of the input file
+        
+    Returns:
+        HXInputs: The validated input values
+    """
+    
+    path = os.path.abspath(name)
+    stat = os.stat(path)
+    return _load_inputs_cached(path, stat.st_mtime_ns, stat.st_size)
+
+def clear_input_cache():
+    """ Empties the cache of parsed input files """
+    
+    _load_inputs_cached.cache_clear()
+    _load_cases_cached.cache_clear()
+
+def resolve_inputs(name):
+    """ Returns the HXInputs for an input file name or preloaded inputs
+    
+    Args:
+        name (str, dict, HXInputs): The name of the input file, a dictionary of 
+            input values, or an HXInputs object which is returned unchanged.
+        
+    Returns:
+        HXInputs: The validated input values
+    """
+    
+    if isinstance(name, HXInputs):
+        return name
+    if isinstance(name, dict):
+        return HXInputs(name)
+    return load_inputs(name)
+
+def cases_from_values(values, source = None):
+    """ Builds the validated inputs of every case of a deck
+    
+    A deck with a cases list declares one case per entry. Each entry holds the 
+    values that differ from the top level of the deck, typically the temperatures, 
+    and may name itself with case (the default is the deck's case and the index). 
+    A deck without cases is a single case.
+    
+    Args:
+        values (dict): The values of the deck, as yaml.safe_load returns them.
+        source (str): The absolute path of the input file, if read from one.
+        
+    Returns:
+        tuple: One HXInputs object per case, in deck order.
+    """
+    
+    cases = values.get("cases")
+    if cases is None:
+        return (HXInputs(values, source),)
+    if not isinstance(cases, list) or not cases or not all(isinstance(case, dict) for case in cases):
+        raise ValueError("Input cases must be a non-empty list of mappings")
+    base = {key: value for key, value in values.items() if key != "cases"}
+    prefix = str(base.get("case", "case"))
+    result, names = [], set()
+    for index, case in enumerate(cases):
+        merged = dict(base, **case)
+        merged["case"] = str(case.get("case", prefix + "_" + str(index)))
+        if merged["case"] in names:
+            raise ValueError("Duplicate case name: " + merged["case"])
+        names.add(merged["case"])
+        result.append(HXInputs(merged, source))
+    return tuple(result)
+
+@functools.lru_cache(maxsize=INPUT_CACHE_SIZE)
+@hxi.stage("parse_inputs")
+def _load_cases_cached(path, mtime_ns, size):
+    import yaml
+    
+    with open(path, 'r') as f:
+        return cases_from_values(yaml.safe_load(f), path)
+
+def load_cases(name):
+    """ Parses and validates every case of an input file
+    
+    Args:
+        name (str, dict, HXInputs): The name of the input file, a dictionary of 
+            input values, or an HXInputs object (a single case).
+        
+    Returns:
+        tuple: One HXInputs object per case, see cases_from_values.
+    """
+    
+    if isinstance(name, HXInputs):
+        return (name,)
+    if isinstance(name, dict):
+        return cases_from_values(name)
+    path = os.path.abspath(name)
+    stat = os.stat(path)
+    return _load_cases_cached(path, stat.st_mtime_ns, stat.st_size)
+
+def plan_cases(cases):
+    """ Groups cases that share their geometry
+    
+    Cases agreeing on every GEOMETRY_KEYS value have the same UA grids, so the 
+    geometry dependent work is done once per group and only the temperatures 
+    vary across its cases.
+    
+    Args:
+        cases (tuple): HXInputs objects, e.g. from load_cases.
+        
+    Returns:
+        list: One (inputs, names, temperatures) tuple per group, in order of first 
+        appearance. inputs is the group's first case, names the case names and 
+        temperatures one TEMPERATURE_KEYS tuple per case.
+    """
+    
+    groups = {}
+    for inputs in cases:
+        key = tuple(getattr(inputs, key) for key in GEOMETRY_KEYS)
+        groups.setdefault(key, []).append(inputs)
+    return [(members[0], [inputs.case for inputs in members], 
+             [tuple(inputs[key] for key in TEMPERATURE_KEYS) for inputs in members])
+            for members in groups.values()]
 
 def read_bc(name):
     """ Reads in Boundary Condition data from a .yaml file. 
          
     Args:
-        name (str): This is the name of the input file
+        name (str, HXInputs): This is the name of the input file, or preloaded inputs
         
     Returns:
         dict: A dictionary of the boundary conditions and input values
             
     """
 
-    with open(name, 'r') as f:
-        inputs = yaml.safe_load(f)
-    return inputs
+    return resolve_inputs(name).to_dict()
 
 
 def set_temp_boundary_conditions(name):
     """ Set the Boundary Condition values to be used in other computations
     
      Args:
-        name (str): This is the name of the input file
+        name (str, HXInputs): This is the name of the input file, or preloaded inputs
         
     Returns:
         int, float (x4): The inlet and outlet temperatures for the hot and cold side of the HX
 
     """
     
-    inputs = read_bc(name)
+    inputs = resolve_inputs(name)
     
     hot_temp_in = inputs["hot_temp_in"]
     hot_temp_out = inputs["hot_temp_out"]
@@ -43,14 +289,14 @@ def set_flow_boundary_conditions(name):
     """Defines the flow boundary conditions
     
     Args:
-        name (str): This is the name of the input file
+        name (str, HXInputs): This is the name of the input file, or preloaded inputs
             
     Returns:
         int, float (x2): The heat transfer coefficient and area for the hot and cold side of the HX
         
     """
     
-    inputs = read_bc(name)
+    inputs = resolve_inputs(name)
     
     h_cold = inputs["h_cold"]
     area_cold = inputs["area_cold"]
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+
+import functools
+import hashlib
+import json
+import numbers
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+try:
+    from . import HX_analyze as hx
+    from . import HX_boundary_cond as bc
+except ImportError:
+    import HX_analyze as hx
+    import HX_boundary_cond as bc
+
+# Persistent, content-addressed cache of analysis results shared by every process
+# and run on a machine. An entry is keyed by the sha256 of a canonical JSON
+# document holding the evaluation kind, its arguments, the geometry inputs of the
+# deck (read_bc restricted to GEOMETRY_KEYS, numbers as floats, so the case name,
+# the temperatures and formatting do not matter) and the code version (the
+# sources of HX_analyze and HX_boundary_cond, and MODEL_VERSION).
+#
+# An entry is a directory of .npy files that hits return memory-mapped:
+#
+#     <digest>/entry.json     array names and total size
+#     <digest>/<name>.npy
+#
+# Entries are staged in a temporary directory and renamed into place, and evicted
+# by renaming them away before they are deleted, so concurrent processes only
+# ever see complete entries. A hit touches entry.json; when the cache grows past
+# max_bytes the least recently used entries are evicted.
+
+MODEL_VERSION = 1
+
+ENV_VAR = "COMPHX_CACHE_DIR"
+
+ENTRY_FILE = "entry.json"
+
+DEFAULT_MAX_BYTES = 2**30
+
+
+def default_path():
+    """Returns the directory the cache is kept in"""
+
+    return os.environ.get(ENV_VAR) or os.path.join(os.path.expanduser("~"), ".cache", "comphx", "results")
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """Returns a digest of the analysis code, so results of older code are never reused"""
+
+    digest = hashlib.sha256(str(MODEL_VERSION).encode())
+    for module in (hx, bc):
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def _normalize(value):
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return {"dtype": value.dtype.str, "shape": list(value.shape),
+                "sha256": hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()}
+    return value
+
+def cache_key(kind, name = None, **arguments):
+    """Computes the content address of an evaluation
+
+    Args:
+        kind (str): The evaluation, e.g. q_fin_grid.
+        name (str, dict, HXInputs): The deck, if the evaluation reads one.
+        **arguments: The other arguments. Arrays are hashed by dtype, shape and content.
+
+    Returns:
+        str: The hexadecimal sha256 digest.
+    """
+
+    document = {"kind": kind, "code": code_version(),
+                "arguments": {key: _normalize(value) for key, value in arguments.items()}}
+    if name is not None:
+        values = bc.read_bc(name)
+        document["inputs"] = {key: _normalize(values[key]) for key in bc.GEOMETRY_KEYS if key in values}
+    return hashlib.sha256(json.dumps(document, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """On-disk LRU cache of tuples of arrays, safe to share between processes
+
+    Statistics (hits, misses, stores, evictions) count this object's operations.
+    """
+
+    def __init__(self, path = None, max_bytes = DEFAULT_MAX_BYTES):
+        self.path = os.path.abspath(path or default_path())
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, digest):
+        """Returns the memory-mapped arrays of an entry, or None when it is not cached"""
+
+        entry = os.path.join(self.path, digest)
+        try:
+            with open(os.path.join(entry, ENTRY_FILE)) as f:
+                names = json.load(f)["arrays"]
+            arrays = tuple(np.load(os.path.join(entry, key + ".npy"), mmap_mode='r') for key in names)
+            os.utime(os.path.join(entry, ENTRY_FILE))
+        except (OSError, ValueError):
+            # Missing, or evicted while it was read
+            self._count("misses")
+            return None
+        self._count("hits")
+        return arrays
+
+    def put(self, digest, arrays):
+        """Stores a tuple of arrays under a digest
+
+        Returns:
+            tuple: The given arrays, which a concurrent eviction cannot take away.
+        """
+
+        staging = tempfile.mkdtemp(dir=self.path, prefix=".staging-")
+        try:
+            names = ["array" + str(i) for i in range(len(arrays))]
+            size = 0
+            for key, value in zip(names, arrays):
+                np.save(os.path.join(staging, key + ".npy"), np.asarray(value))
+                size += os.path.getsize(os.path.join(staging, key + ".npy"))
+            with open(os.path.join(staging, ENTRY_FILE), 'w') as f:
+                json.dump({"arrays": names, "bytes": size}, f)
+            try:
+                os.rename(staging, os.path.join(self.path, digest))
+            except OSError:
+                # Another process stored the same entry first
+                pass
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self._count("stores")
+        self.evict(keep=digest)
+        return tuple(arrays)
+
+    def cached(self, digest, compute):
+        """Returns the cached arrays of digest, computing and storing them on a miss
+
+        Args:
+            digest (str): The content address, see cache_key.
+            compute (function): Computes the tuple of arrays without arguments.
+
+        Returns:
+            tuple: The arrays, memory-mapped on a hit.
+        """
+
+        arrays = self.get(digest)
+        if arrays is None:
+            arrays = self.put(digest, compute())
+        return arrays
+
+    def entries(self):
+        """Returns (last use, bytes, digest) of every entry, least recently used first"""
+
+        entries = []
+        for digest in os.listdir(self.path):
+            if digest.startswith("."):
+                continue
+            try:
+                entry_file = os.path.join(self.path, digest, ENTRY_FILE)
+                with open(entry_file) as f:
+                    size = json.load(f)["bytes"]
+                entries.append((os.stat(entry_file).st_mtime, size, digest))
+            except (OSError, ValueError):
+                continue
+        return sorted(entries)
+
+    def _remove(self, digest):
+        trash = os.path.join(self.path, ".evicted-" + digest + "-" + str(os.getpid()) + "-" + str(threading.get_ident()))
+        try:
+            os.rename(os.path.join(self.path, digest), trash)
+        except OSError:
+            return False
+        shutil.rmtree(trash, ignore_errors=True)
+        return True
+
+    def evict(self, keep = None):
+        """Evicts least recently used entries until the cache fits in max_bytes
+
+        Args:
+            keep (str): The digest of an entry that is never evicted, e.g. the one just stored.
+        """
+
+        entries = self.entries()
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, digest in entries:
+            if size <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            if self._remove(digest):
+                self._count("evictions")
+            size -= entry_size
+
+    def clear(self):
+        """Removes every entry"""
+
+        for _, _, digest in self.entries():
+            self._remove(digest)
+
+    def stats(self):
+        """Returns the hit/miss statistics and the current size of the cache"""
+
+        entries = self.entries()
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits/lookups if lookups else 0.0,
+                "stores": self.stores, "evictions": self.evictions,
+                "entries": len(entries), "bytes": sum(entry[1] for entry in entries)}
+
+
+_default = {}
+
+def default_cache():
+    """Returns the process-wide cache in default_path()"""
+
+    path = os.path.abspath(default_path())
+    if path not in _default:
+        _default[path] = ResultCache(path)
+    return _default[path]
+
+def q_fin_grid(temp_lmtd, name, cache = None):
+    """Cached counterpart of HX_analyze.q_fin_grid, memory-mapped on a hit
+
+    Args:
+        temp_lmtd, name: See HX_analyze.q_fin_grid.
+        cache (ResultCache): The cache. Defaults to default_cache().
+    """
+
+    cache = cache or default_cache()
+    inputs = bc.resolve_inputs(name)
+    return cache.cached(cache_key("q_fin_grid", inputs, temp_lmtd=temp_lmtd),
+                        lambda: hx.q_fin_grid(temp_lmtd, inputs))
+
+def q_tube_grid(temp_lmtd, name, cache = None):
+    """Cached counterpart of HX_analyze.q_tube_grid, memory-mapped on a hit
+
+    Args:
+        temp_lmtd, name: See HX_analyze.q_tube_grid.
+        cache (ResultCache): The cache. Defaults to default_cache().
+    """
+
+    cache = cache or default_cache()
+    inputs = bc.resolve_inputs(name)
+    return cache.cached(cache_key("q_tube_grid", inputs, temp_lmtd=temp_lmtd),
+                        lambda: hx.q_tube_grid(temp_lmtd, inputs))
+
+def _q_lmtd(kind, temps, name, cache):
+    cache = cache or default_cache()
+    inputs = bc.resolve_inputs(name)
+    function = getattr(hx, kind)
+    q, = cache.cached(cache_key(kind, inputs, temps=temps), lambda: (np.float64(function(*temps, inputs)),))
+    return float(q)
+
+def q_lmtd_counter(temp_hot_in, temp_hot_out, temp_cold_in, temp_cold_out, name, cache = None):
+    """Cached counterpart of HX_analyze.q_lmtd_counter"""
+
+    return _q_lmtd("q_lmtd_counter", (temp_hot_in, temp_hot_out, temp_cold_in, temp_cold_out), name, cache)
+
+def q_lmtd_parallel(temp_hot_in, temp_hot_out, temp_cold_in, temp_cold_out, name, cache = None):
+    """Cached counterpart of HX_analyze.q_lmtd_parallel"""
+
+    return _q_lmtd("q_lmtd_parallel", (temp_hot_in, temp_hot_out, temp_cold_in, temp_cold_out), name, cache)
+
+def epsilon_ntu_array(ntu, c_min, c_max, hx_type = 'parallel', cache = None):
+    """Cached counterpart of HX_analyze.epsilon_ntu_array, memory-mapped on a hit
+
+    Args:
+        ntu, c_min, c_max, hx_type: See HX_analyze.epsilon_ntu_array.
+        cache (ResultCache): The cache. Defaults to default_cache().
+    """
+
+    cache = cache or default_cache()
+    ntu, c_min, c_max = (np.asarray(value, dtype=np.float64) for value in (ntu, c_min, c_max))
+    digest = cache_key("epsilon_ntu_array", ntu=ntu, c_min=c_min, c_max=c_max, hx_type=hx_type)
+    return cache.cached(digest, lambda: hx.epsilon_ntu_array(ntu, c_min, c_max, hx_type))
+
+def ntu_from_epsilon(epsilon, c_min, c_max, hx_type = 'parallel', cache = None):
+    """Cached counterpart of HX_analyze.ntu_from_epsilon, memory-mapped on a hit
+
+    Args:
+        epsilon, c_min, c_max, hx_type: See HX_analyze.ntu_from_epsilon.
+        cache (ResultCache): The cache. Defaults to default_cache().
+    """
+
+    cache = cache or default_cache()
+    epsilon, c_min, c_max = (np.asarray(value, dtype=np.float64) for value in (epsilon, c_min, c_max))
+    digest = cache_key("ntu_from_epsilon", epsilon=epsilon, c_min=c_min, c_max=c_max, hx_type=hx_type)
+    return cache.cached(digest, lambda: hx.ntu_from_epsilon(epsilon, c_min, c_max, hx_type))
+
+def main():
+    pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+try:
+    from . import HX_analyze as hx
+    from . import HX_boundary_cond as bc
+    from . import HX_instrument as hxi
+    from . import HX_parallel as par
+    from . import HX_results as hxr
+    from . import HX_sweep as sweep
+except ImportError:
+    import HX_analyze as hx
+    import HX_boundary_cond as bc
+    import HX_instrument as hxi
+    import HX_parallel as par
+    import HX_results as hxr
+    import HX_sweep as sweep
+
+# Checkpointing of long fin/tube sweeps, so a killed run can resume where it
+# stopped. The result columns are memory-mapped files in the checkpoint directory
+# (see HX_results.SweepResult.create). Every CHECKPOINT_INTERVAL seconds they are
+# flushed and checkpoint.npz is replaced atomically with
+#
+#     hash         sha256 of the deck values, the design and temp_lmtd
+#     completed    (n, 2) array of the completed [start, stop) index ranges
+#     top_*, min*, max*, count    the running TopK and MinMax reductions
+#
+# A resumed run checks the hash, skips the completed ranges and continues the
+# reductions in the same index order, so its output is identical to an
+# uninterrupted run.
+
+CHECKPOINT_FILE = "checkpoint.npz"
+
+CHECKPOINT_INTERVAL = 60
+
+TOP_K = 10
+
+VERSION = 1
+
+
+def deck_hash(name, design, temp_lmtd):
+    """Hashes everything that determines the result of a sweep
+
+    Args:
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        design (str): fin or tube.
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+
+    Returns:
+        str: The hexadecimal sha256 digest.
+    """
+
+    key = {"inputs": bc.resolve_inputs(name).to_dict(), "design": design, "temp_lmtd": float(temp_lmtd)}
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def remaining_ranges(completed, total):
+    """Returns the index ranges of [0, total) that are not completed, in order
+
+    Args:
+        completed (list): Completed (start, stop) ranges, in any order.
+        total (int): The number of designs in the grid.
+
+    Returns:
+        list: (start, stop) pairs.
+    """
+
+    remaining = []
+    start = 0
+    for low, high in sorted(completed):
+        if low > start:
+            remaining.append((start, low))
+        start = max(start, high)
+    if start < total:
+        remaining.append((start, total))
+    return remaining
+
+def _add_range(completed, start, stop):
+    if completed and completed[-1][1] == start:
+        completed[-1] = (completed[-1][0], stop)
+    else:
+        completed.append((start, stop))
+
+def save_checkpoint(path, digest, completed, top, extremes):
+    """Atomically writes the progress and the running reductions of a sweep
+
+    Args:
+        path (str): The checkpoint directory.
+        digest (str): The deck_hash of the sweep.
+        completed (list): Completed (start, stop) ranges.
+        top (TopK): The running top-k reduction.
+        extremes (MinMax): The running min/max reduction.
+    """
+
+    arrays = {"version": VERSION, "hash": digest, "completed": np.array(completed, dtype=np.int64).reshape(-1, 2),
+              "top_k": top.k, "top_ties": top.ties, "top_q": top.q,
+              "count": extremes.count, "min": extremes.min, "max": extremes.max}
+    if top.params is not None:
+        arrays["top_params"] = top.params
+    if extremes.min_params is not None:
+        arrays["min_params"] = np.array([extremes.min_params])
+        arrays["max_params"] = np.array([extremes.max_params])
+    staging = os.path.join(path, ".checkpoint-" + str(os.getpid()) + ".npz")
+    np.savez(staging, **arrays)
+    os.replace(staging, os.path.join(path, CHECKPOINT_FILE))
+
+def load_checkpoint(path):
+    """Reads a checkpoint written by save_checkpoint
+
+    Args:
+        path (str): The checkpoint directory.
+
+    Returns:
+        tuple: The hash, the completed ranges, and the TopK and MinMax reductions.
+        None when the directory holds no checkpoint.
+    """
+
+    try:
+        archive = np.load(os.path.join(path, CHECKPOINT_FILE))
+    except FileNotFoundError:
+        return None
+    with archive:
+        if int(archive["version"]) != VERSION:
+            raise ValueError("The checkpoint in " + path + " was written by another version")
+        top = sweep.TopK(int(archive["top_k"]), bool(archive["top_ties"]))
+        top.q = archive["top_q"]
+        if "top_params" in archive.files:
+            top.params = archive["top_params"]
+        extremes = sweep.MinMax()
+        extremes.count = int(archive["count"])
+        extremes.min, extremes.max = archive["min"][()], archive["max"][()]
+        if "min_params" in archive.files:
+            extremes.min_params, extremes.max_params = archive["min_params"][0], archive["max_params"][0]
+        completed = [tuple(int(i) for i in pair) for pair in archive["completed"]]
+        return str(archive["hash"]), completed, top, extremes
+
+@hxi.stage("checkpointed_sweep", points=lambda result: len(result[0]))
+def checkpointed_sweep(temp_lmtd, name, path, design = 'fin', resume = False, k = TOP_K,
+                       chunk_size = None, max_bytes = sweep.DEFAULT_MAX_BYTES,
+                       interval = CHECKPOINT_INTERVAL, max_chunks = None):
+    """Runs a fin or tube sweep into a checkpoint directory, optionally resuming it
+
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        path (str): The checkpoint directory, which also holds the result columns.
+        design (str): fin or tube.
+        resume (bool): Continue the checkpoint in path. A fresh sweep is started
+            when there is none; an existing one for another deck raises ValueError.
+        k (int): Number of best designs kept by the running top-k.
+        chunk_size (int): Designs per chunk. Derived from max_bytes when not given.
+        max_bytes (int): Memory budget for one chunk in bytes.
+        interval (float): Seconds between checkpoints. 0 checkpoints after every chunk.
+        max_chunks (int): Stop after evaluating this many chunks, leaving a
+            checkpoint to resume. Defaults to no limit.
+
+    Returns:
+        tuple: The SweepResult (memory-mapped, complete unless max_chunks stopped
+        the sweep), the TopK and the MinMax reductions, and the completed ranges.
+    """
+
+    inputs = bc.resolve_inputs(name)
+    dtype, design_axes, ua_grid, names = par.design_spec(design)
+    total = hx.grid_size(design_axes(inputs))
+    digest = deck_hash(inputs, design, temp_lmtd)
+    if chunk_size is None:
+        chunk_size = sweep.chunk_size_for_budget(dtype, max_bytes)
+
+    checkpoint = load_checkpoint(path) if resume else None
+    if checkpoint is not None:
+        saved_hash, completed, top, extremes = checkpoint
+        if saved_hash != digest:
+            raise ValueError("The checkpoint in " + path + " was written for another deck")
+        result = hxr.SweepResult.load(path, mmap_mode='r+')
+    else:
+        completed, top, extremes = [], sweep.TopK(k, ties=True), sweep.MinMax()
+        result = hxr.SweepResult.create(path, total, dtype, par.result_columns(design))
+        save_checkpoint(path, digest, completed, top, extremes)
+
+    chunks = 0
+    saved = time.monotonic()
+    for low, high in remaining_ranges(completed, total):
+        for start, stop in sweep.iter_chunks(high - low, chunk_size):
+            if max_chunks is not None and chunks >= max_chunks:
+                break
+            start, stop = low + start, low + stop
+            params, *values = ua_grid(inputs, start, stop)
+            q = values[0]*temp_lmtd
+            result.write(start, params, q=q, **dict(zip(names, values)))
+            top.update(params, q)
+            extremes.update(params, q)
+            _add_range(completed, start, stop)
+            chunks += 1
+            if time.monotonic() - saved >= interval:
+                result.flush()
+                save_checkpoint(path, digest, completed, top, extremes)
+                saved = time.monotonic()
+    result.flush()
+    save_checkpoint(path, digest, completed, top, extremes)
+    return result, top, extremes, completed
+
+def main():
+    pass
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,36 @@
 
 import HX_analyze as hx
 import HX_boundary_cond as bc
-import sys
-import matplotlib.pyplot as plt
+import HX_results as hxr
+import HX_instrument as hxi
+import HX_checkpoint as ckpt
+import HX_shard as shard
+import argparse
+import os
 
 # This script works as an example of how to use the modules developed to solve a HX problem with provided boundary conditions
 
-def main():
+def main(argv = None):
     """ This file is set up to run an example simulation of a finned and tubed heat exchanger for both counter flow and parallel flow.
     
-    The results are plotted in scatter plots and saved to file for each HX type. 
+    The results are plotted in scatter plots and saved to file for each HX type, unless --no-plot is given. 
     """
     
-    name = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Run the example finned and tubed HX analysis.")
+    parser.add_argument("name", help="input .yaml file")
+    parser.add_argument("--no-plot", action="store_true", help="headless mode, skip matplotlib and the plots")
+    parser.add_argument("--save", metavar="DIR", help="write every sweep as memory-mappable .npy columns to DIR")
+    parser.add_argument("--shard-dir", metavar="DIR", help="run the sweeps in shards through the shared directory DIR")
+    parser.add_argument("--shard-role", choices=("plan", "work", "merge"), default="merge",
+                        help="with --shard-dir: plan the shards, work on pending shards, or merge the results (default)")
+    parser.add_argument("--shards", type=int, default=8, help="with --shard-role plan: number of shards per sweep")
+    parser.add_argument("--checkpoint", metavar="DIR", help="checkpoint the sweeps to DIR while they run")
+    parser.add_argument("--resume", action="store_true", help="with --checkpoint: skip the work completed by an earlier run")
+    args = parser.parse_args(argv)
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+    
+    name = bc.load_inputs(args.name)
 #    name = "input.yaml"
     
     
@@ -22,44 +40,73 @@ def main():
     h_cold, area_cold, h_hot, area_hot = bc.set_flow_boundary_conditions(name)
 
     
-    q_fin_counter, fin_counter_vars = hx.q_fin(hx.log_mean_temp_diff_counter(hot_temp_in, hot_temp_out, cold_temp_in, cold_temp_out),name)
-    q_fin_parallel, fin_parallel_vars = hx.q_fin(hx.log_mean_temp_diff_parallel(hot_temp_in, hot_temp_out, cold_temp_in, cold_temp_out),name)
-    
-    q_tube_counter, tube_counter_vars = hx.q_tube(hx.log_mean_temp_diff_counter(hot_temp_in, hot_temp_out, cold_temp_in, cold_temp_out),name)
-    q_tube_parallel, tube_parallel_vars = hx.q_tube(hx.log_mean_temp_diff_parallel(hot_temp_in, hot_temp_out, cold_temp_in, cold_temp_out),name)
-    
-    max_counter_fin = []
-    max_parallel_fin = []
-    
-    max_counter_tube = []
-    max_parallel_tube = []
-    
-    
-    
-    for i in range(len(q_fin_counter)):
-        if q_fin_counter[i] == max(q_fin_counter):
-            max_counter_fin.append(fin_counter_vars[i])
-        if q_fin_parallel[i] == max(q_fin_parallel):
-            max_parallel_fin.append(fin_parallel_vars[i])
-            
-    
-    for i in range(len(q_tube_counter)):
-        if q_tube_counter[i] == max(q_tube_counter):
-            max_counter_tube.append(tube_counter_vars[i])
-        if q_tube_parallel[i] == max(q_tube_parallel):
-            max_parallel_tube.append(tube_parallel_vars[i])
+    lmtd_counter = hx.log_mean_temp_diff_counter(hot_temp_in, hot_temp_out, cold_temp_in, cold_temp_out)
+    lmtd_parallel = hx.log_mean_temp_diff_parallel(hot_temp_in, hot_temp_out, cold_temp_in, cold_temp_out)
+    
+    if args.shard_dir:
+        sweeps = {"q_fin_counter": ('fin', lmtd_counter), "q_fin_parallel": ('fin', lmtd_parallel),
+                  "q_tube_counter": ('tube', lmtd_counter), "q_tube_parallel": ('tube', lmtd_parallel)}
+        roots = {key: os.path.join(args.shard_dir, key) for key in sweeps}
+        if args.shard_role == "plan":
+            for key, (design, lmtd) in sweeps.items():
+                shard.plan_shards(lmtd, name, roots[key], design, args.shards)
+            return
+        if args.shard_role == "work":
+            for key in sweeps:
+                shard.run_worker(roots[key])
+            return
+        fin_counter, fin_parallel, tube_counter, tube_parallel = [shard.merge(roots[key]) for key in sweeps]
+    elif args.checkpoint:
+        fin_counter = ckpt.checkpointed_sweep(lmtd_counter, name, os.path.join(args.checkpoint, "q_fin_counter"), 'fin', args.resume)[0]
+        fin_parallel = ckpt.checkpointed_sweep(lmtd_parallel, name, os.path.join(args.checkpoint, "q_fin_parallel"), 'fin', args.resume)[0]
+        tube_counter = ckpt.checkpointed_sweep(lmtd_counter, name, os.path.join(args.checkpoint, "q_tube_counter"), 'tube', args.resume)[0]
+        tube_parallel = ckpt.checkpointed_sweep(lmtd_parallel, name, os.path.join(args.checkpoint, "q_tube_parallel"), 'tube', args.resume)[0]
+    else:
+        # The UA grids are computed by the first sweep of each type, the second one only multiplies by its LMTD
+        fin_counter = hxr.SweepResult.fin(lmtd_counter,name)
+        fin_parallel = hxr.SweepResult.fin(lmtd_parallel,name)
+        
+        tube_counter = hxr.SweepResult.tube(lmtd_counter,name)
+        tube_parallel = hxr.SweepResult.tube(lmtd_parallel,name)
+    
+    q_fin_counter = fin_counter.q
+    q_fin_parallel = fin_parallel.q
+    q_tube_counter = tube_counter.q
+    q_tube_parallel = tube_parallel.q
+    
+    max_counter_fin = [list(p) for p in fin_counter[fin_counter.argmax()].params.tolist()]
+    max_parallel_fin = [list(p) for p in fin_parallel[fin_parallel.argmax()].params.tolist()]
+    
+    max_counter_tube = [list(p) for p in tube_counter[tube_counter.argmax()].params.tolist()]
+    max_parallel_tube = [list(p) for p in tube_parallel[tube_parallel.argmax()].params.tolist()]
             
-    print(max(q_fin_counter))
-    print(max(q_fin_parallel))
-    print(max(q_tube_counter))
-    print(max(q_tube_parallel))
+    print(q_fin_counter.max())
+    print(q_fin_parallel.max())
+    print(q_tube_counter.max())
+    print(q_tube_parallel.max())
     
     print(max_counter_fin)
     print(max_parallel_fin)
     print(max_counter_tube)
     print(max_parallel_tube)
     
-            
+    if args.save:
+        fin_counter.save(os.path.join(args.save, "q_fin_counter"))
+        fin_parallel.save(os.path.join(args.save, "q_fin_parallel"))
+        tube_counter.save(os.path.join(args.save, "q_tube_counter"))
+        tube_parallel.save(os.path.join(args.save, "q_tube_parallel"))
+    
+    if not args.no_plot:
+        plot_results(q_fin_counter, q_fin_parallel, q_tube_counter, q_tube_parallel)
+    
+@hxi.stage("plot")
+def plot_results(q_fin_counter, q_fin_parallel, q_tube_counter, q_tube_parallel):
+    """ Plots the heat rate of every design of each HX type and saves the figures to file.
+    
+    matplotlib is imported here so that headless runs do not pay for it.
+    """
+    
+    import matplotlib.pyplot as plt
     
     plt.scatter(range(len(q_fin_counter)), q_fin_counter, label = "Finned Counter-Flow")
     plt.title('Finned Counter-Flow')
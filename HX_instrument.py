@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+import atexit
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Opt-in instrumentation of the analysis pipeline. Stages record wall time, call
+# counts and points evaluated while instrumentation is on, either for the whole
+# process (COMPHX_PROFILE=1 prints a summary at exit) or inside an instrument()
+# block. When it is off a stage costs a single flag check.
+
+ENV_VAR = "COMPHX_PROFILE"
+
+
+class _State:
+    enabled = False
+    exporters = ()
+
+_state = _State()
+_lock = threading.Lock()
+_stats = {}
+
+
+def enabled():
+    """Returns True when instrumentation is on"""
+
+    return _state.enabled
+
+def record(name, seconds, points = 0):
+    """Adds one call of a stage to the statistics and the exporters
+
+    Args:
+        name (str): name of the stage.
+        seconds (float): wall time of the call.
+        points (int): number of points the call evaluated.
+    """
+
+    with _lock:
+        stats = _stats.setdefault(name, [0, 0.0, 0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] += points
+    for exporter in _state.exporters:
+        exporter.event(name, seconds, points)
+
+def stage(name, points = None):
+    """Decorator that records every call of a function as a stage
+
+    Args:
+        name (str): name of the stage.
+        points (function): computes the number of points evaluated from the
+            return value. No points are recorded when not given.
+    """
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            record(name, time.perf_counter() - start, points(result) if points else 0)
+            return result
+        return wrapper
+    return decorate
+
+@contextlib.contextmanager
+def timer(name, points = 0):
+    """Context manager that records the enclosed block as one call of a stage"""
+
+    if not _state.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start, points)
+
+def reset():
+    """Clears the recorded statistics"""
+
+    with _lock:
+        _stats.clear()
+
+def report():
+    """Returns the recorded statistics
+
+    Returns:
+        dict: stage name -> dict of calls, seconds, points and points_per_second.
+    """
+
+    with _lock:
+        items = [(name, list(stats)) for name, stats in _stats.items()]
+    return {name: {"calls": calls, "seconds": seconds, "points": points,
+                   "points_per_second": points/seconds if points and seconds > 0 else None}
+            for name, (calls, seconds, points) in items}
+
+def summary():
+    """Returns the recorded statistics as a text table, slowest stage first"""
+
+    lines = ["{:<28}{:>10}{:>14}{:>14}{:>16}".format("stage", "calls", "seconds", "points", "points/s")]
+    for name, stats in sorted(report().items(), key=lambda item: -item[1]["seconds"]):
+        rate = stats["points_per_second"]
+        lines.append("{:<28}{:>10}{:>14.6f}{:>14}{:>16}".format(name, stats["calls"], stats["seconds"],
+                     stats["points"], "" if rate is None else format(rate, ".4g")))
+    return "\n".join(lines)
+
+
+class JsonLinesExporter:
+    """Writes one JSON line per stage call and the final report"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def start(self):
+        self.file = open(self.path, 'a')
+
+    def event(self, name, seconds, points):
+        line = json.dumps({"stage": name, "seconds": seconds, "points": points, "time": time.time()})
+        with _lock:
+            self.file.write(line + "\n")
+
+    def close(self, stats):
+        self.file.write(json.dumps({"report": stats}) + "\n")
+        self.file.close()
+
+
+class CProfileExporter:
+    """Runs cProfile while instrumentation is on and dumps the stats to a file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def event(self, name, seconds, points):
+        pass
+
+    def close(self, stats):
+        self.profile.disable()
+        self.profile.dump_stats(self.path)
+
+
+@contextlib.contextmanager
+def instrument(*exporters, clear = True):
+    """Turns instrumentation on for the enclosed block
+
+    Args:
+        *exporters: objects with start(), event(name, seconds, points) and
+            close(report) methods, e.g. JsonLinesExporter or CProfileExporter.
+        clear (bool): clear earlier statistics first.
+
+    Returns:
+        contextmanager: yields the report function.
+    """
+
+    if clear:
+        reset()
+    previous = _state.enabled, _state.exporters
+    for exporter in exporters:
+        exporter.start()
+    _state.exporters = previous[1] + tuple(exporters)
+    _state.enabled = True
+    try:
+        yield report
+    finally:
+        _state.enabled, _state.exporters = previous
+        stats = report()
+        for exporter in exporters:
+            exporter.close(stats)
+
+def _report_at_exit():
+    print(summary(), file=sys.stderr)
+
+if os.environ.get(ENV_VAR, "0") not in ("", "0"):
+    _state.enabled = True
+    atexit.register(_report_at_exit)
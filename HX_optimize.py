@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+try:
+    from . import HX_analyze as hx
+    from . import HX_boundary_cond as bc
+except ImportError:
+    import HX_analyze as hx
+    import HX_boundary_cond as bc
+
+# Bounded search for the best finned or tubed HX design over continuous ranges of
+# the design parameters, instead of enumerating every point of the deck's grid.
+# The count (num_fins/num_tubes) is kept integer throughout.
+
+
+def fin_volume(params):
+    """Computes the total fin material volume of finned HX designs
+
+    Args:
+        params (numpy.ndarray): Structured array of FIN_PARAM_DTYPE designs.
+
+    Returns:
+        numpy.ndarray: num_fins*fin_length*fin_width*fin_thickness for every design.
+    """
+
+    return params["num_fins"]*params["fin_length"]*params["fin_width"]*params["fin_thickness"]
+
+def tube_volume(params):
+    """Computes the total tube wall material volume of tubed HX designs
+
+    Args:
+        params (numpy.ndarray): Structured array of TUBE_PARAM_DTYPE designs.
+
+    Returns:
+        numpy.ndarray: The tube wall volume for every design.
+    """
+
+    outer = params["tube_outer_diameter"]
+    inner = outer - 2*params["tube_thickness"]
+    return params["num_tubes"]*params["tube_length"]*np.pi*(outer**2 - inner**2)/4
+
+DESIGNS = {
+    "fin": (hx.FIN_PARAM_DTYPE, hx.fin_design_axes, lambda p, i: hx.fin_ua_params(p, i)[0], fin_volume),
+    "tube": (hx.TUBE_PARAM_DTYPE, hx.tube_design_axes, hx.tube_ua_params, tube_volume),
+}
+
+JACOBIANS = {
+    "fin": hx.fin_ua_jacobian_params,
+    "tube": hx.tube_ua_jacobian_params,
+}
+
+
+class OptimizeResult:
+    """Best design found by optimize
+
+    Attributes:
+        params (numpy.void): The best design record.
+        q (float): Its heat rate.
+        volume (float): Its material volume.
+        evaluations (int): Number of designs evaluated, seeding included.
+        converged (bool): False when max_evals stopped the search.
+    """
+
+    def __init__(self, params, q, volume, evaluations, converged):
+        self.params = params
+        self.q = q
+        self.volume = volume
+        self.evaluations = evaluations
+        self.converged = converged
+
+    def __repr__(self):
+        return ("OptimizeResult(params=" + repr(self.params) + ", q=" + repr(self.q) +
+                ", volume=" + repr(self.volume) + ", evaluations=" + repr(self.evaluations) + ")")
+
+
+def _to_params(x, dtype):
+    params = np.empty(len(x), dtype=dtype)
+    params[dtype.names[0]] = np.rint(x[:, 0])
+    for column, field in enumerate(dtype.names[1:], 1):
+        params[field] = x[:, column]
+    return params
+
+def objective(temp_lmtd, name, design = 'fin'):
+    """Builds -q and its analytic gradient as a function of the design parameters
+    
+    The result follows the convention of gradient based minimizers that take a
+    function returning (value, gradient), e.g. scipy.optimize.minimize(fun, x0, jac=True).
+    The design count is treated as continuous.
+    
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        design (str): fin or tube.
+
+    Returns:
+        function: fun(x) for x of shape (4,) or (designs, 4) in dtype field order,
+        returning -q and -dq/dx.
+    """
+    
+    if design not in DESIGNS:
+        raise ValueError("An invalid design was given. Please select fin or tube.")
+    dtype = DESIGNS[design][0]
+    jacobian = JACOBIANS[design]
+    inputs = bc.resolve_inputs(name)
+    
+    def fun(x):
+        x = np.asarray(x, dtype=np.float64)
+        params = np.empty(x.shape[:-1], dtype=[(field, np.float64) for field in dtype.names])
+        for column, field in enumerate(dtype.names):
+            params[field] = x[..., column]
+        ua, d_ua = jacobian(params, inputs)
+        return -ua*temp_lmtd, -d_ua[..., :len(dtype.names)]*temp_lmtd
+    return fun
+
+def optimize(temp_lmtd, name, design = 'fin', bounds = None, max_volume = None, constraints = (),
+             seed_points = 2, starts = 3, tol = 1e-4, max_evals = 5000):
+    """Finds the design with the largest q within bounds and constraints
+
+    A vectorized compass (pattern) search: every iteration evaluates the 2*4
+    neighbours of the current design at once, moves to the best feasible
+    improvement, and halves the step sizes when there is none. The design count
+    moves in whole steps. The search is started from each of the best `starts`
+    feasible points of an optional coarse grid of seed_points values per
+    parameter, which guards against stalling on a constraint boundary. The grid
+    has seed_points**4 designs, so the default of 2 (its corners) keeps the
+    seeding cheaper than the deck's own grid. Designs are evaluated only once
+    and steps clipped away by the bounds are not evaluated.
+
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        design (str): fin or tube.
+        bounds (list): (low, high) per design parameter in dtype field order.
+            Defaults to the span of the deck's design lists.
+        max_volume (int, float): Upper limit on the material volume.
+        constraints (list): Functions of a structured params array returning an
+            array that is >= 0 where a design is feasible.
+        seed_points (int): Coarse grid values per parameter, 0 or 1 starts from the
+            center of the bounds.
+        starts (int): Number of seeds the search is started from.
+        tol (float): Relative step size, per parameter, at which the search stops.
+        max_evals (int): Maximum number of design evaluations.
+
+    Returns:
+        OptimizeResult: The best design found.
+    """
+
+    if design not in DESIGNS:
+        raise ValueError("An invalid design was given. Please select fin or tube.")
+    dtype, design_axes, ua_params, volume = DESIGNS[design]
+    inputs = bc.resolve_inputs(name)
+    if bounds is None:
+        bounds = [(min(axis), max(axis)) for axis in design_axes(inputs)]
+    lower, upper = np.array(bounds, dtype=np.float64).T
+    lower[0], upper[0] = np.ceil(lower[0]), np.floor(upper[0])
+    if np.any(lower > upper):
+        raise ValueError("Empty design bounds were given")
+
+    evaluations = [0]
+    seen = {}
+    def evaluate(x):
+        # Designs already evaluated, e.g. by another start, are looked up
+        keys = [row.tobytes() for row in x]
+        new = [i for i, key in enumerate(keys) if key not in seen]
+        if new:
+            params = _to_params(x[new], dtype)
+            evaluations[0] += len(new)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                q = ua_params(params, inputs)*temp_lmtd
+            feasible = np.isfinite(q)
+            if max_volume is not None:
+                feasible &= volume(params) <= max_volume
+            for constraint in constraints:
+                feasible &= np.asarray(constraint(params)) >= 0
+            seen.update(zip((keys[i] for i in new), np.where(feasible, q, -np.inf)))
+        return np.array([seen[key] for key in keys])
+
+    if seed_points > 1:
+        axes = [np.linspace(lo, hi, seed_points) for lo, hi in zip(lower, upper)]
+        axes[0] = np.unique(np.rint(axes[0]))
+        seeds = np.stack([g.ravel() for g in np.meshgrid(*axes, indexing='ij')], axis=1)
+    else:
+        seeds = ((lower + upper)/2)[None, :]
+    seed_q = evaluate(seeds)
+    order = np.argsort(-seed_q, kind='stable')[:max(starts, 1)]
+    order = order[np.isfinite(seed_q[order])]
+    if len(order) == 0:
+        raise ValueError("No feasible starting design was found")
+
+    span = upper - lower
+    min_step = tol*span
+    directions = np.concatenate((np.eye(len(lower)), -np.eye(len(lower))))
+    x_best, q_best, converged = None, -np.inf, True
+    for start in order:
+        x, q = seeds[start], seed_q[start]
+        step = span/max(seed_points - 1, 2)
+        step[0] = max(np.rint(step[0]), 1)
+        while True:
+            if evaluations[0] >= max_evals:
+                converged = False
+                break
+            neighbours = np.clip(x + directions*step, lower, upper)
+            neighbours[:, 0] = np.rint(neighbours[:, 0])
+            # Steps clipped back onto x by the bounds need no evaluation
+            neighbours = neighbours[np.any(neighbours != x, axis=1)]
+            neighbour_q = evaluate(neighbours) if len(neighbours) else np.array([-np.inf])
+            best = np.argmax(neighbour_q)
+            if neighbour_q[best] > q:
+                x, q = neighbours[best], neighbour_q[best]
+                continue
+            if np.all(step[1:] <= min_step[1:]) and step[0] <= 1:
+                break
+            step[1:] = np.where(step[1:] > min_step[1:], step[1:]/2, step[1:])
+            step[0] = max(np.floor(step[0]/2), 1)
+        if q > q_best:
+            x_best, q_best = x, q
+
+    params = _to_params(x_best[None, :], dtype)
+    return OptimizeResult(params[0], float(q_best), float(volume(params)[0]), evaluations[0], converged)
+
+def pareto_front(temp_lmtd, name, volumes, design = 'fin', **kwargs):
+    """Computes the front of largest q against material volume
+
+    optimize is run once per volume budget and dominated results (more volume
+    for no more q) are dropped. Budgets that no design within the bounds and
+    constraints meets are skipped, so the front may have fewer points than volumes.
+
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        volumes (list): Material volume budgets.
+        design (str): fin or tube.
+        **kwargs: Further arguments of optimize.
+
+    Returns:
+        numpy.ndarray (x3): The volume and q of every front point, sorted by volume,
+        and the structured array of their designs.
+    """
+
+    if design not in DESIGNS:
+        raise ValueError("An invalid design was given. Please select fin or tube.")
+    results = []
+    for max_volume in volumes:
+        try:
+            results.append(optimize(temp_lmtd, name, design, max_volume=max_volume, **kwargs))
+        except ValueError:
+            # No feasible design within this budget
+            continue
+    results.sort(key=lambda r: (r.volume, -r.q))
+    front = []
+    for result in results:
+        if not front or result.q > front[-1].q:
+            front.append(result)
+    dtype = DESIGNS[design][0]
+    return (np.array([r.volume for r in front]), np.array([r.q for r in front]),
+            np.array([r.params for r in front], dtype=dtype))
+
+def main():
+    pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+import concurrent.futures
+import os
+
+import numpy as np
+
+try:
+    from . import HX_analyze as hx
+    from . import HX_boundary_cond as bc
+    from . import HX_instrument as hxi
+    from . import HX_results as hxr
+    from . import HX_sweep as sweep
+except ImportError:
+    import HX_analyze as hx
+    import HX_boundary_cond as bc
+    import HX_instrument as hxi
+    import HX_results as hxr
+    import HX_sweep as sweep
+
+# Multi-core evaluation of a single large fin/tube sweep. The flat design index
+# space is split into consecutive ranges and every worker writes its q and UA
+# values straight into the rows of one shared result, so no results are pickled.
+#
+# Threads share an in-memory or memory-mapped result; NumPy releases the GIL in
+# the array kernels. Processes reopen a memory-mapped result directory (see
+# HX_results.SweepResult.create) in r+ mode. Every design is evaluated by the same
+# elementwise kernel as the serial sweep, so the result matches it exactly.
+#
+# Each worker holds one chunk of temporaries at a time, so the memory in use is
+# about workers*max_bytes.
+
+BACKENDS = ('thread', 'process')
+
+DESIGNS = {
+    'fin': (hx.FIN_PARAM_DTYPE, hx.fin_design_axes, hx.fin_ua_grid, ("ua", "eta_not_cold", "eta_not_hot")),
+    'tube': (hx.TUBE_PARAM_DTYPE, hx.tube_design_axes, hx.tube_ua_grid, ("ua",)),
+}
+
+
+def design_spec(design):
+    """Returns the parameter dtype, the axes and UA grid functions and the result columns of a design
+
+    Args:
+        design (str): fin or tube.
+
+    Returns:
+        tuple: (dtype, design_axes, ua_grid, result column names without q).
+    """
+
+    if design not in DESIGNS:
+        raise ValueError("An invalid design was given. Please select fin or tube.")
+    return DESIGNS[design]
+
+def result_columns(design):
+    """Returns the result column names of a design sweep, q first"""
+
+    return ("q",) + design_spec(design)[3]
+
+def evaluate_range(temp_lmtd, inputs, design, result, start, stop, chunk_size):
+    """Evaluates the designs [start, stop) chunk by chunk and writes them into a result
+
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        inputs (HXInputs): The input values read from the input file.
+        design (str): fin or tube.
+        result (SweepResult): The result of the whole grid, written in place.
+        start (int): First flat design index.
+        stop (int): One past the last flat design index.
+        chunk_size (int): Designs per chunk.
+    """
+
+    _, _, ua_grid, names = design_spec(design)
+    for low, high in sweep.iter_chunks(stop - start, chunk_size):
+        params, *values = ua_grid(inputs, start + low, start + high)
+        result.write(start + low, params, q=values[0]*temp_lmtd, **dict(zip(names, values)))
+
+def _evaluate_process(temp_lmtd, values, design, path, start, stop, chunk_size):
+    """Process pool task: evaluates one range into the memory-mapped result at path"""
+
+    result = hxr.SweepResult.load(path, mmap_mode='r+')
+    evaluate_range(temp_lmtd, bc.resolve_inputs(values), design, result, start, stop, chunk_size)
+    result.flush()
+
+def ranges(total, workers, chunk_size):
+    """Splits the flat design index space into one task range per chunk
+
+    Ranges are at most chunk_size long and there are at least as many as workers
+    when the grid allows it, so every worker has work.
+
+    Args:
+        total (int): The number of designs in the grid.
+        workers (int): The number of workers.
+        chunk_size (int): The largest number of designs per range.
+
+    Returns:
+        list: (start, stop) pairs covering [0, total).
+    """
+
+    size = max(1, min(chunk_size, -(-total//workers)))
+    return list(sweep.iter_chunks(total, size))
+
+@hxi.stage("parallel_sweep", points=lambda result: len(result))
+def parallel_sweep(temp_lmtd, name, design = 'fin', path = None, workers = None, backend = 'thread',
+                   chunk_size = None, max_bytes = sweep.DEFAULT_MAX_BYTES):
+    """Evaluates a whole fin or tube sweep on several cores into one shared result
+
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        design (str): fin or tube.
+        path (str): Directory of a memory-mapped result to create. Defaults to an
+            in-memory result, which only the thread backend can share.
+        workers (int): Number of workers. Defaults to the number of CPUs.
+        backend (str): thread or process.
+        chunk_size (int): Designs per chunk. Derived from max_bytes when not given.
+        max_bytes (int): Memory budget for one chunk of one worker in bytes.
+
+    Returns:
+        SweepResult: The result, with the columns of SweepResult.fin or SweepResult.tube.
+    """
+
+    if backend not in BACKENDS:
+        raise ValueError("An invalid backend was given. Please select thread or process.")
+    if backend == 'process' and path is None:
+        raise ValueError("The process backend needs a result path")
+    inputs = bc.resolve_inputs(name)
+    dtype, design_axes, _, _ = design_spec(design)
+    total = hx.grid_size(design_axes(inputs))
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = sweep.chunk_size_for_budget(dtype, max_bytes)
+
+    columns = result_columns(design)
+    if path is None:
+        result = hxr.SweepResult.from_columns({key: np.empty(total, dtype=dtype[key]) for key in dtype.names},
+                                              {key: np.empty(total, dtype=hxr.RESULT_DTYPE) for key in columns})
+    else:
+        result = hxr.SweepResult.create(path, total, dtype, columns)
+
+    tasks = ranges(total, workers, chunk_size)
+    if workers == 1 or len(tasks) <= 1:
+        for start, stop in tasks:
+            evaluate_range(temp_lmtd, inputs, design, result, start, stop, chunk_size)
+    elif backend == 'thread':
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(evaluate_range, temp_lmtd, inputs, design, result, start, stop, chunk_size)
+                       for start, stop in tasks]
+            for future in futures:
+                future.result()
+    else:
+        result.flush()
+        values = inputs.to_dict()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_evaluate_process, temp_lmtd, values, design, path, start, stop, chunk_size)
+                       for start, stop in tasks]
+            for future in futures:
+                future.result()
+        result = hxr.SweepResult.load(path)
+    result.flush()
+    return result
+
+def main():
+    pass
+
+if __name__ == "__main__":
+    main()
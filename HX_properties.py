@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+import csv
+import functools
+import os
+
+import numpy as np
+
+try:
+    from . import HX_boundary_cond as bc
+    from . import HX_instrument as hxi
+except ImportError:
+    import HX_boundary_cond as bc
+    import HX_instrument as hxi
+
+# Temperature dependent fluid properties (c_p, k, mu, rho, ...) tabulated against
+# temperature in CSV or NPZ files. Tables are loaded once per process and looked
+# up with piecewise-linear interpolation over arrays of temperatures.
+#
+# A CSV table has a header row, temperature first:
+#
+#     temperature,cp,k,mu,rho
+#     300,4179,0.613,8.55e-4,996.5
+#
+# An NPZ table holds one array per column, with the temperatures under "temperature".
+# A deck names the tables of its fluids, and optionally of its wall, with
+#
+#     properties:
+#       hot: water.csv
+#       cold: air.npz
+#       wall: steel.csv
+#
+# Relative table paths are relative to the directory of the deck.
+#
+# The tables feed the segmented model (HX_segment). The lumped LMTD/NTU sweeps of
+# HX_analyze and HX_batch use the constant values of the deck unless they are
+# asked for properties=True, which takes h_hot, h_cold and wall_k from the h
+# columns of the fluid tables and the k column of the wall table at the mean
+# stream temperatures (see mean_properties).
+
+TEMPERATURE = "temperature"
+
+SPEC_HEAT = "cp"
+
+HEAT_TRANSFER = "h"
+
+CONDUCTIVITY = "k"
+
+SIDES = ('hot', 'cold', 'wall')
+
+TABLE_CACHE_SIZE = 32
+
+
+class PropertyTable:
+    """Piecewise-linear table of fluid properties against temperature
+
+    The segment slopes are computed once on construction, so a lookup is one
+    binary search per temperature shared by every property. Temperatures outside
+    the table are clamped to its ends. All arrays are read-only.
+    """
+
+    def __init__(self, temperature, columns):
+        temperature = np.array(temperature, dtype=np.float64)
+        if temperature.ndim != 1 or len(temperature) < 2:
+            raise ValueError("A property table needs at least two temperatures")
+        if not np.all(np.diff(temperature) > 0):
+            raise ValueError("Property table temperatures must be strictly increasing")
+        self.temperature = _read_only(temperature)
+        self.columns = {}
+        self._slopes = {}
+        for key, value in columns.items():
+            value = np.array(value, dtype=np.float64)
+            if value.shape != temperature.shape:
+                raise ValueError("Property " + key + " does not match the number of temperatures")
+            self.columns[key] = _read_only(value)
+            self._slopes[key] = _read_only(np.diff(value)/np.diff(temperature))
+
+    @property
+    def names(self):
+        return tuple(self.columns)
+
+    def _locate(self, temp):
+        temp = np.clip(np.asarray(temp, dtype=np.float64), self.temperature[0], self.temperature[-1])
+        index = np.clip(np.searchsorted(self.temperature, temp, side='right') - 1, 0, len(self.temperature) - 2)
+        return index, temp - self.temperature[index]
+
+    def lookup(self, temp, *names):
+        """Interpolates properties at an array of temperatures
+
+        Args:
+            temp (int, float, numpy.ndarray): Temperatures.
+            *names (str): Properties to look up. Defaults to all of them.
+
+        Returns:
+            dict: property name -> interpolated values, shaped like temp.
+        """
+
+        index, offset = self._locate(temp)
+        return {key: self.columns[key][index] + offset*self._slopes[key][index] for key in names or self.columns}
+
+    def __call__(self, name, temp):
+        """Interpolates one property at an array of temperatures"""
+
+        return self.lookup(temp, name)[name]
+
+    def function(self, name):
+        """Returns a function of temperature for one property
+
+        The result can be passed wherever a property may be a function of
+        temperature, e.g. spec_heat_hot of HX_segment.march.
+        """
+
+        if name not in self.columns:
+            raise ValueError("The property table has no column " + name)
+        return functools.partial(self, name)
+
+    def __repr__(self):
+        return ("PropertyTable(" + ", ".join(self.names) + "; " + repr(float(self.temperature[0])) +
+                " to " + repr(float(self.temperature[-1])) + ")")
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+def _read_csv(path):
+    with open(path, newline='') as f:
+        rows = [row for row in csv.reader(f) if row]
+    header = [key.strip() for key in rows[0]]
+    values = np.array(rows[1:], dtype=np.float64).T
+    return values[0], dict(zip(header[1:], values[1:]))
+
+def _read_npz(path):
+    with np.load(path) as archive:
+        if TEMPERATURE not in archive.files:
+            raise ValueError("The property table " + path + " has no " + TEMPERATURE + " array")
+        return archive[TEMPERATURE], {key: archive[key] for key in archive.files if key != TEMPERATURE}
+
+@functools.lru_cache(maxsize=TABLE_CACHE_SIZE)
+@hxi.stage("load_property_table")
+def _load_table_cached(path, mtime_ns, size):
+    if path.endswith(".npz"):
+        return PropertyTable(*_read_npz(path))
+    return PropertyTable(*_read_csv(path))
+
+def load_table(name):
+    """Loads a property table, reusing earlier loads of the same file
+
+    Tables are kept in a process-wide LRU cache keyed on the absolute path, the
+    modification time and the size of the file, like parsed input files.
+
+    Args:
+        name (str): name of the .csv or .npz file.
+
+    Returns:
+        PropertyTable: The table.
+    """
+
+    path = os.path.abspath(name)
+    stat = os.stat(path)
+    return _load_table_cached(path, stat.st_mtime_ns, stat.st_size)
+
+def clear_table_cache():
+    """Empties the cache of loaded property tables"""
+
+    _load_table_cached.cache_clear()
+
+def save_table(table, name):
+    """Writes a property table as an NPZ file that load_table reads"""
+
+    np.savez(name, **{TEMPERATURE: table.temperature}, **table.columns)
+
+def deck_table(name, side):
+    """Loads the property table the deck names for its hot or cold fluid or its wall
+
+    Args:
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        side (str): hot, cold or wall.
+
+    Returns:
+        PropertyTable: The table.
+    """
+
+    if side not in SIDES:
+        raise ValueError("An invalid side was given. Please select hot, cold or wall.")
+    inputs = bc.resolve_inputs(name)
+    tables = inputs.get("properties")
+    if not tables or side not in tables:
+        raise ValueError("The input file names no property table for the " + side + " side")
+    path = tables[side]
+    if inputs.source is not None:
+        path = os.path.join(os.path.dirname(inputs.source), path)
+    return load_table(path)
+
+def mean_temperature(name, side):
+    """Returns the mean of a stream's inlet and outlet temperatures, for the wall the mean of both streams
+
+    Args:
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        side (str): hot, cold or wall.
+
+    Returns:
+        float: The mean temperature.
+    """
+
+    if side not in SIDES:
+        raise ValueError("An invalid side was given. Please select hot, cold or wall.")
+    inputs = bc.resolve_inputs(name)
+    if side == 'wall':
+        return (mean_temperature(inputs, 'hot') + mean_temperature(inputs, 'cold'))/2
+    return (inputs[side + "_temp_in"] + inputs[side + "_temp_out"])/2
+
+def deck_properties(name, side, temp = None):
+    """Looks up the properties of the deck's hot or cold fluid or its wall
+
+    Args:
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        side (str): hot, cold or wall.
+        temp (int, float, numpy.ndarray): Temperatures. Defaults to mean_temperature.
+
+    Returns:
+        dict: property name -> interpolated values.
+    """
+
+    inputs = bc.resolve_inputs(name)
+    table = deck_table(inputs, side)
+    if temp is None:
+        temp = mean_temperature(inputs, side)
+    return table.lookup(temp)
+
+def mean_properties(name):
+    """Replaces the deck's constant h_hot, h_cold and wall_k by table values at the mean stream temperatures
+
+    A value is replaced when the deck names a table for its side that has the
+    column: h for the hot and cold fluids, k for the wall. The others keep the
+    deck's constants, so a deck without tables is returned unchanged.
+
+    Args:
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+
+    Returns:
+        HXInputs: The inputs with the tabulated values.
+    """
+
+    inputs = bc.resolve_inputs(name)
+    tables = inputs.get("properties") or {}
+    values = None
+    for side, key, column in (('hot', "h_hot", HEAT_TRANSFER), ('cold', "h_cold", HEAT_TRANSFER),
+                              ('wall', "wall_k", CONDUCTIVITY)):
+        if side not in tables:
+            continue
+        table = deck_table(inputs, side)
+        if column in table.columns:
+            values = values or inputs.to_dict()
+            values[key] = float(table(column, mean_temperature(inputs, side)))
+    return inputs if values is None else bc.HXInputs(values, inputs.source)
+
+def main():
+    pass
+
+if __name__ == "__main__":
+    main()
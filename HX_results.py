@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+import csv
+import json
+import os
+
+import numpy as np
+
+try:
+    from . import HX_analyze as hx
+    from . import HX_sweep as sweep
+except ImportError:
+    import HX_analyze as hx
+    import HX_sweep as sweep
+
+# Containers for the results of fin/tube design sweeps and single-pass selection
+# of the best designs.
+
+
+RESULT_DTYPE = np.float64
+
+COLUMNS_FILE = "columns.json"
+
+
+class SweepResult:
+    """Result of a fin or tube design sweep, stored column by column
+
+    Every design parameter (num_fins as int32, geometry as float64) and every
+    result column (q always included, float64) is its own contiguous array with
+    one entry per design. Columns may be memory-mapped files, see load and create.
+    """
+
+    def __init__(self, params, q, **columns):
+        design = {field: np.ascontiguousarray(params[field]) for field in params.dtype.names}
+        results = {"q": np.asarray(q, dtype=RESULT_DTYPE)}
+        results.update((key, np.asarray(value, dtype=RESULT_DTYPE)) for key, value in columns.items())
+        self._set_columns(design, results)
+
+    @classmethod
+    def from_columns(cls, design, results):
+        """Builds a result from dictionaries of design and result column arrays
+
+        Args:
+            design (dict): Design parameter arrays, in parameter order.
+            results (dict): Result arrays, q included.
+
+        Returns:
+            SweepResult: The result, sharing the given arrays.
+        """
+
+        result = cls.__new__(cls)
+        result._set_columns(dict(design), dict(results))
+        return result
+
+    def _set_columns(self, design, results):
+        if "q" not in results:
+            raise ValueError("A q column is required")
+        self.design = design
+        self.results = results
+        size = len(results["q"])
+        for key, value in list(design.items()) + list(results.items()):
+            if len(value) != size:
+                raise ValueError("Column " + key + " does not match the number of designs")
+
+    @classmethod
+    def fin(cls, temp_lmtd, name, properties = False):
+        """Runs q_fin_grid and wraps its result"""
+
+        q, ua, eta_not_cold, eta_not_hot, params = hx.q_fin_grid(temp_lmtd, name, properties)
+        return cls(params, q, ua=ua, eta_not_cold=eta_not_cold, eta_not_hot=eta_not_hot)
+
+    @classmethod
+    def tube(cls, temp_lmtd, name, properties = False):
+        """Runs q_tube_grid and wraps its result"""
+
+        q, ua, params = hx.q_tube_grid(temp_lmtd, name, properties)
+        return cls(params, q, ua=ua)
+
+    @property
+    def q(self):
+        return self.results["q"]
+
+    @property
+    def columns(self):
+        """All design and result columns, design parameters first"""
+
+        columns = dict(self.design)
+        columns.update(self.results)
+        return columns
+
+    @property
+    def params(self):
+        """The designs as a structured array (a copy of the design columns)"""
+
+        dtype = np.dtype([(key, value.dtype) for key, value in self.design.items()])
+        params = np.empty(len(self), dtype=dtype)
+        for key, value in self.design.items():
+            params[key] = value
+        return params
+
+    def __len__(self):
+        return len(self.results["q"])
+
+    def __getitem__(self, index):
+        """Selects designs by slice, index array or boolean mask
+
+        Indexing always returns a SweepResult. An integer selects a result holding
+        that one design.
+        """
+
+        if isinstance(index, (int, np.integer)):
+            index = np.atleast_1d(index)
+        return SweepResult.from_columns({key: value[index] for key, value in self.design.items()},
+                                        {key: value[index] for key, value in self.results.items()})
+
+    def column(self, by):
+        """Returns a result column or a design parameter column by name"""
+
+        if by in self.results:
+            return self.results[by]
+        return self.design[by]
+
+    def argmax(self, by = 'q'):
+        """Returns the indices of every design with the largest value of by, ignoring NaN"""
+
+        values = self.column(by)
+        if len(values) == 0 or np.isnan(values).all():
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(values == np.nanmax(values))
+
+    def top_k(self, k, by = 'q', ties = True):
+        """Returns the k best designs, sorted by descending value of by
+
+        Args:
+            k (int): Number of designs to keep.
+            by (str): Result column or parameter field to rank by.
+            ties (bool): Also keep designs tied with the k-th best.
+
+        Returns:
+            SweepResult: The selected designs.
+        """
+
+        return self[sweep.top_k_indices(self.column(by), k, ties)]
+
+    def save(self, path):
+        """Writes the result to disk
+
+        A path ending in .npz gives a single NumPy archive. Any other path is a
+        directory with one .npy file per column, which load can memory-map.
+
+        Args:
+            path (str): name of the .npz file or of the directory.
+        """
+
+        if path.endswith(".npz"):
+            np.savez(path, **self.columns, **{"__design__": np.array(list(self.design))})
+            return
+        os.makedirs(path, exist_ok=True)
+        for key, value in self.columns.items():
+            np.save(os.path.join(path, key + ".npy"), value)
+        _write_column_names(path, list(self.design), list(self.results))
+
+    @classmethod
+    def load(cls, path, mmap_mode = 'r'):
+        """Reads a result written by save or create
+
+        Args:
+            path (str): name of the .npz file or of the directory.
+            mmap_mode (str): numpy.load memory-map mode for directories, None reads
+                the columns into memory.
+
+        Returns:
+            SweepResult: The result.
+        """
+
+        if path.endswith(".npz"):
+            with np.load(path) as archive:
+                design_names = list(archive["__design__"])
+                columns = {key: archive[key] for key in archive.files if key != "__design__"}
+            return cls.from_columns({key: columns[key] for key in design_names},
+                                    {key: value for key, value in columns.items() if key not in design_names})
+        with open(os.path.join(path, COLUMNS_FILE)) as f:
+            names = json.load(f)
+        def load_column(key):
+            return np.load(os.path.join(path, key + ".npy"), mmap_mode=mmap_mode)
+        return cls.from_columns({key: load_column(key) for key in names["design"]},
+                                {key: load_column(key) for key in names["results"]})
+
+    @classmethod
+    def create(cls, path, size, design_dtype, results = ("q",)):
+        """Creates a writable, memory-mapped result directory of a given size
+
+        Large sweeps can fill it block by block with write without holding the
+        whole result in memory.
+
+        Args:
+            path (str): name of the directory.
+            size (int): number of designs.
+            design_dtype (numpy.dtype): Structured dtype of the designs, e.g. FIN_PARAM_DTYPE.
+            results (tuple): names of the result columns.
+
+        Returns:
+            SweepResult: The result, backed by the new files.
+        """
+
+        os.makedirs(path, exist_ok=True)
+        def create_column(key, dtype):
+            return np.lib.format.open_memmap(os.path.join(path, key + ".npy"), mode='w+',
+                                             dtype=dtype, shape=(size,))
+        design = {key: create_column(key, design_dtype[key]) for key in design_dtype.names}
+        result_columns = {key: create_column(key, RESULT_DTYPE) for key in results}
+        _write_column_names(path, list(design), list(result_columns))
+        return cls.from_columns(design, result_columns)
+
+    def write(self, start, params, **results):
+        """Copies a block of designs and results into rows [start, start + len(params))"""
+
+        stop = start + len(params)
+        for key, value in self.design.items():
+            value[start:stop] = params[key]
+        for key, value in results.items():
+            self.results[key][start:stop] = value
+
+    def flush(self):
+        """Flushes memory-mapped columns to disk"""
+
+        for value in self.columns.values():
+            if isinstance(value, np.memmap):
+                value.flush()
+
+    def to_csv(self, path):
+        """Writes the result as a CSV file with a header row, meant for small sweeps
+
+        Args:
+            path (str): name of the CSV file.
+        """
+
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(self.columns))
+            writer.writerows(zip(*[value.tolist() for value in self.columns.values()]))
+
+
+def _write_column_names(path, design, results):
+    with open(os.path.join(path, COLUMNS_FILE), 'w') as f:
+        json.dump({"design": design, "results": results}, f)
+
+def top_k_stream(blocks, k, ties = True):
+    """Selects the k best designs of a chunked sweep with a bounded running state
+
+    Args:
+        blocks (iterable): (params, q) blocks, e.g. from HX_sweep.iter_fin_sweep.
+        k (int): Number of designs to keep.
+        ties (bool): Also keep designs tied with the k-th best.
+
+    Returns:
+        SweepResult: The selected designs, sorted by descending q.
+    """
+
+    top, = sweep.reduce_sweep(blocks, sweep.TopK(k, ties))
+    params, q = top.result()
+    return SweepResult(params, q)
+
+def main():
+    pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+try:
+    from . import HX_analyze as hx
+    from . import HX_boundary_cond as bc
+    from . import HX_properties as hxp
+except ImportError:
+    import HX_analyze as hx
+    import HX_boundary_cond as bc
+    import HX_properties as hxp
+
+# One dimensional finite-segment model of parallel and counter flow HXs. The
+# exchanger is cut into equal segments along its length, each with the UA of
+# fin_ua/tube_ua for its share of the fins, tubes and areas. Heat transfer
+# coefficients, specific heats and the wall conductivity may be functions of the
+# local temperature. All designs are marched together as arrays.
+
+SEGMENTS = 20
+
+SHOOTING_TOL = 1e-10
+SHOOTING_MAX_ITER = 50
+
+FLOWS = ('parallel', 'counter')
+
+
+class SegmentResult:
+    """Outlet state of every design marched by march
+
+    Attributes:
+        q (numpy.ndarray): Heat rate of every design.
+        temp_hot_out (numpy.ndarray): Hot side outlet temperature.
+        temp_cold_out (numpy.ndarray): Cold side outlet temperature.
+        converged (numpy.ndarray): False where the counter flow shooting did not converge.
+        temp_hot (numpy.ndarray): Hot side temperature at the segments+1 nodes
+            along the length, shape (segments+1, designs). None unless profiles were requested.
+        temp_cold (numpy.ndarray): Cold side temperature at the nodes, as temp_hot.
+    """
+
+    def __init__(self, q, temp_hot_out, temp_cold_out, converged, temp_hot = None, temp_cold = None):
+        self.q = q
+        self.temp_hot_out = temp_hot_out
+        self.temp_cold_out = temp_cold_out
+        self.converged = converged
+        self.temp_hot = temp_hot
+        self.temp_cold = temp_cold
+
+    def __len__(self):
+        return len(self.q)
+
+    def __repr__(self):
+        return "SegmentResult(designs=" + repr(len(self)) + ", converged=" + repr(bool(np.all(self.converged))) + ")"
+
+
+def _property(value, temp):
+    """Evaluates a property that is a number or a function of temperature"""
+
+    return value(temp) if callable(value) else value
+
+def _wall_k(wall_k, temp_hot, temp_cold):
+    """Evaluates the wall conductivity at the mean of the stream temperatures"""
+
+    return wall_k((temp_hot + temp_cold)/2) if callable(wall_k) else wall_k
+
+def segment_ua(params, inputs, segments, design = 'fin', h_cold = None, h_hot = None, wall_k = None):
+    """Builds the UA of one segment of every design as a function of the local temperatures
+
+    A segment holds 1/segments of the fins (or of the tube length) and of both
+    areas, so for constant properties its UA is exactly UA/segments.
+
+    Args:
+        params (numpy.ndarray): Structured array of FIN_PARAM_DTYPE or TUBE_PARAM_DTYPE designs.
+        inputs (HXInputs): The input values read from the input file.
+        segments (int): Number of segments.
+        design (str): fin or tube.
+        h_cold, h_hot (int, float, function): Heat transfer coefficients, or functions of
+            the local stream temperature. Default to the values of the inputs.
+        wall_k (int, float, function): Wall thermal conductivity, or a function of the
+            mean of the local stream temperatures. Defaults to the value of the inputs.
+
+    Returns:
+        function: ua(temp_hot, temp_cold) giving the segment UA of every design.
+    """
+
+    h_cold = inputs["h_cold"] if h_cold is None else h_cold
+    h_hot = inputs["h_hot"] if h_hot is None else h_hot
+    wall_k = inputs["wall_k"] if wall_k is None else wall_k
+    area_cold = inputs["area_cold"]/segments
+    area_hot = inputs["area_hot"]/segments
+
+    if design == 'fin':
+        num_fins = params["num_fins"].astype(np.float64)/segments
+        def ua(temp_hot, temp_cold):
+            return hx.fin_ua(num_fins, params["fin_length"], params["fin_width"], params["fin_thickness"],
+                             _property(h_cold, temp_cold), area_cold, _property(h_hot, temp_hot), area_hot,
+                             _wall_k(wall_k, temp_hot, temp_cold), inputs["wall_thickness"])[0]
+    elif design == 'tube':
+        tube_length = params["tube_length"]/segments
+        def ua(temp_hot, temp_cold):
+            return hx.tube_ua(params["num_tubes"].astype(np.float64), tube_length, params["tube_outer_diameter"],
+                              params["tube_thickness"], _property(h_cold, temp_cold), area_cold,
+                              _property(h_hot, temp_hot), area_hot, _wall_k(wall_k, temp_hot, temp_cold))
+    else:
+        raise ValueError("An invalid design was given. Please select fin or tube.")
+
+    if not any(callable(value) for value in (h_cold, h_hot, wall_k)):
+        constant = ua(None, None)
+        return lambda temp_hot, temp_cold: constant
+    return ua
+
+def _march(ua, capacity_hot, capacity_cold, temp_hot, temp_cold, counter, segments, profiles):
+    """Marches both streams from x = 0 to x = L
+
+    Within a segment the properties are frozen at their values at the segment's
+    x = 0 end, where the temperature difference then decays exponentially, so
+    the segment heat rate is exact for constant properties.
+    """
+
+    sign = -1 if counter else 1
+    q = np.zeros(np.shape(temp_hot))
+    nodes_hot, nodes_cold = [temp_hot], [temp_cold]
+    for _ in range(segments):
+        ua_segment = ua(temp_hot, temp_cold)
+        c_hot = capacity_hot(temp_hot)
+        c_cold = capacity_cold(temp_cold)
+        decay = ua_segment*(1/c_hot + sign/c_cold)
+        small = np.abs(decay) < 1e-8
+        factor = np.where(small, 1 - decay/2, -np.expm1(-decay)/np.where(small, 1, decay))
+        dq = ua_segment*(temp_hot - temp_cold)*factor
+        q = q + dq
+        temp_hot = temp_hot - dq/c_hot
+        temp_cold = temp_cold + sign*dq/c_cold
+        if profiles:
+            nodes_hot.append(temp_hot)
+            nodes_cold.append(temp_cold)
+    return q, temp_hot, temp_cold, nodes_hot, nodes_cold
+
+def march(params, name, mass_flow_rate_hot, spec_heat_hot, mass_flow_rate_cold, spec_heat_cold,
+          design = 'fin', flow = 'counter', segments = SEGMENTS, h_cold = None, h_hot = None,
+          wall_k = None, profiles = False):
+    """Computes the outlet temperatures and q of many designs with the finite-segment model
+
+    The hot stream enters at x = 0. In parallel flow the cold stream enters
+    there too and both are marched along x. In counter flow the cold stream
+    enters at x = L, and its unknown outlet temperature at x = 0 is found by
+    shooting: a bracketed regula falsi (Illinois) iteration on the cold inlet
+    mismatch at x = L, with every design marched at once.
+
+    Args:
+        params (numpy.ndarray): Structured array of FIN_PARAM_DTYPE or TUBE_PARAM_DTYPE designs.
+        name (str, HXInputs): name of the input file, or preloaded inputs. The inlet
+            temperatures are hot_temp_in and cold_temp_in.
+        mass_flow_rate_hot, mass_flow_rate_cold (int, float): Mass flow rates.
+        spec_heat_hot, spec_heat_cold (int, float, function): Specific heats, or
+            functions of the local stream temperature. None interpolates the cp
+            column of the property table the deck names for that fluid.
+        design (str): fin or tube.
+        flow (str): parallel or counter.
+        segments (int): Number of segments.
+        h_cold, h_hot, wall_k: See segment_ua.
+        profiles (bool): Also keep the temperatures at every node.
+
+    Returns:
+        SegmentResult: The heat rate and outlet temperatures of every design.
+    """
+
+    if flow not in FLOWS:
+        raise ValueError("An invalid flow was given. Please select parallel or counter.")
+    if segments < 1:
+        raise ValueError("At least one segment is required")
+    inputs = bc.resolve_inputs(name)
+    temp_hot_in = float(inputs["hot_temp_in"])
+    temp_cold_in = float(inputs["cold_temp_in"])
+    if temp_hot_in <= temp_cold_in:
+        raise ValueError("The hot inlet temperature must be above the cold inlet temperature")
+
+    if spec_heat_hot is None:
+        spec_heat_hot = hxp.deck_table(inputs, 'hot').function(hxp.SPEC_HEAT)
+    if spec_heat_cold is None:
+        spec_heat_cold = hxp.deck_table(inputs, 'cold').function(hxp.SPEC_HEAT)
+    ua = segment_ua(params, inputs, segments, design, h_cold, h_hot, wall_k)
+    def capacity_hot(temp):
+        return mass_flow_rate_hot*_property(spec_heat_hot, temp)
+    def capacity_cold(temp):
+        return mass_flow_rate_cold*_property(spec_heat_cold, temp)
+
+    temp_hot = np.full(len(params), temp_hot_in)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        if flow == 'parallel':
+            state = _march(ua, capacity_hot, capacity_cold, temp_hot, np.full(len(params), temp_cold_in),
+                           False, segments, profiles)
+            converged = np.isfinite(state[0])
+            cold_out = state[2]
+        else:
+            state, cold_out, converged = _shoot(ua, capacity_hot, capacity_cold, temp_hot, temp_cold_in,
+                                                segments, profiles)
+
+    q, hot_out, _, nodes_hot, nodes_cold = state
+    if profiles:
+        return SegmentResult(q, hot_out, cold_out, converged, np.stack(nodes_hot), np.stack(nodes_cold))
+    return SegmentResult(q, hot_out, cold_out, converged)
+
+def _shoot(ua, capacity_hot, capacity_cold, temp_hot, temp_cold_in, segments, profiles):
+    """Solves the counter flow boundary problem for the cold outlet temperature
+
+    The cold inlet mismatch at x = L increases monotonically with the guessed
+    outlet temperature, from below zero at cold_temp_in to hot_temp_in -
+    cold_temp_in (no heat transfer) at hot_temp_in, which brackets the root.
+    """
+
+    scale = temp_hot[0] - temp_cold_in
+    lower, upper = np.full_like(temp_hot, temp_cold_in), temp_hot.copy()
+    residual_lower = _march(ua, capacity_hot, capacity_cold, temp_hot, lower, True, segments, False)[2] - temp_cold_in
+    residual_upper = np.full_like(temp_hot, scale)
+    side = np.zeros(len(temp_hot), dtype=np.int8)
+    guess = lower - residual_lower*(upper - lower)/(residual_upper - residual_lower)
+
+    for iteration in range(SHOOTING_MAX_ITER):
+        state = _march(ua, capacity_hot, capacity_cold, temp_hot, guess, True, segments, profiles)
+        residual = state[2] - temp_cold_in
+        converged = np.abs(residual) <= SHOOTING_TOL*scale
+        if np.all(converged | ~np.isfinite(residual)) or iteration == SHOOTING_MAX_ITER - 1:
+            break
+        below = residual < 0
+        residual_upper = np.where(below & (side == -1), residual_upper/2, residual_upper)
+        residual_lower = np.where(~below & (side == 1), residual_lower/2, residual_lower)
+        lower = np.where(below, guess, lower)
+        residual_lower = np.where(below, residual, residual_lower)
+        upper = np.where(below, upper, guess)
+        residual_upper = np.where(below, residual_upper, residual)
+        side = np.where(below, -1, 1).astype(np.int8)
+        step = lower - residual_lower*(upper - lower)/(residual_upper - residual_lower)
+        guess = np.where(converged, guess, np.where(np.isfinite(step), step, (lower + upper)/2))
+
+    return state, guess, converged
+
+def march_grid(name, mass_flow_rate_hot, spec_heat_hot, mass_flow_rate_cold, spec_heat_cold,
+               design = 'fin', flow = 'counter', segments = SEGMENTS, **properties):
+    """Runs march for every design of the deck's fin or tube grid
+
+    Args:
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        mass_flow_rate_hot, spec_heat_hot, mass_flow_rate_cold, spec_heat_cold, design,
+            flow, segments: See march.
+        **properties: h_cold, h_hot and wall_k, see segment_ua.
+
+    Returns:
+        SegmentResult, numpy.ndarray: The result and the structured array of designs.
+    """
+
+    inputs = bc.resolve_inputs(name)
+    if design == 'fin':
+        params = hx.product_params(hx.fin_design_axes(inputs), hx.FIN_PARAM_DTYPE)
+    elif design == 'tube':
+        params = hx.product_params(hx.tube_design_axes(inputs), hx.TUBE_PARAM_DTYPE)
+    else:
+        raise ValueError("An invalid design was given. Please select fin or tube.")
+    return march(params, inputs, mass_flow_rate_hot, spec_heat_hot, mass_flow_rate_cold, spec_heat_cold,
+                 design, flow, segments, **properties), params
+
+def main():
+    pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import collections
+import http.client
+import json
+import numbers
+import time
+
+import numpy as np
+
+try:
+    from . import HX_analyze as hx
+    from . import HX_boundary_cond as bc
+except ImportError:
+    import HX_analyze as hx
+    import HX_boundary_cond as bc
+
+# Local HTTP service answering "what is q for this design and operating point"
+# queries without a Python start-up per query. Parsed decks stay in memory (the
+# load_inputs cache) and the array kernels stay warm. Single-point requests that
+# arrive within WINDOW seconds of each other are evaluated together as one
+# vectorized batch per deck and design.
+#
+#     python HX_service.py --port 8765 --deck input.yaml
+#
+#     POST /q        {"deck": "input.yaml", "design": "fin", "num_fins": 40, "fin_length": 0.04,
+#                     "fin_width": 1, "fin_thickness": 0.004, "flow": "counter"}
+#                    -> {"q": ..., "ua": ..., "temp_lmtd": ...}
+#                    A list of points gives a list of results. The LMTD is temp_lmtd when
+#                    given, otherwise it is computed for flow (counter by default) from the
+#                    point's temperatures, which default to the deck's.
+#     GET /metrics   request, batch, latency and throughput statistics
+#     GET /health
+#
+# Only the standard library and NumPy are used; Client is a small synchronous
+# client built on http.client.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Seconds a batch stays open for more requests, and the largest batch
+WINDOW = 0.002
+MAX_BATCH = 4096
+
+# Number of recent requests the latency percentiles and recent throughput are computed over
+LATENCY_WINDOW = 10000
+
+FLOWS = ('counter', 'parallel')
+
+DESIGNS = {'fin': (hx.FIN_PARAM_DTYPE, lambda params, inputs: hx.fin_ua_params(params, inputs)[0]),
+           'tube': (hx.TUBE_PARAM_DTYPE, hx.tube_ua_params)}
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class _Point:
+    """One validated query"""
+
+    __slots__ = ("deck", "design", "params", "temp_lmtd", "temps", "flow", "future")
+
+    def __init__(self, request, future):
+        if not isinstance(request, dict):
+            raise ValueError("A query must be a JSON object")
+        if not isinstance(request.get("deck"), str):
+            raise ValueError("A query needs a deck file name")
+        self.deck = request["deck"]
+        self.design = request.get("design", "fin")
+        if not isinstance(self.design, str) or self.design not in DESIGNS:
+            raise ValueError("An invalid design was given. Please select fin or tube.")
+        names = DESIGNS[self.design][0].names
+        missing = [key for key in names if key not in request]
+        if missing:
+            raise ValueError("Missing design parameters: " + ", ".join(missing))
+        self.params = tuple(_check_number(request, key) for key in names)
+        self.temp_lmtd = _check_number(request, "temp_lmtd", optional=True)
+        self.temps = tuple(_check_number(request, key, optional=True) for key in bc.TEMPERATURE_KEYS)
+        self.flow = request.get("flow", "counter")
+        if not isinstance(self.flow, str) or self.flow not in FLOWS:
+            raise ValueError("An invalid flow was given. Please select counter or parallel.")
+        self.future = future
+
+
+def _check_number(request, key, optional = False):
+    value = request.get(key)
+    if value is None and optional:
+        return None
+    if not isinstance(value, numbers.Real) or isinstance(value, bool):
+        raise ValueError("Query value " + key + " must be a number")
+    return value
+
+def _number(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+def evaluate_points(points):
+    """Evaluates a batch of queries of one deck and design in one vectorized pass
+
+    Args:
+        points (list): _Point queries sharing deck and design.
+
+    Returns:
+        list: One result dictionary per point.
+    """
+
+    inputs = bc.load_inputs(points[0].deck)
+    dtype, ua_params = DESIGNS[points[0].design]
+    params = np.array([point.params for point in points], dtype=dtype)
+    ua = np.asarray(ua_params(params, inputs), dtype=np.float64)
+
+    temps = np.array([[inputs[key] if temp is None else temp for key, temp in zip(bc.TEMPERATURE_KEYS, point.temps)]
+                      for point in points], dtype=np.float64).T
+    counter = np.array([point.flow == 'counter' for point in points])
+    temp_lmtd = np.where(counter, hx.log_mean_temp_diff_array(*temps, hx_type='counter')[0],
+                         hx.log_mean_temp_diff_array(*temps, hx_type='parallel')[0])
+    given = np.array([point.temp_lmtd is not None for point in points])
+    if np.any(given):
+        temp_lmtd[given] = [point.temp_lmtd for point in points if point.temp_lmtd is not None]
+    q = ua*temp_lmtd
+    return [{"q": _number(q[i]), "ua": _number(ua[i]), "temp_lmtd": _number(temp_lmtd[i])} for i in range(len(points))]
+
+
+class Metrics:
+    """Request, batch, latency and throughput statistics of a service"""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.requests = 0
+        self.points = 0
+        self.errors = 0
+        self.batches = 0
+        self.batch_points = 0
+        self.largest_batch = 0
+        self.recent = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def request(self, started, points, error = False):
+        """Records one answered request"""
+
+        now = time.monotonic()
+        self.requests += 1
+        self.points += points
+        self.errors += error
+        self.recent.append((now, now - started))
+
+    def batch(self, size):
+        """Records one evaluated batch"""
+
+        self.batches += 1
+        self.batch_points += size
+        self.largest_batch = max(self.largest_batch, size)
+
+    def result(self):
+        """Returns the statistics as a dictionary, latencies in seconds"""
+
+        now = time.monotonic()
+        result = {"uptime": now - self.start, "requests": self.requests, "points": self.points,
+                  "errors": self.errors, "batches": self.batches, "largest_batch": self.largest_batch,
+                  "mean_batch": self.batch_points/self.batches if self.batches else 0.0,
+                  "throughput": self.requests/(now - self.start)}
+        if self.recent:
+            times, latencies = np.array(self.recent).T
+            p50, p95, p99 = np.percentile(latencies, (50, 95, 99))
+            result.update(latency_mean=float(latencies.mean()), latency_p50=float(p50),
+                          latency_p95=float(p95), latency_p99=float(p99), latency_max=float(latencies.max()),
+                          recent_throughput=len(times)/max(now - times[0], 1e-9))
+        return result
+
+
+def _fail(points, error):
+    for point in points:
+        if not point.future.done():
+            point.future.set_exception(ValueError(str(error)))
+
+
+class Service:
+    """Micro-batching evaluation service
+
+    Args:
+        window (float): Seconds a batch stays open for more requests.
+        max_batch (int): Number of points that closes a batch early.
+    """
+
+    def __init__(self, window = WINDOW, max_batch = MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self.metrics = Metrics()
+        self._pending = []
+        self._timer = None
+        self._server = None
+
+    def warm(self, decks):
+        """Parses decks and runs their kernels once, so the first queries are not slowed down"""
+
+        for deck in decks:
+            inputs = bc.load_inputs(deck)
+            for design, (dtype, ua_params) in DESIGNS.items():
+                names = dtype.names
+                if all(key in inputs for key in names):
+                    ua_params(np.array([tuple(inputs[key][0] for key in names)], dtype=dtype), inputs)
+
+    def submit(self, requests):
+        """Validates and queues a list of queries and returns the futures of their results"""
+
+        loop = asyncio.get_event_loop()
+        points = [_Point(request, loop.create_future()) for request in requests]
+        self._pending.extend(points)
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return [point.future for point in points]
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        try:
+            groups = {}
+            for point in batch:
+                groups.setdefault((point.deck, point.design), []).append(point)
+            for points in groups.values():
+                self.metrics.batch(len(points))
+                try:
+                    self._resolve(points, evaluate_points(points))
+                except Exception:
+                    # One bad query must not fail the others, so the group is retried point by point
+                    for point in points:
+                        try:
+                            self._resolve([point], evaluate_points([point]))
+                        except Exception as error:
+                            _fail([point], error)
+        except Exception as error:
+            _fail(batch, error)
+
+    @staticmethod
+    def _resolve(points, results):
+        for point, result in zip(points, results):
+            if not point.future.done():
+                point.future.set_result(result)
+
+    async def handle(self, method, path, body):
+        """Answers one HTTP request
+
+        Returns:
+            int, object: The status code and the JSON response.
+        """
+
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            return 200, self.metrics.result()
+        if path != "/q":
+            return 404, {"error": "Unknown path " + path}
+        if method != "POST":
+            return 405, {"error": "Queries are POSTed to /q"}
+        started = time.monotonic()
+        try:
+            request = json.loads(body or b"null")
+            requests = request if isinstance(request, list) else [request]
+            results = await asyncio.gather(*self.submit(requests))
+        except ValueError as error:
+            self.metrics.request(started, 0, error=True)
+            return 400, {"error": str(error)}
+        self.metrics.request(started, len(results))
+        return 200, results if isinstance(request, list) else results[0]
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, version = line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = header.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, response = await self.handle(method, path, body)
+                payload = json.dumps(response).encode()
+                close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+                writer.write(("HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n%s\r\n"
+                              % (status, _REASONS[status], len(payload), "Connection: close\r\n" if close else "")
+                              ).encode("latin-1") + payload)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host = DEFAULT_HOST, port = DEFAULT_PORT):
+        """Starts listening and returns the bound (host, port)"""
+
+        self._server = await asyncio.start_server(self._connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        """Waits until the service is closed"""
+
+        await self._server.wait_closed()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+
+
+class Client:
+    """Synchronous client of a running service, keeping one connection open
+
+    Args:
+        host (str): Host of the service.
+        port (int): Port of the service.
+        timeout (float): Seconds to wait for a response.
+    """
+
+    def __init__(self, host = DEFAULT_HOST, port = DEFAULT_PORT, timeout = 10):
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _request(self, method, path, body = None):
+        payload = None if body is None else json.dumps(body).encode()
+        headers = {} if payload is None else {"Content-Type": "application/json"}
+        self.connection.request(method, path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        result = json.loads(response.read())
+        if response.status != 200:
+            raise ValueError(result.get("error", response.reason))
+        return result
+
+    def q(self, deck, design = 'fin', **point):
+        """Queries one design and operating point, see the module comment for the keys
+
+        Returns:
+            dict: q, ua and temp_lmtd, None where not finite.
+        """
+
+        return self._request("POST", "/q", dict(point, deck=deck, design=design))
+
+    def q_many(self, points):
+        """Queries a list of point dictionaries, each with its deck and design, in one request"""
+
+        return self._request("POST", "/q", list(points))
+
+    def metrics(self):
+        """Returns the service metrics"""
+
+        return self._request("GET", "/metrics")
+
+    def close(self):
+        self.connection.close()
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Serve q queries for HX designs over local HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--deck", action="append", default=[], help="input .yaml file to preload, may be repeated")
+    parser.add_argument("--window", type=float, default=WINDOW, help="seconds a batch stays open")
+    args = parser.parse_args(argv)
+
+    async def run():
+        service = Service(args.window)
+        service.warm(args.deck)
+        host, port = await service.start(args.host, args.port)
+        print("Serving on http://%s:%d" % (host, port))
+        await service.serve_forever()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import tempfile
+import time
+
+import numpy as np
+
+try:
+    from . import HX_analyze as hx
+    from . import HX_boundary_cond as bc
+    from . import HX_parallel as par
+    from . import HX_results as hxr
+    from . import HX_sweep as sweep
+except ImportError:
+    import HX_analyze as hx
+    import HX_boundary_cond as bc
+    import HX_parallel as par
+    import HX_results as hxr
+    import HX_sweep as sweep
+
+# Sharded execution of a fin/tube sweep over several machines that share a
+# directory. A coordinator splits the grid into deterministic shards (see
+# HX_sweep.shard_range) and writes one manifest per shard; workers anywhere claim
+# shards by atomically renaming their manifest, and write every finished shard as
+# a columnar partial result. A merge step builds the final result and the top-k.
+#
+#     python HX_shard.py plan input.yaml /shared/sweep --design fin --shards 64
+#     python HX_shard.py work /shared/sweep            (on every node, any number of times)
+#     python HX_shard.py merge /shared/sweep --output result --top 10
+#
+# The shared directory holds
+#
+#     plan.json                   deck values, design, temp_lmtd and shard count
+#     pending/shard-00012.json    manifests waiting for a worker
+#     claimed/shard-00012.<worker>.json
+#     done/shard-00012.json
+#     partials/shard-00012/       SweepResult.save columns of the shard
+#
+# A worker touches its claimed manifest after every chunk. Manifests whose
+# claim is older than the lease are renamed back to pending by any worker, so
+# the shards of crashed workers are picked up again. A worker that lost its
+# claim stops, and only the claim owner can mark a shard done. Partials are
+# staged in a temporary directory and renamed into place, so a crash never
+# leaves a half-written partial.
+
+PLAN_FILE = "plan.json"
+
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+PARTIALS = "partials"
+
+# Seconds without progress after which a claimed shard counts as abandoned
+DEFAULT_LEASE = 600
+
+VERSION = 1
+
+
+def _shard_name(index):
+    return "shard-%05d" % index
+
+def _manifest_path(root, state, index, worker = None):
+    name = _shard_name(index) if worker is None else _shard_name(index) + "." + worker
+    return os.path.join(root, state, name + ".json")
+
+def default_worker():
+    """Returns an identifier of this process that is unique across hosts"""
+
+    return socket.gethostname() + "-" + str(os.getpid())
+
+def plan_shards(temp_lmtd, name, root, design = 'fin', shards = 8):
+    """Writes the plan and the shard manifests of a sweep to a shared directory
+
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        root (str): The shared directory. It must not hold a plan yet.
+        design (str): fin or tube.
+        shards (int): The number of shards.
+
+    Returns:
+        dict: The plan.
+    """
+
+    inputs = bc.resolve_inputs(name)
+    _, design_axes, _, _ = par.design_spec(design)
+    total = hx.grid_size(design_axes(inputs))
+    if shards < 1:
+        raise ValueError("A positive number of shards is required")
+    if os.path.exists(os.path.join(root, PLAN_FILE)):
+        raise ValueError("The directory " + root + " already holds a sharded sweep")
+    plan = {"version": VERSION, "design": design, "temp_lmtd": temp_lmtd, "inputs": inputs.to_dict(),
+            "total": total, "shards": shards}
+    for state in (PENDING, CLAIMED, DONE, PARTIALS):
+        os.makedirs(os.path.join(root, state), exist_ok=True)
+    for index in range(shards):
+        start, stop = sweep.shard_range(total, index, shards)
+        _write_json(_manifest_path(root, PENDING, index), {"index": index, "start": start, "stop": stop})
+    # The plan is written last, so workers never see a plan with missing manifests
+    _write_json(os.path.join(root, PLAN_FILE), plan)
+    return plan
+
+def _write_json(path, value):
+    staging = path + ".tmp-" + default_worker()
+    with open(staging, 'w') as f:
+        json.dump(value, f)
+    os.replace(staging, path)
+
+def load_plan(root):
+    """Reads the plan of a sharded sweep"""
+
+    with open(os.path.join(root, PLAN_FILE)) as f:
+        plan = json.load(f)
+    if plan.get("version") != VERSION:
+        raise ValueError("The sharded sweep in " + root + " was planned by another version")
+    return plan
+
+def _manifests(root, state):
+    """Returns (index, file name) of the manifests in one state, by index"""
+
+    names = [name for name in os.listdir(os.path.join(root, state)) if name.endswith(".json")]
+    return sorted((int(name.split(".")[0].split("-")[1]), name) for name in names)
+
+def claim(root, worker):
+    """Claims the first pending shard
+
+    Args:
+        root (str): The shared directory.
+        worker (str): The identifier of the claiming worker.
+
+    Returns:
+        dict: The manifest of the claimed shard, or None when no shard is pending.
+    """
+
+    for index, name in _manifests(root, PENDING):
+        claimed = _manifest_path(root, CLAIMED, index, worker)
+        try:
+            os.rename(os.path.join(root, PENDING, name), claimed)
+        except FileNotFoundError:
+            # Another worker claimed it first
+            continue
+        try:
+            # The rename kept the manifest's old time, which reclaim may have seen already
+            os.utime(claimed)
+            with open(claimed) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            continue
+    return None
+
+def reclaim(root, lease = DEFAULT_LEASE):
+    """Returns the shards whose claim is older than the lease to pending
+
+    Args:
+        root (str): The shared directory.
+        lease (float): Seconds without progress after which a claim is abandoned.
+
+    Returns:
+        list: The indices of the reclaimed shards.
+    """
+
+    reclaimed = []
+    now = time.time()
+    for index, name in _manifests(root, CLAIMED):
+        path = os.path.join(root, CLAIMED, name)
+        try:
+            if now - os.stat(path).st_mtime < lease:
+                continue
+            os.rename(path, _manifest_path(root, PENDING, index))
+        except FileNotFoundError:
+            continue
+        reclaimed.append(index)
+    return reclaimed
+
+def run_shard(root, plan, manifest, worker, chunk_size = None, max_bytes = sweep.DEFAULT_MAX_BYTES):
+    """Evaluates one claimed shard into its partial result and marks it done
+
+    Args:
+        root (str): The shared directory.
+        plan (dict): The plan, see load_plan.
+        manifest (dict): The manifest returned by claim.
+        worker (str): The identifier of the worker holding the claim.
+        chunk_size (int): Designs per chunk. Derived from max_bytes when not given.
+        max_bytes (int): Memory budget for one chunk in bytes.
+
+    Returns:
+        bool: True when the shard was completed, False when the claim was lost.
+    """
+
+    design = plan["design"]
+    dtype, _, ua_grid, names = par.design_spec(design)
+    inputs = bc.resolve_inputs(plan["inputs"])
+    index, start, stop = manifest["index"], manifest["start"], manifest["stop"]
+    claimed = _manifest_path(root, CLAIMED, index, worker)
+    if chunk_size is None:
+        chunk_size = sweep.chunk_size_for_budget(dtype, max_bytes)
+
+    staging = tempfile.mkdtemp(dir=os.path.join(root, PARTIALS), prefix="." + _shard_name(index) + "-")
+    try:
+        partial = hxr.SweepResult.create(staging, stop - start, dtype, par.result_columns(design))
+        for low, high in sweep.iter_chunks(stop - start, chunk_size):
+            params, *values = ua_grid(inputs, start + low, start + high)
+            partial.write(low, params, q=values[0]*plan["temp_lmtd"], **dict(zip(names, values)))
+            try:
+                os.utime(claimed)
+            except FileNotFoundError:
+                return False
+        partial.flush()
+        del partial
+        try:
+            os.rename(staging, os.path.join(root, PARTIALS, _shard_name(index)))
+        except OSError:
+            # A worker that took over an expired claim installed the same partial first
+            pass
+        os.rename(claimed, _manifest_path(root, DONE, index))
+    except FileNotFoundError:
+        return False
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return True
+
+def run_worker(root, worker = None, lease = DEFAULT_LEASE, chunk_size = None,
+               max_bytes = sweep.DEFAULT_MAX_BYTES, max_shards = None):
+    """Claims and evaluates shards until none is pending
+
+    Args:
+        root (str): The shared directory.
+        worker (str): The identifier of this worker. Defaults to default_worker().
+        lease (float): Seconds after which other workers' claims are reclaimed. None never reclaims.
+        chunk_size (int): Designs per chunk. Derived from max_bytes when not given.
+        max_bytes (int): Memory budget for one chunk in bytes.
+        max_shards (int): Stop after this many shards. Defaults to no limit.
+
+    Returns:
+        list: The indices of the shards this worker completed.
+    """
+
+    worker = worker or default_worker()
+    plan = load_plan(root)
+    completed = []
+    while max_shards is None or len(completed) < max_shards:
+        if lease is not None:
+            reclaim(root, lease)
+        manifest = claim(root, worker)
+        if manifest is None:
+            break
+        if run_shard(root, plan, manifest, worker, chunk_size, max_bytes):
+            completed.append(manifest["index"])
+    return completed
+
+def status(root):
+    """Counts the pending, claimed and done shards of a sharded sweep"""
+
+    return {state: len(_manifests(root, state)) for state in (PENDING, CLAIMED, DONE)}
+
+def merge(root, path = None, k = None, ties = True):
+    """Builds the final result of a sharded sweep from its partials
+
+    Args:
+        root (str): The shared directory.
+        path (str): Directory of a memory-mapped result to create. Defaults to an in-memory result.
+        k (int): Also select the k best designs. Defaults to no selection.
+        ties (bool): Also keep designs tied with the k-th best.
+
+    Returns:
+        SweepResult: The result, in flat index order, matching SweepResult.fin or
+        SweepResult.tube. With k, the (result, top) pair where top holds the k best
+        designs sorted by descending q.
+    """
+
+    plan = load_plan(root)
+    done = [index for index, _ in _manifests(root, DONE)]
+    if done != list(range(plan["shards"])):
+        raise ValueError(str(plan["shards"] - len(done)) + " shards of the sweep in " + root + " are not done")
+    dtype = par.design_spec(plan["design"])[0]
+    columns = par.result_columns(plan["design"])
+    total = plan["total"]
+    if path is None:
+        result = hxr.SweepResult.from_columns({key: np.empty(total, dtype=dtype[key]) for key in dtype.names},
+                                              {key: np.empty(total, dtype=hxr.RESULT_DTYPE) for key in columns})
+    else:
+        result = hxr.SweepResult.create(path, total, dtype, columns)
+    top = sweep.TopK(k, ties) if k else None
+    for index in done:
+        start, stop = sweep.shard_range(total, index, plan["shards"])
+        partial = hxr.SweepResult.load(os.path.join(root, PARTIALS, _shard_name(index)))
+        if len(partial) != stop - start:
+            raise ValueError("The partial result of shard " + str(index) + " does not match its manifest")
+        params = partial.params
+        result.write(start, params, **partial.results)
+        if top is not None:
+            top.update(params, partial.q)
+    result.flush()
+    if top is None:
+        return result
+    return result, hxr.SweepResult(*top.result())
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Run a fin or tube sweep in shards over several machines.")
+    commands = parser.add_subparsers(dest="command")
+    plan = commands.add_parser("plan", help="split a deck's sweep into shards")
+    plan.add_argument("name", help="input .yaml file")
+    plan.add_argument("root", help="shared directory")
+    plan.add_argument("--design", default="fin", choices=sorted(par.DESIGNS))
+    plan.add_argument("--flow", default="counter", choices=("counter", "parallel"))
+    plan.add_argument("--shards", type=int, default=8)
+    work = commands.add_parser("work", help="evaluate pending shards")
+    work.add_argument("root", help="shared directory")
+    work.add_argument("--lease", type=float, default=DEFAULT_LEASE, help="seconds before abandoned shards are reclaimed")
+    merged = commands.add_parser("merge", help="merge the partial results")
+    merged.add_argument("root", help="shared directory")
+    merged.add_argument("--output", metavar="DIR", help="write the result as memory-mappable .npy columns to DIR")
+    merged.add_argument("--top", type=int, default=10, help="number of best designs to print, 0 prints none")
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.error("a command is required: plan, work or merge")
+    if args.command == "merge" and args.top < 0:
+        parser.error("--top must not be negative")
+
+    if args.command == "plan":
+        inputs = bc.load_inputs(args.name)
+        temps = bc.set_temp_boundary_conditions(inputs)
+        if args.flow == "counter":
+            temp_lmtd = hx.log_mean_temp_diff_counter(*temps)
+        else:
+            temp_lmtd = hx.log_mean_temp_diff_parallel(*temps)
+        plan_shards(temp_lmtd, inputs, args.root, args.design, args.shards)
+    elif args.command == "work":
+        print(len(run_worker(args.root, lease=args.lease)), "shards done")
+    elif args.top == 0:
+        merge(args.root, args.output)
+    else:
+        _, top = merge(args.root, args.output, args.top)
+        for params, q in zip(top.params.tolist(), top.q.tolist()):
+            print(q, list(params))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+try:
+    from . import HX_analyze as hx
+except ImportError:
+    import HX_analyze as hx
+
+# Precomputed lookup tables for the epsilon-NTU relations and the LMTD inverse
+# (lmtd_delta), for loops that evaluate them millions of times.
+#
+# epsilon is tabulated on a uniform grid of s = NTU/(1 + NTU) in [0, NTU_MAX/(1 + NTU_MAX)]
+# and C_r in [0, 1], and interpolated bilinearly. The LMTD inverse y = ln(delta/delta_known)
+# is tabulated as y*r/(1 + r), which stays smooth where y grows like -1/r, against
+# ln(r) = ln(lmtd/delta_known) in [-LMTD_LOG_RATIO_MAX, LMTD_LOG_RATIO_MAX], and
+# interpolated linearly. Points outside the tables fall back to the exact functions.
+#
+# The error bound of every table is measured when it is built, as the largest
+# difference to the exact function over the midpoints of every cell and cell edge
+# (where linear interpolation error peaks), and stored with the tables. With the
+# default grids the bounds are about 4e-6 (parallel), 1.5e-5 (counter) and 8e-7
+# (shell) absolute in epsilon, and 9e-7 relative in delta for the LMTD inverse.
+#
+# The LMTD inverse table replaces an iterative solve and is several times faster
+# than lmtd_delta. The epsilon closed forms are already cheap in NumPy, so their
+# tables mainly serve callers that need a fixed-cost, bounded-error model.
+#
+# Tables are built once, saved as .npy files and memory-mapped by later
+# processes. The directory is COMPHX_SURROGATE_DIR, or ~/.cache/comphx/surrogate.
+
+FLOWS = ('parallel', 'counter', 'shell')
+
+NTU_MAX = 50
+NTU_POINTS = 1025
+C_R_POINTS = 257
+
+LMTD_LOG_RATIO_MAX = 8
+LMTD_POINTS = 8193
+
+# Bumped whenever the table layout or grids change, so stale files are rebuilt
+VERSION = 1
+
+ENV_VAR = "COMPHX_SURROGATE_DIR"
+METADATA_FILE = "surrogate.json"
+
+_loaded = {}
+
+
+def default_path():
+    """Returns the directory the tables are kept in"""
+
+    return os.environ.get(ENV_VAR) or os.path.join(os.path.expanduser("~"), ".cache", "comphx", "surrogate")
+
+def _metadata():
+    return {"version": VERSION, "ntu_max": NTU_MAX, "ntu_points": NTU_POINTS,
+            "c_r_points": C_R_POINTS, "lmtd_log_ratio_max": LMTD_LOG_RATIO_MAX, "lmtd_points": LMTD_POINTS}
+
+def _s_max():
+    return NTU_MAX/(1 + NTU_MAX)
+
+def _bilinear(table, s, c_r):
+    """Interpolates a table on the uniform (s, C_r) grid, both coordinates within range"""
+
+    rows, columns = table.shape
+    fs = s*((rows - 1)/_s_max())
+    fc = c_r*(columns - 1)
+    i = np.minimum(fs.astype(np.intp), rows - 2)
+    j = np.minimum(fc.astype(np.intp), columns - 2)
+    ts, tc = fs - i, fc - j
+    k = i*columns + j
+    flat = table.reshape(-1)
+    low, high = flat.take(k), flat.take(k + columns)
+    low += tc*(flat.take(k + 1) - low)
+    high += tc*(flat.take(k + columns + 1) - high)
+    return low + ts*(high - low)
+
+def _linear(table, u):
+    """Interpolates the LMTD table at log ratios u within range"""
+
+    fu = (u + LMTD_LOG_RATIO_MAX)*((len(table) - 1)/(2*LMTD_LOG_RATIO_MAX))
+    i = np.minimum(fu.astype(np.intp), len(table) - 2)
+    t = fu - i
+    return (1 - t)*table[i] + t*table[i + 1]
+
+def _epsilon_exact(s, c_r, hx_type):
+    with np.errstate(divide='ignore'):
+        ntu = s/(1 - s)
+    return hx.epsilon_ntu_array(ntu, c_r, 1, hx_type)[0]
+
+def _lmtd_exact(u):
+    """Returns w = y*r/(1 + r) for y = ln(delta/delta_known) and r = lmtd/delta_known = exp(u)
+
+    w runs smoothly from -1 to ln(r) where y itself grows like -1/r for small r.
+    Below r = 1/40, y = -1/r to within exp(-40), which also avoids underflow.
+    """
+
+    r = np.exp(u)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = np.where(r < 1/40, -1/r, np.log(hx.lmtd_delta(np.maximum(r, 1/40), np.ones_like(u))))
+    return y*r/(1 + r)
+
+def _lmtd_log_ratio(table, u):
+    """Interpolates y = ln(delta/delta_known) at log ratios u within range"""
+
+    r = np.exp(u)
+    return _linear(table, u)*(1 + r)/r
+
+def build_tables(path = None):
+    """Builds every table, measures its error bound and saves them
+
+    The files are written to a temporary directory which is then renamed, so
+    processes building at the same time never see a partial set. Existing
+    tables are renamed aside first and deleted after the new ones are in place.
+
+    Args:
+        path (str): Directory of the tables. Defaults to default_path().
+
+    Returns:
+        dict: The metadata, error bounds included.
+    """
+
+    path = path or default_path()
+    metadata = _metadata()
+    s = np.linspace(0, _s_max(), NTU_POINTS)
+    c_r = np.linspace(0, 1, C_R_POINTS)
+    s_mid = (s[:-1] + s[1:])/2
+    c_r_mid = (c_r[:-1] + c_r[1:])/2
+    tables, bounds = {}, {}
+    for hx_type in FLOWS:
+        table = _epsilon_exact(s[:, None], c_r[None, :], hx_type)
+        tables["epsilon_" + hx_type] = table
+        error = 0.0
+        for s_check, c_check in ((s_mid, c_r), (s, c_r_mid), (s_mid, c_r_mid)):
+            s_grid, c_grid = np.meshgrid(s_check, c_check, indexing='ij')
+            exact = _epsilon_exact(s_grid, c_grid, hx_type)
+            error = max(error, float(np.max(np.abs(_bilinear(table, s_grid, c_grid) - exact))))
+        bounds[hx_type] = error
+    u = np.linspace(-LMTD_LOG_RATIO_MAX, LMTD_LOG_RATIO_MAX, LMTD_POINTS)
+    tables["lmtd_inverse"] = _lmtd_exact(u)
+    u_mid = (u[:-1] + u[1:])/2
+    # An absolute error in y = ln(delta/delta_known) is a relative error in delta
+    exact = _lmtd_exact(u_mid)*(1 + np.exp(u_mid))/np.exp(u_mid)
+    bounds["lmtd_inverse"] = float(np.max(np.abs(np.expm1(_lmtd_log_ratio(tables["lmtd_inverse"], u_mid) - exact))))
+    metadata["error_bound"] = bounds
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".surrogate-")
+    try:
+        for key, table in tables.items():
+            np.save(os.path.join(staging, key + ".npy"), table)
+        with open(os.path.join(staging, METADATA_FILE), 'w') as f:
+            json.dump(metadata, f, indent=1)
+        # Old tables are renamed aside before they are deleted, like evicted cache
+        # entries, so path never holds a partly deleted set
+        old = staging + "-old"
+        try:
+            os.rename(path, old)
+        except OSError:
+            # No old tables, or another process moved them first
+            pass
+        try:
+            os.rename(staging, path)
+        except OSError:
+            # Another process installed its tables first
+            shutil.rmtree(staging, ignore_errors=True)
+        shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    _loaded.pop(os.path.abspath(path), None)
+    return metadata
+
+def load_tables(path = None, build = True):
+    """Memory-maps the tables, building them first when they are missing or stale
+
+    Loaded tables are kept for the life of the process.
+
+    Args:
+        path (str): Directory of the tables. Defaults to default_path().
+        build (bool): Build missing or stale tables instead of raising.
+
+    Returns:
+        dict: The metadata and the read-only table arrays under their names.
+    """
+
+    path = os.path.abspath(path or default_path())
+    if path in _loaded:
+        return _loaded[path]
+    metadata = None
+    try:
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if metadata is None or any(metadata.get(key) != value for key, value in _metadata().items()):
+        if not build:
+            raise ValueError("No current surrogate tables in " + path)
+        build_tables(path)
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            metadata = json.load(f)
+    tables = dict(metadata)
+    for key in ["epsilon_" + hx_type for hx_type in FLOWS] + ["lmtd_inverse"]:
+        tables[key] = np.load(os.path.join(path, key + ".npy"), mmap_mode='r')
+    _loaded[path] = tables
+    return tables
+
+def error_bound(hx_type, path = None):
+    """Returns the measured error bound of a table
+
+    Args:
+        hx_type (str): parallel, counter or shell for the absolute error in epsilon,
+            lmtd_inverse for the relative error of lmtd_delta.
+        path (str): Directory of the tables. Defaults to default_path().
+
+    Returns:
+        float: The bound.
+    """
+
+    return load_tables(path)["error_bound"][hx_type]
+
+def epsilon_ntu(ntu, c_min, c_max, hx_type = 'parallel', path = None):
+    """Table counterpart of HX_analyze.epsilon_ntu_array
+
+    Args:
+        ntu, c_min, c_max, hx_type: See HX_analyze.epsilon_ntu_array.
+        path (str): Directory of the tables. Defaults to default_path().
+
+    Returns:
+        numpy.ndarray (x2): The effectiveness values (NaN where invalid) and the boolean error mask.
+    """
+
+    if hx_type not in FLOWS:
+        raise ValueError("An invalid HX type was given.")
+    table = load_tables(path)["epsilon_" + hx_type]
+    ntu, c_min, c_max = np.broadcast_arrays(np.asarray(ntu, dtype=np.float64),
+                                            np.asarray(c_min, dtype=np.float64),
+                                            np.asarray(c_max, dtype=np.float64))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c_r = c_min/c_max
+        inside = (ntu >= 0) & (ntu <= NTU_MAX) & (c_r >= 0) & (c_r <= 1)
+    invalid = np.zeros(ntu.shape, dtype=bool)
+    if np.all(inside):
+        return _bilinear(table, ntu/(1 + ntu), c_r), invalid
+    epsilon = np.empty(ntu.shape)
+    epsilon[inside] = _bilinear(table, ntu[inside]/(1 + ntu[inside]), c_r[inside])
+    outside = ~inside
+    epsilon[outside], invalid[outside] = hx.epsilon_ntu_array(ntu[outside], c_min[outside], c_max[outside], hx_type)
+    return epsilon, invalid
+
+def lmtd_delta(lmtd, delta_known, path = None):
+    """Table counterpart of HX_analyze.lmtd_delta
+
+    Args:
+        lmtd, delta_known: See HX_analyze.lmtd_delta.
+        path (str): Directory of the tables. Defaults to default_path().
+
+    Returns:
+        numpy.ndarray: The unknown end temperature difference, NaN where no positive solution exists.
+    """
+
+    table = load_tables(path)["lmtd_inverse"]
+    lmtd, delta_known = np.broadcast_arrays(np.asarray(lmtd, dtype=np.float64),
+                                            np.asarray(delta_known, dtype=np.float64))
+    valid = (lmtd > 0) & (delta_known > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        u = np.log(lmtd/delta_known)
+    inside = valid & (np.abs(u) <= LMTD_LOG_RATIO_MAX)
+    delta = np.full(lmtd.shape, np.nan)
+    delta[inside] = delta_known[inside]*np.exp(_lmtd_log_ratio(table, u[inside]))
+    outside = valid & ~inside
+    if np.any(outside):
+        delta[outside] = hx.lmtd_delta(lmtd[outside], delta_known[outside])
+    return delta
+
+def main():
+    pass
+
+if __name__ == "__main__":
+    main()
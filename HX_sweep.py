@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+try:
+    from . import HX_analyze as hx
+    from . import HX_boundary_cond as bc
+except ImportError:
+    import HX_analyze as hx
+    import HX_boundary_cond as bc
+
+# Streaming evaluation of large fin/tube design grids. The grid is never built
+# in full; designs are generated and evaluated one fixed-size chunk at a time.
+
+DEFAULT_MAX_BYTES = 64*2**20
+
+# Rough number of float64 temporaries alive per design while a chunk is evaluated
+_TEMPORARIES_PER_POINT = 12
+
+
+def chunk_size_for_budget(dtype, max_bytes = DEFAULT_MAX_BYTES):
+    """Computes how many designs fit in one chunk for a given memory budget
+
+    Args:
+        dtype (numpy.dtype): Structured dtype of the parameter records.
+        max_bytes (int): Memory budget for one chunk in bytes.
+
+    Returns:
+        int: The number of designs per chunk.
+    """
+
+    bytes_per_point = dtype.itemsize + _TEMPORARIES_PER_POINT*np.dtype(np.float64).itemsize
+    return max(1, int(max_bytes)//bytes_per_point)
+
+def iter_chunks(total, chunk_size):
+    """Splits the flat design index space into consecutive ranges
+
+    Args:
+        total (int): The number of designs in the grid.
+        chunk_size (int): The number of designs per chunk.
+
+    Returns:
+        generator: (start, stop) pairs covering [0, total).
+    """
+
+    if chunk_size < 1:
+        raise ValueError("A positive chunk size is required")
+    for start in range(0, total, chunk_size):
+        yield start, min(start + chunk_size, total)
+
+def shard_range(total, index, count):
+    """Returns the flat index range of one of count deterministic, near-equal shards
+
+    Args:
+        total (int): The number of designs in the grid.
+        index (int): The shard, from 0 to count - 1.
+        count (int): The number of shards.
+
+    Returns:
+        tuple: (start, stop) of the shard.
+    """
+
+    if count < 1 or not 0 <= index < count:
+        raise ValueError("An invalid shard was given")
+    return index*total//count, (index + 1)*total//count
+
+def _sweep_chunks(axes, chunk_size, shard):
+    total = hx.grid_size(axes)
+    start, stop = (0, total) if shard is None else shard_range(total, *shard)
+    for low, high in iter_chunks(stop - start, chunk_size):
+        yield start + low, start + high
+
+def iter_fin_sweep(temp_lmtd, name, chunk_size = None, max_bytes = DEFAULT_MAX_BYTES, shard = None):
+    """Yields (params, q) blocks of a finned HX sweep
+
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        chunk_size (int): Designs per block. Derived from max_bytes when not given.
+        max_bytes (int): Memory budget for one block in bytes.
+        shard (tuple): (index, count) to sweep only that shard of the grid, see shard_range.
+
+    Returns:
+        generator: Structured FIN_PARAM_DTYPE arrays and the matching q arrays.
+    """
+
+    inputs = bc.resolve_inputs(name)
+
+    axes = hx.fin_design_axes(inputs)
+    if chunk_size is None:
+        chunk_size = chunk_size_for_budget(hx.FIN_PARAM_DTYPE, max_bytes)
+    for start, stop in _sweep_chunks(axes, chunk_size, shard):
+        params, ua, _, _ = hx.fin_ua_grid(inputs, start, stop)
+        yield params, ua*temp_lmtd
+
+def iter_tube_sweep(temp_lmtd, name, chunk_size = None, max_bytes = DEFAULT_MAX_BYTES, shard = None):
+    """Yields (params, q) blocks of a tubed HX sweep
+
+    Args:
+        temp_lmtd (int, float): The value of the log mean temperature difference.
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        chunk_size (int): Designs per block. Derived from max_bytes when not given.
+        max_bytes (int): Memory budget for one block in bytes.
+        shard (tuple): (index, count) to sweep only that shard of the grid, see shard_range.
+
+    Returns:
+        generator: Structured TUBE_PARAM_DTYPE arrays and the matching q arrays.
+    """
+
+    inputs = bc.resolve_inputs(name)
+
+    axes = hx.tube_design_axes(inputs)
+    if chunk_size is None:
+        chunk_size = chunk_size_for_budget(hx.TUBE_PARAM_DTYPE, max_bytes)
+    for start, stop in _sweep_chunks(axes, chunk_size, shard):
+        params, ua = hx.tube_ua_grid(inputs, start, stop)
+        yield params, ua*temp_lmtd
+
+
+def top_k_indices(values, k, ties = True):
+    """Finds the indices of the k largest values in one pass
+
+    Args:
+        values (numpy.ndarray): The values to rank.
+        k (int): Number of values to select.
+        ties (bool): Also select every value equal to the k-th largest.
+
+    Returns:
+        numpy.ndarray: Indices sorted by descending value, equal values by index.
+        NaN values are never selected.
+    """
+
+    values = np.asarray(values)
+    if k < 1:
+        raise ValueError("A positive k is required")
+    if values.dtype.kind in 'fc' and np.isnan(values).any():
+        valid = np.flatnonzero(~np.isnan(values))
+        return valid[top_k_indices(values[valid], k, ties)] if len(valid) else valid
+    if k < len(values):
+        threshold = np.partition(values, len(values) - k)[len(values) - k]
+        above = np.flatnonzero(values > threshold)
+        equal = np.flatnonzero(values == threshold)
+        if not ties:
+            equal = equal[:k - len(above)]
+        index = np.concatenate((above, equal))
+    else:
+        index = np.arange(len(values))
+    return index[np.argsort(-values[index], kind='stable')]
+
+
+class TopK:
+    """Keeps the k designs with the largest q seen so far
+    
+    With ties, designs equal to the k-th largest q are kept as well.
+    """
+
+    def __init__(self, k, ties = False):
+        if k < 1:
+            raise ValueError("A positive k is required")
+        self.k = k
+        self.ties = ties
+        self.q = np.empty(0)
+        self.params = None
+
+    def update(self, params, q):
+        """Merges one (params, q) block into the running state"""
+
+        if self.params is None:
+            self.params = params[:0]
+        q = np.concatenate((self.q, q))
+        params = np.concatenate((self.params, params))
+        keep = np.sort(top_k_indices(q, self.k, self.ties))
+        self.q = q[keep]
+        self.params = params[keep]
+
+    def result(self):
+        """Returns the kept (params, q) sorted by descending q, ties in stream order"""
+
+        order = np.argsort(-self.q, kind='stable')
+        return self.params[order], self.q[order]
+
+
+class MinMax:
+    """Tracks the smallest and largest q and the designs they belong to, ignoring NaN"""
+
+    def __init__(self):
+        self.min = np.inf
+        self.max = -np.inf
+        self.min_params = None
+        self.max_params = None
+        self.count = 0
+
+    def update(self, params, q):
+        """Merges one (params, q) block into the running state"""
+
+        if len(q) == 0:
+            return
+        if np.isnan(q).all():
+            # NaN designs are never the min or max, but they were evaluated
+            self.count += len(q)
+            return
+        i_min = np.nanargmin(q)
+        i_max = np.nanargmax(q)
+        if q[i_min] < self.min:
+            self.min = q[i_min]
+            self.min_params = params[i_min]
+        if q[i_max] > self.max:
+            self.max = q[i_max]
+            self.max_params = params[i_max]
+        self.count += len(q)
+
+    def result(self):
+        """Returns (min, min_params, max, max_params)"""
+
+        return self.min, self.min_params, self.max, self.max_params
+
+
+class Histogram:
+    """Accumulates a fixed-bin histogram of q
+
+    The bin edges must be known before the stream starts. Values outside the
+    edges are counted in underflow and overflow.
+    """
+
+    def __init__(self, bins, range):
+        self.edges = np.histogram_bin_edges([], bins=bins, range=range)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def update(self, params, q):
+        """Merges one (params, q) block into the running state"""
+
+        counts, _ = np.histogram(q, bins=self.edges)
+        self.counts += counts
+        self.underflow += int(np.count_nonzero(q < self.edges[0]))
+        self.overflow += int(np.count_nonzero(q > self.edges[-1]))
+
+    def result(self):
+        """Returns (counts, edges)"""
+
+        return self.counts, self.edges
+
+
+def reduce_sweep(blocks, *reducers):
+    """Feeds every (params, q) block of a sweep to the given reducers
+
+    Args:
+        blocks (iterable): (params, q) blocks, e.g. from iter_fin_sweep.
+        reducers: Objects with an update(params, q) method.
+
+    Returns:
+        tuple: The reducers, after consuming the whole stream.
+    """
+
+    for params, q in blocks:
+        for reducer in reducers:
+            reducer.update(params, q)
+    return reducers
+
+def main():
+    pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+try:
+    from . import HX_analyze as hx
+    from . import HX_boundary_cond as bc
+    from . import HX_sweep as sweep
+except ImportError:
+    import HX_analyze as hx
+    import HX_boundary_cond as bc
+    import HX_sweep as sweep
+
+# Monte Carlo propagation of input tolerances to q and the outlet temperatures of
+# one design. The distributions are declared in the deck,
+#
+#     uncertainty:
+#       h_cold: {distribution: normal, scale: 1}
+#       wall_k: {distribution: uniform, low: 190, high: 210}
+#       fin_length: {distribution: triangular, left: .038, right: .042}
+#
+# with loc (normal) and mode (triangular) defaulting to the nominal value. The
+# samples are drawn and evaluated chunk by chunk, and every statistic is
+# accumulated on the fly, so memory does not grow with the number of samples.
+
+DISTRIBUTIONS = {
+    "normal": ("loc", "scale"),
+    "uniform": ("low", "high"),
+    "triangular": ("left", "mode", "right"),
+}
+
+NTU_KEYS = ("mass_flow_rate_hot", "spec_heat_hot", "mass_flow_rate_cold", "spec_heat_cold")
+
+MODELS = ('lmtd', 'ntu')
+
+PERCENTILES = (5, 50, 95)
+
+# Bins of the histogram percentiles are estimated from when the samples do not fit in memory
+PERCENTILE_BINS = 2**16
+
+# Rough number of float64 values alive per sample while a chunk is evaluated
+_TEMPORARIES_PER_SAMPLE = 32
+
+
+def nominal_values(name, params, model = 'lmtd'):
+    """Collects the nominal value of every model input for one design
+
+    Args:
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        params (numpy.void): The FIN_PARAM_DTYPE or TUBE_PARAM_DTYPE design record.
+        model (str): lmtd or ntu. The ntu model also needs the NTU_KEYS in the deck.
+
+    Returns:
+        dict: input name -> nominal value.
+    """
+
+    if model not in MODELS:
+        raise ValueError("An invalid model was given. Please select lmtd or ntu.")
+    inputs = bc.resolve_inputs(name)
+    values = {key: float(inputs[key]) for key in bc.SCALAR_KEYS}
+    values.update((key, float(params[key])) for key in params.dtype.names)
+    if model == 'ntu':
+        missing = [key for key in NTU_KEYS if key not in inputs]
+        if missing:
+            raise ValueError("Missing required inputs: " + ", ".join(missing))
+        values.update((key, float(inputs[key])) for key in NTU_KEYS)
+    return values
+
+def read_distributions(name, nominal):
+    """Reads the input distributions declared under uncertainty in the deck
+
+    Args:
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        nominal (dict): The nominal values, see nominal_values.
+
+    Returns:
+        dict: input name -> (distribution, dict of numpy.random.Generator arguments).
+    """
+
+    declared = bc.resolve_inputs(name).get("uncertainty") or {}
+    distributions = {}
+    for key, spec in declared.items():
+        if key not in nominal:
+            raise ValueError("Uncertainty is given for an unknown input: " + key)
+        spec = dict(spec)
+        distribution = spec.pop("distribution", "normal")
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError("An invalid distribution was given for " + key +
+                             ". Please select " + ", ".join(DISTRIBUTIONS) + ".")
+        arguments = DISTRIBUTIONS[distribution]
+        if distribution == "normal":
+            spec.setdefault("loc", nominal[key])
+        elif distribution == "triangular":
+            spec.setdefault("mode", nominal[key])
+        if sorted(spec) != sorted(arguments):
+            raise ValueError("The " + distribution + " distribution of " + key + " needs " + ", ".join(arguments))
+        distributions[key] = (distribution, {arg: float(spec[arg]) for arg in arguments})
+    return distributions
+
+def evaluate(values, design = 'fin', model = 'lmtd', flow = 'counter'):
+    """Evaluates q (and for the ntu model the outlet temperatures) for arrays of inputs
+
+    Args:
+        values (dict): input name -> value or array of samples, see nominal_values.
+        design (str): fin or tube.
+        model (str): lmtd uses the four deck temperatures, ntu the inlet temperatures,
+            mass flow rates and specific heats.
+        flow (str): parallel or counter.
+
+    Returns:
+        dict: output name -> array, NaN where a sample is invalid.
+    """
+
+    v = values
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        if design == 'fin':
+            ua = hx.fin_ua(v["num_fins"], v["fin_length"], v["fin_width"], v["fin_thickness"], v["h_cold"],
+                           v["area_cold"], v["h_hot"], v["area_hot"], v["wall_k"], v["wall_thickness"])[0]
+        elif design == 'tube':
+            ua = hx.tube_ua(v["num_tubes"], v["tube_length"], v["tube_outer_diameter"], v["tube_thickness"],
+                            v["h_cold"], v["area_cold"], v["h_hot"], v["area_hot"], v["wall_k"])
+        else:
+            raise ValueError("An invalid design was given. Please select fin or tube.")
+
+        if model == 'lmtd':
+            lmtd, _ = hx.log_mean_temp_diff_array(v["hot_temp_in"], v["hot_temp_out"], v["cold_temp_in"],
+                                                  v["cold_temp_out"], flow)
+            return {"q": ua*lmtd}
+        if model != 'ntu':
+            raise ValueError("An invalid model was given. Please select lmtd or ntu.")
+        c_hot = np.multiply(v["mass_flow_rate_hot"], v["spec_heat_hot"])
+        c_cold = np.multiply(v["mass_flow_rate_cold"], v["spec_heat_cold"])
+        c_min, _ = hx.c_min_array(v["mass_flow_rate_hot"], v["spec_heat_hot"], v["mass_flow_rate_cold"], v["spec_heat_cold"])
+        c_max, _ = hx.c_max_array(v["mass_flow_rate_hot"], v["spec_heat_hot"], v["mass_flow_rate_cold"], v["spec_heat_cold"])
+        epsilon, _ = hx.epsilon_ntu_array(ua/c_min, c_min, c_max, flow)
+        q, _ = hx.q_ntu_array(epsilon, c_min, v["hot_temp_in"], v["cold_temp_in"])
+        return {"q": q, "temp_hot_out": v["hot_temp_in"] - q/c_hot, "temp_cold_out": v["cold_temp_in"] + q/c_cold}
+
+def _generators(seed, count):
+    """One generator per input, so the samples do not depend on the chunk size"""
+
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(count)]
+
+def _iter_samples(nominal, distributions, samples, chunk_size, seed):
+    generators = _generators(seed, len(distributions))
+    for start, stop in sweep.iter_chunks(samples, chunk_size):
+        values = dict(nominal)
+        for generator, (key, (distribution, arguments)) in zip(generators, distributions.items()):
+            values[key] = getattr(generator, distribution)(size=stop - start, **arguments)
+        yield values, stop - start
+
+def monte_carlo(name, samples, design = 'fin', model = 'lmtd', flow = 'counter', params = None, seed = None,
+                chunk_size = None, max_bytes = sweep.DEFAULT_MAX_BYTES, percentiles = PERCENTILES):
+    """Propagates the deck's input distributions to the outputs of one design
+
+    Sensitivity indices are squared standardized regression coefficients: the
+    share of the output variance explained linearly by each input. They are
+    close to first order Sobol indices for the nearly linear response to small
+    tolerances, and r_squared (about their sum for independent inputs) shows how well the linear model holds.
+
+    Percentiles are exact when every output sample fits in max_bytes. Otherwise
+    the samples are drawn a second time (from the same seed) into a histogram of
+    PERCENTILE_BINS bins, which bounds the error by the output range/PERCENTILE_BINS.
+
+    Args:
+        name (str, HXInputs): name of the input file, or preloaded inputs.
+        samples (int): Number of samples.
+        design (str): fin or tube.
+        model (str): lmtd or ntu, see evaluate.
+        flow (str): parallel or counter.
+        params (numpy.void): The design record. Defaults to the deck design with the largest UA.
+        seed (int): Seed of the random number generators.
+        chunk_size (int): Samples per chunk. Derived from max_bytes when not given.
+        max_bytes (int): Memory budget for one chunk in bytes.
+        percentiles (tuple): Percentiles to report.
+
+    Returns:
+        dict: The number of samples and of invalid samples, and for every output its
+        mean, std, percentiles, sensitivity indices and r_squared.
+    """
+
+    inputs = bc.resolve_inputs(name)
+    # Fixed once, so the second pass of the histogram percentiles draws the same samples
+    seed = np.random.SeedSequence(seed).entropy
+    if params is None:
+        if design == 'fin':
+            grid_params, ua, _, _ = hx.fin_ua_cached(inputs)
+        elif design == 'tube':
+            grid_params, ua = hx.tube_ua_cached(inputs)
+        else:
+            raise ValueError("An invalid design was given. Please select fin or tube.")
+        params = grid_params[np.nanargmax(ua)]
+    nominal = nominal_values(inputs, params, model)
+    distributions = read_distributions(inputs, nominal)
+    keys = list(distributions)
+    if chunk_size is None:
+        chunk_size = max(1, int(max_bytes)//(8*(len(keys) + _TEMPORARIES_PER_SAMPLE)))
+
+    def blocks():
+        for values, size in _iter_samples(nominal, distributions, samples, chunk_size, seed):
+            outputs = {key: np.broadcast_to(value, (size,)) for key, value in
+                       evaluate(values, design, model, flow).items()}
+            x = np.column_stack([np.broadcast_to(values[key], (size,)) for key in keys] or [np.empty((size, 0))])
+            valid = np.logical_and.reduce([np.isfinite(value) for value in outputs.values()])
+            yield x[valid], {key: value[valid] for key, value in outputs.items()}, size
+
+    exact = samples*(len(keys) + 3)*8 <= max_bytes
+    gram, shift, kept, low, high = {}, {}, {}, {}, {}
+    invalid = 0
+    for x, outputs, size in blocks():
+        invalid += size - len(x)
+        for output, y in outputs.items():
+            z = np.column_stack((x, y))
+            if output not in shift and len(z):
+                shift[output] = z.mean(axis=0)
+            z = np.column_stack((np.ones(len(z)), z - shift.get(output, 0)))
+            gram[output] = gram.get(output, 0) + z.T @ z
+            if exact:
+                kept.setdefault(output, []).append(y)
+            elif len(y):
+                low[output] = min(low.get(output, np.inf), y.min())
+                high[output] = max(high.get(output, -np.inf), y.max())
+
+    if not exact:
+        counts = {output: np.zeros(PERCENTILE_BINS, dtype=np.int64) for output in low}
+        for x, outputs, size in blocks():
+            for output in counts:
+                counts[output] += np.histogram(outputs[output], PERCENTILE_BINS, (low[output], high[output]))[0]
+
+    report = {"samples": int(samples), "invalid": invalid, "outputs": {}}
+    for output, matrix in gram.items():
+        if output not in shift:
+            continue
+        stats = _moments(matrix, shift[output], keys)
+        if exact:
+            values = np.concatenate(kept[output])
+            stats["percentiles"] = dict(zip(percentiles, np.percentile(values, percentiles).tolist()))
+        else:
+            stats["percentiles"] = _histogram_percentiles(counts[output], low[output], high[output], percentiles)
+        report["outputs"][output] = stats
+    return report
+
+def _moments(gram, shift, keys):
+    """Mean, std and regression based sensitivity indices from the accumulated [1, x, y] products"""
+
+    n = gram[0, 0]
+    mean = gram[0, 1:]/n
+    cov = gram[1:, 1:]/n - np.outer(mean, mean)
+    k = len(keys)
+    var_y = cov[k, k]
+    stats = {"mean": float(mean[k] + shift[k]), "std": float(np.sqrt(max(var_y, 0)))}
+    sensitivity = dict.fromkeys(keys, 0.0)
+    r_squared = 0.0
+    if k and var_y > 0:
+        cov_xx, cov_xy = cov[:k, :k], cov[:k, k]
+        beta = np.linalg.lstsq(cov_xx, cov_xy, rcond=None)[0]
+        src = beta*np.sqrt(np.diag(cov_xx)/var_y)
+        sensitivity = dict(zip(keys, (src**2).tolist()))
+        r_squared = float(beta @ cov_xy/var_y)
+    stats["sensitivity"] = sensitivity
+    stats["r_squared"] = r_squared
+    return stats
+
+def _histogram_percentiles(counts, low, high, percentiles):
+    total = counts.sum()
+    if total == 0:
+        return {}
+    edges = np.linspace(low, high, len(counts) + 1)
+    cumulative = np.concatenate(([0], np.cumsum(counts)))
+    values = np.interp(np.asarray(percentiles, dtype=np.float64)/100*total, cumulative, edges)
+    return dict(zip(percentiles, values.tolist()))
+
+def main():
+    pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+# pytest-benchmark suite. It is not collected by a plain pytest run, run it with
+#
+#     pytest bench_HX.py --benchmark-autosave
+#     pytest bench_HX.py --benchmark-compare --benchmark-compare-fail=mean:25%
+#
+# HX_bench.py covers the 10^6 point decks and peak memory without the plugin.
+
+import pytest
+from . import HX_bench as bench
+
+pytest.importorskip("pytest_benchmark")
+
+SIZES = (10**2, 10**4)
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("name", sorted(bench.BENCHMARKS))
+def test_benchmark(benchmark, name, size):
+    """Times one analysis function on a synthetic deck and records its throughput"""
+    inputs = bench.synthetic_inputs(size)
+    points = bench.hx.grid_size(bench.hx.fin_design_axes(inputs))
+    
+    evaluated = benchmark(bench.BENCHMARKS[name], inputs, points)
+    benchmark.extra_info["points"] = evaluated
+    benchmark.extra_info["points_per_second"] = evaluated/benchmark.stats.stats.mean
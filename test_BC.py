@@ -18,3 +18,56 @@ def test_read():
     """Tests the input parameters for proper reading in of the file"""
     inputs = bc.read_bc("input_single.yaml")
     assert inputs["case"] == "example"
+
+def test_inputs_object():
+    """Tests that the parsed inputs object exposes the input values"""
+    inputs = bc.load_inputs("input_single.yaml")
+    assert inputs.h_hot == 150
+    assert inputs["num_fins"] == (25,)
+    assert inputs.get("num_tubes") is None
+    assert bc.set_temp_boundary_conditions(inputs) == (300, 250, 200, 220)
+
+def test_inputs_immutable():
+    """Tests that the parsed inputs object can not be modified"""
+    inputs = bc.load_inputs("input_single.yaml")
+    with pytest.raises(AttributeError):
+        inputs.h_hot = 1
+
+def test_inputs_nested_extras():
+    """Tests that editing nested extras of read_bc leaves the cached deck unchanged"""
+    values = bc.read_bc("input_uncertainty.yaml")
+    values["uncertainty"]["h_cold"]["scale"] = 99
+    
+    assert bc.read_bc("input_uncertainty.yaml")["uncertainty"]["h_cold"]["scale"] == 1
+
+def test_inputs_cache():
+    """Tests that an input file is parsed only once while it is unchanged"""
+    bc.clear_input_cache()
+    assert bc.load_inputs("input_single.yaml") is bc.load_inputs("input_single.yaml")
+
+def test_inputs_missing():
+    """Tests that inputs missing a required value are rejected"""
+    values = bc.read_bc("input_single.yaml")
+    del values["h_cold"]
+    with pytest.raises(ValueError):
+        bc.resolve_inputs(values)
+
+def test_inputs_design_list():
+    """Tests that design parameters must be lists of numbers"""
+    values = bc.read_bc("input_single.yaml")
+    values["num_fins"] = 25
+    with pytest.raises(ValueError):
+        bc.resolve_inputs(values)
+
+def test_cases():
+    """Tests that a multi-case deck gives one input set per case, grouped by geometry"""
+    cases = bc.load_cases("input_cases.yaml")
+    
+    assert [inputs.case for inputs in cases] == ["nominal", "summer", "winter", "high_flow"]
+    assert cases[1].cold_temp_in == 35 and cases[1].hot_temp_in == 300
+    assert bc.load_cases("input_single.yaml")[0] == bc.load_inputs("input_single.yaml")
+    plan = bc.plan_cases(cases)
+    assert [names for _, names, _ in plan] == [["nominal", "summer", "winter"], ["high_flow"]]
+    assert plan[0][2][2] == (300, 150, 0, 100)
+    with pytest.raises(ValueError):
+        bc.load_cases({"cases": [{"case": "a"}, {"case": "a"}]})
@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
 
-#import numpy as np
+import os
+import subprocess
+import sys
+import numpy as np
 import pytest
 from . import HX_analyze as hx
-#import HX_boundary_cond
+from . import HX_boundary_cond as bc
+
+# Seconds allowed for a cold import of HX_analyze, numpy included
+IMPORT_TIME_BUDGET = 2.0
 
 def test_lmtd_counter():
     """Tests the LMTD for counter flow heat exchangers"""
@@ -198,4 +204,215 @@ def test_fin_conditions_counter():
     test, _ = hx.q_fin(hx.log_mean_temp_diff_counter(300,250,200,220),name)
     
     assert test == pytest.approx((114.13982986,114.13982986,114.13982986,114.13982986,
-                            114.13982986,114.13982986,114.13982986,114.13982986))
\ No newline at end of file
+                            114.13982986,114.13982986,114.13982986,114.13982986))
+
+def test_q_fin_grid():
+    """Tests that the vectorized finned HX sweep matches the scalar reference"""
+    name = "input.yaml"
+    
+    reference, variables = hx.q_fin(hx.log_mean_temp_diff_counter(300,150,20,120),name)
+    q, ua, eta_not_cold, eta_not_hot, params = hx.q_fin_grid(hx.log_mean_temp_diff_counter(300,150,20,120),name)
+    
+    assert q == pytest.approx(reference, rel=1e-12)
+    assert [list(p) for p in params.tolist()] == variables
+    assert params.dtype == hx.FIN_PARAM_DTYPE
+    assert ua.shape == eta_not_cold.shape == eta_not_hot.shape == q.shape
+
+def test_q_tube_grid():
+    """Tests that the vectorized tubed HX sweep matches the scalar reference"""
+    name = "input.yaml"
+    
+    reference, variables = hx.q_tube(hx.log_mean_temp_diff_parallel(300,150,20,120),name)
+    q, ua, params = hx.q_tube_grid(hx.log_mean_temp_diff_parallel(300,150,20,120),name)
+    
+    assert q == pytest.approx(reference, rel=1e-12)
+    assert [list(p) for p in params.tolist()] == variables
+    assert q.flags.c_contiguous
+
+def test_q_fin_preloaded():
+    """Tests that q_fin gives the same result for a file name and preloaded inputs"""
+    name = "input_single.yaml"
+    lmtd = hx.log_mean_temp_diff_parallel(300,250,200,220)
+    
+    assert hx.q_fin(lmtd, bc.load_inputs(name)) == hx.q_fin(lmtd, name)
+
+def test_lmtd_delta():
+    """Tests that the numeric LMTD inversion reproduces the specified LMTD"""
+    lmtd = np.array([0.5, 10, 100, 1000])
+    delta = hx.lmtd_delta(lmtd, 40)
+    
+    assert (delta - 40)/np.log(delta/40) == pytest.approx(lmtd, rel=1e-10)
+    assert hx.lmtd_delta(40, 40) == pytest.approx(40)
+    
+def test_lmtd_delta_invalid():
+    """Tests that the numeric LMTD inversion flags inputs without a solution"""
+    assert np.isnan(hx.lmtd_delta(-10, 40))
+    
+def test_temp_lmtd_solver_backends():
+    """Tests that the numeric and sympy backends of the temperature lmtd solvers agree"""
+    for temp_type in ("hot_in", "hot_out", "cold_in", "cold_out"):
+        assert hx.temp_lmtd_solver_counter(100, 210, 100, 10, 60, temp_type = temp_type) == pytest.approx(
+                hx.temp_lmtd_solver_counter(100, 210, 100, 10, 60, temp_type = temp_type, backend = 'sympy'), rel=1e-10)
+        assert hx.temp_lmtd_solver_parallel(100, 210, 100, 10, 60, temp_type = temp_type) == pytest.approx(
+                hx.temp_lmtd_solver_parallel(100, 210, 100, 10, 60, temp_type = temp_type, backend = 'sympy'), rel=1e-10)
+    
+def test_temp_lmtd_solver_array():
+    """Tests the temperature lmtd solver for an array of LMTD values"""
+    lmtd = np.array([50, 100])
+    test = hx.temp_lmtd_solver_counter(lmtd, 210, 0, 10, 60, temp_type = "hot_out")
+    
+    assert test == pytest.approx([hx.temp_lmtd_solver_counter(50, 210, 0, 10, 60, temp_type = "hot_out", backend = 'sympy'),
+                                  hx.temp_lmtd_solver_counter(100, 210, 0, 10, 60, temp_type = "hot_out", backend = 'sympy')])
+    
+def test_linear_solvers_array():
+    """Tests the NTU temperature solver and the lmtd solver for arrays"""
+    assert hx.temp_ntu_solver(np.array([900, 450]), 10, 1, 100, 0, 'cold') == pytest.approx([10, 55])
+    assert hx.lmtd_solver(np.array([100, 50]), 1, 2) == pytest.approx([50, 25])
+    
+def test_solver_backend_invalid():
+    """Tests the solvers for an incorrect backend"""
+    with pytest.raises(ValueError):
+        hx.lmtd_solver(100, 1, 1, backend = 'maple')
+
+def test_c_min_max_array():
+    """Tests the array minimum and maximum c values and their error masks"""
+    c_min, invalid_min = hx.c_min_array(np.array([10, 1, 0]), 10, np.array([1, 10, 1]), 1)
+    c_max, invalid_max = hx.c_max_array(np.array([10, 1, 0]), 10, np.array([1, 10, 1]), 1)
+    
+    assert c_min[:2] == pytest.approx([1, 10])
+    assert c_max[:2] == pytest.approx([100, 10])
+    assert list(invalid_min) == list(invalid_max) == [False, False, True]
+    assert np.isnan(c_min[2])
+    
+def test_epsilon_ntu_array():
+    """Tests that the array effectiveness matches the scalar effectiveness for all HX types"""
+    ntu = np.array([0.5, 2, 10])
+    c_min = np.array([0.01, 0.5, 1])
+    for hx_type in ('parallel', 'counter', 'shell'):
+        test, invalid = hx.epsilon_ntu_array(ntu, c_min, 1, hx_type)
+        assert not invalid.any()
+        assert test == pytest.approx([hx.epsilon_ntu(n, c, 1, hx_type) for n, c in zip(ntu, c_min)])
+    
+def test_epsilon_ntu_array_invalid():
+    """Tests that invalid counter flow elements are masked instead of raised"""
+    test, invalid = hx.epsilon_ntu_array(np.array([10, 10]), np.array([2, 0.5]), 1, 'counter')
+    
+    assert list(invalid) == [True, False]
+    assert np.isnan(test[0])
+    assert test[1] == pytest.approx(hx.epsilon_ntu(10, 0.5, 1, 'counter'))
+    
+def test_q_ntu_array():
+    """Tests the array maximum q and q values for the NTU method"""
+    q_max, _ = hx.q_max_ntu_array(np.array([.1, .2]), 100, 10)
+    q, invalid = hx.q_ntu_array(np.array([.5, np.nan]), 1, 100, 10)
+    
+    assert q_max == pytest.approx([9, 18])
+    assert q[0] == 45
+    assert list(invalid) == [False, True]
+
+def test_import_light():
+    """Tests that importing the analysis module stays cheap and does not load sympy or matplotlib"""
+    code = ("import sys, time; start = time.perf_counter(); import HX_analyze; "
+            "print(time.perf_counter() - start, 'sympy' in sys.modules, 'matplotlib' in sys.modules, 'yaml' in sys.modules)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)), 
+                         stdout=subprocess.PIPE, check=True).stdout.split()
+    
+    assert out[1:] == [b"False", b"False", b"False"]
+    assert float(out[0]) < IMPORT_TIME_BUDGET
+
+def test_kernel_tables_shared():
+    """Tests that counter and parallel flow sweeps of one deck share the fin tables and UA grid"""
+    hx.clear_kernel_cache()
+    inputs = bc.load_inputs("input.yaml")
+    hx.q_fin_grid(hx.log_mean_temp_diff_counter(300,150,20,120), inputs)
+    hx.q_fin_grid(hx.log_mean_temp_diff_parallel(300,150,20,120), inputs)
+    
+    assert hx.fin_factor_table.cache_info().misses == 2
+    assert hx._fin_ua_cached.cache_info().hits == 1
+    assert not hx.fin_factor_table(10, 200, (.02,), (1,), (.002,)).flags.writeable
+
+def test_ua_cache_invalidation():
+    """Tests that only a change of the geometry or flow inputs recomputes the UA grid"""
+    hx.clear_ua_cache()
+    values = bc.read_bc("input.yaml")
+    q, ua = hx.q_fin_grid(50, bc.HXInputs(values))[:2]
+    hotter = bc.HXInputs(dict(values, hot_temp_in = 400))
+    assert np.array_equal(hx.q_fin_grid(100, hotter)[0], 2*q)
+    assert hx._fin_ua_cached.cache_info().misses == 1
+    assert not ua.flags.writeable
+    
+    hx.q_fin_grid(50, bc.HXInputs(dict(values, h_cold = 20)))
+    assert hx._fin_ua_cached.cache_info().misses == 2
+    assert hx._fin_ua_cached.cache_info().bytes == 2*sum(a.nbytes for a in hx.fin_ua_cached(bc.HXInputs(values)))
+    
+    hx.set_ua_cache_limit(0)
+    hx.q_fin_grid(50, bc.HXInputs(values))
+    hx.q_fin_grid(50, bc.HXInputs(values))
+    assert hx._fin_ua_cached.cache_info().misses == 2
+    assert hx._fin_ua_cached.cache_info().bytes == 0
+    hx.set_ua_cache_limit()
+    
+    q, params = hx.q_tube_scenarios([50, 100], "input.yaml")
+    assert q.shape == (2, len(params))
+    assert np.array_equal(q[1], hx.q_tube_grid(100, "input.yaml")[0])
+
+def test_ua_grid_slices():
+    """Tests that slices of the cached-table kernels match the broadcast kernels"""
+    inputs = bc.load_inputs("input.yaml")
+    params, ua, eta_not_cold, eta_not_hot = hx.fin_ua_grid(inputs, 10, 40)
+    
+    assert np.array_equal(params, hx.product_params(hx.fin_design_axes(inputs), hx.FIN_PARAM_DTYPE, 10, 40))
+    assert np.array_equal(ua, hx.fin_ua_params(params, inputs)[0])
+    params, ua = hx.tube_ua_grid(inputs, 5, 25)
+    assert np.array_equal(ua, hx.tube_ua_params(params, inputs))
+
+def test_ua_jacobian():
+    """Tests the analytic Jacobians against central finite differences"""
+    inputs = bc.load_inputs("input.yaml")
+    q, jacobian, params = hx.q_fin_sensitivity(50, inputs)
+    assert np.array_equal(q, hx.q_fin_grid(50, inputs)[0])
+    q_tube, jacobian_tube, params_tube = hx.q_tube_sensitivity(50, inputs)
+    assert np.allclose(q_tube, hx.q_tube_grid(50, inputs)[0])
+    assert jacobian_tube.shape == (len(params_tube), len(hx.TUBE_SENSITIVITY_KEYS))
+    
+    designs = [(jacobian, params, hx.FIN_SENSITIVITY_KEYS, lambda p, i: hx.fin_ua_params(p, i)[0]),
+               (jacobian_tube, params_tube, hx.TUBE_SENSITIVITY_KEYS, hx.tube_ua_params)]
+    for jacobian, params, keys, ua_params in designs:
+        for column, key in enumerate(keys):
+            if key in params.dtype.names:
+                step = params[key]*1e-6
+                up = params.astype([(field, np.float64) for field in params.dtype.names])
+                down = up.copy()
+                up[key] += step
+                down[key] -= step
+                fd = (ua_params(up, inputs) - ua_params(down, inputs))*50/(2*step)
+            else:
+                step = inputs[key]*1e-6
+                up = bc.HXInputs(dict(bc.read_bc(inputs), **{key: inputs[key] + step}))
+                down = bc.HXInputs(dict(bc.read_bc(inputs), **{key: inputs[key] - step}))
+                fd = (ua_params(params, up) - ua_params(params, down))*50/(2*step)
+            assert np.allclose(jacobian[:, column], fd, rtol = 1e-5), key
+
+def test_design_axes_counts():
+    """Tests that design counts which are not whole or do not fit the int32 field are rejected"""
+    values = bc.read_bc("input.yaml")
+    for key, design_axes in (("num_fins", hx.fin_design_axes), ("num_tubes", hx.tube_design_axes)):
+        assert design_axes(bc.HXInputs(dict(values, **{key: [1, 2**31 - 1]})))[0] == (1, 2**31 - 1)
+        for counts in ([10, 2.5], [2**31], [-2**31 - 1], [float("nan")]):
+            with pytest.raises(ValueError):
+                design_axes(bc.HXInputs(dict(values, **{key: counts})))
+    
+    with pytest.raises(ValueError):
+        hx.q_fin_grid(100, bc.HXInputs(dict(values, num_fins = [20.5])))
+
+def test_q_cases():
+    """Tests that every case of a deck matches a separate run with its temperatures"""
+    results = hx.q_fin_cases("input_cases.yaml", 'parallel')
+    
+    assert list(results) == ["nominal", "summer", "winter", "high_flow"]
+    for inputs in bc.load_cases("input_cases.yaml"):
+        temps = bc.set_temp_boundary_conditions(inputs)
+        q, _, _, _, params = hx.q_fin_grid(hx.log_mean_temp_diff_parallel(*temps), inputs)
+        assert np.allclose(results[inputs.case][0], q, rtol = 1e-14)
+        assert np.array_equal(results[inputs.case][1], params)
+    assert len(hx.q_tube_cases("input_cases.yaml")["winter"][0]) == 16
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+import json
+import pytest
+from . import HX_analyze as hx
+from . import HX_batch as batch
+
+def test_analyze_deck():
+    """Tests the analysis of a single deck"""
+    record = batch.analyze_deck("input_single.yaml")
+    
+    assert record["status"] == "ok"
+    assert record["fin_parallel"]["designs"] == [[25, .008, 1, .001]]
+    assert "tube_counter" not in record
+
+def test_run_batch_ordered():
+    """Tests that a failing deck does not stop the batch and that order is kept"""
+    names = ["input_single.yaml", "missing.yaml", "input_test.yaml"]
+    records = list(batch.run_batch(names, workers = 2))
+    
+    assert [r["deck"] for r in records] == names
+    assert [r["status"] for r in records] == ["ok", "error", "ok"]
+
+def test_main_output(tmp_path):
+    """Tests that the batch entry point writes one record per deck"""
+    output = str(tmp_path / "results.jsonl")
+    
+    assert batch.main(["input_single.yaml", "input_lmtd.yaml", "--unordered", "-j", "2", "-o", output]) == 0
+    with open(output) as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(r["deck"] for r in records) == ["input_lmtd.yaml", "input_single.yaml"]
+
+def test_batch_cases():
+    """Tests that a multi-case deck gives one record per case"""
+    record = batch.analyze_deck("input_cases.yaml")
+    
+    assert record["status"] == "ok"
+    assert list(record["cases"]) == ["nominal", "summer", "winter", "high_flow"]
+    assert record["cases"]["winter"]["lmtd_counter"] == pytest.approx(hx.log_mean_temp_diff_counter(300,150,0,100))
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+
+from . import HX_bench as bench
+
+def test_synthetic_inputs():
+    """Tests the size of the synthetic benchmark decks"""
+    inputs = bench.synthetic_inputs(10**4)
+    
+    assert bench.hx.grid_size(bench.hx.fin_design_axes(inputs)) == 10**4
+    assert bench.hx.grid_size(bench.hx.tube_design_axes(inputs)) == 10**4
+
+def test_run_benchmarks():
+    """Tests that every benchmark produces a throughput and memory record"""
+    records = bench.run_benchmarks([100], repeat = 1)
+    
+    assert sorted(r["name"] for r in records) == sorted(bench.BENCHMARKS)
+    assert all(r["points_per_second"] > 0 and r["peak_bytes"] >= 0 for r in records)
+
+def test_compare(tmp_path):
+    """Tests that the comparison flags throughput and memory regressions beyond the tolerance"""
+    path = str(tmp_path / "baseline.json")
+    old = [{"name": "q_fin_grid", "size": 100, "points_per_second": 1000., "peak_bytes": 100}]
+    bench.write_baseline(old, path)
+    with open(path) as f:
+        baseline = bench.json.load(f)
+    
+    assert bench.compare([{"name": "q_fin_grid", "size": 100, "points_per_second": 800., "peak_bytes": 120}], 
+                         baseline, .25) == []
+    assert len(bench.compare([{"name": "q_fin_grid", "size": 100, "points_per_second": 500., "peak_bytes": 200}], 
+                             baseline, .25)) == 2
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import multiprocessing
+
+import numpy as np
+from . import HX_analyze as hx
+from . import HX_boundary_cond as bc
+from . import HX_cache as cache
+
+def _fill(path):
+    cache.q_tube_grid(50, "input.yaml", cache.ResultCache(path))
+
+def test_cache_hits(tmp_path):
+    """Tests that repeated evaluations hit the cache and return the uncached results memory-mapped"""
+    name = "input.yaml"
+    results = cache.ResultCache(str(tmp_path))
+    
+    first = cache.q_fin_grid(50, name, results)
+    second = cache.q_fin_grid(50, name, results)
+    assert results.stats()["hits"] == 1 and results.stats()["misses"] == 1
+    assert isinstance(second[0], np.memmap)
+    for value, expected in zip(second, hx.q_fin_grid(50, name)):
+        assert np.array_equal(value, expected)
+    
+    # Another case name and different temperatures share the geometry entry
+    values = bc.read_bc(name)
+    values.update(case="renamed", hot_temp_in=values["hot_temp_in"] + 1)
+    cache.q_fin_grid(50, values, results)
+    assert results.stats()["hits"] == 2
+    cache.q_fin_grid(50, dict(values, h_cold=values["h_cold"] + 1), results)
+    assert results.stats()["misses"] == 2
+    
+    q = cache.q_lmtd_counter(300, 150, 20, 120, name, cache=results)
+    assert q == hx.q_lmtd_counter(300, 150, 20, 120, name)
+    assert cache.q_lmtd_counter(300, 150, 20, 120, name, cache=results) == q
+    epsilon, invalid = cache.epsilon_ntu_array(np.linspace(0, 5, 11), 1, 2, 'counter', cache=results)
+    assert np.array_equal(epsilon, hx.epsilon_ntu_array(np.linspace(0, 5, 11), 1, 2, 'counter')[0])
+
+def test_cache_eviction(tmp_path):
+    """Tests that the least recently used entries are evicted past the size bound"""
+    results = cache.ResultCache(str(tmp_path), max_bytes=1)
+    
+    cache.q_fin_grid(50, "input.yaml", results)
+    cache.q_tube_grid(50, "input.yaml", results)
+    assert results.stats()["entries"] == 1
+    assert results.stats()["evictions"] == 1
+    cache.q_tube_grid(50, "input.yaml", results)
+    assert results.stats()["hits"] == 1
+
+def test_cache_processes(tmp_path):
+    """Tests that processes storing the same entry concurrently leave one complete entry"""
+    workers = [multiprocessing.Process(target=_fill, args=(str(tmp_path),)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    
+    results = cache.ResultCache(str(tmp_path))
+    assert results.stats()["entries"] == 1
+    q = cache.q_tube_grid(50, "input.yaml", results)[0]
+    assert results.stats()["hits"] == 1
+    assert np.array_equal(q, hx.q_tube_grid(50, "input.yaml")[0])
+
+def test_cache_put_evicted(tmp_path, monkeypatch):
+    """Tests that a store whose entry is evicted at once by another process still returns its arrays"""
+    results = cache.ResultCache(str(tmp_path))
+    monkeypatch.setattr(results, "evict", lambda keep = None: results.clear())
+    
+    q = cache.q_tube_grid(50, "input.yaml", results)[0]
+    assert results.stats()["entries"] == 0
+    assert np.array_equal(q, hx.q_tube_grid(50, "input.yaml")[0])
+    assert len(cache.code_version()) == 64
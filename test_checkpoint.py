@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+from . import HX_checkpoint as ckpt
+from . import HX_results as hxr
+
+def test_checkpoint_resume(tmp_path):
+    """Tests that an interrupted and resumed sweep gives the output of an uninterrupted one"""
+    name = "input.yaml"
+    path = str(tmp_path / "fin")
+    
+    _, _, _, completed = ckpt.checkpointed_sweep(50, name, path, 'fin', chunk_size=7, interval=0, max_chunks=3)
+    assert completed == [(0, 21)]
+    assert ckpt.load_checkpoint(path)[1] == [(0, 21)]
+    
+    result, top, extremes, completed = ckpt.checkpointed_sweep(50, name, path, 'fin', resume=True, chunk_size=5)
+    serial = hxr.SweepResult.fin(50, name)
+    assert completed == [(0, len(serial))]
+    for key, value in serial.columns.items():
+        assert np.array_equal(result.column(key), value)
+    assert np.array_equal(top.result()[1], serial.top_k(ckpt.TOP_K).q)
+    assert np.array_equal(top.result()[0], serial.top_k(ckpt.TOP_K).params)
+    assert extremes.result()[2] == serial.q.max()
+    assert extremes.result()[3] == serial.params[np.argmax(serial.q)]
+
+def test_checkpoint_hash(tmp_path):
+    """Tests that resuming a checkpoint of another deck is rejected"""
+    path = str(tmp_path / "tube")
+    
+    ckpt.checkpointed_sweep(50, "input.yaml", path, 'tube', max_chunks=0)
+    with pytest.raises(ValueError):
+        ckpt.checkpointed_sweep(60, "input.yaml", path, 'tube', resume=True)
+
+def test_remaining_ranges():
+    """Tests the ranges left by a set of completed ranges"""
+    assert ckpt.remaining_ranges([(5, 8), (0, 2)], 10) == [(2, 5), (8, 10)]
+    assert ckpt.remaining_ranges([], 4) == [(0, 4)]
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+import json
+import pstats
+from . import HX_analyze as hx
+from . import HX_boundary_cond as bc
+from . import HX_instrument as hxi
+
+def test_disabled():
+    """Tests that nothing is recorded while instrumentation is off"""
+    hxi.reset()
+    hx.q_fin_grid(50, "input.yaml")
+    
+    assert not hxi.enabled()
+    assert hxi.report() == {}
+
+def test_instrument_stages():
+    """Tests the calls, points and parsing stages recorded inside an instrument block"""
+    bc.clear_input_cache()
+    hx.clear_kernel_cache()
+    with hxi.instrument() as report:
+        hx.q_fin_grid(50, "input.yaml")
+        hx.q_fin_grid(50, "input.yaml")
+        hx.lmtd_solver(100, 1, 1, backend = 'sympy')
+    stats = report()
+    
+    assert stats["q_fin_grid"]["calls"] == 2
+    assert stats["q_fin_grid"]["points"] == 270
+    assert stats["fin_ua_grid"]["points"] == 135
+    assert stats["fin_factor_table"]["calls"] == 2
+    assert stats["load_inputs"]["calls"] == 2
+    assert stats["parse_inputs"]["calls"] == 1
+    assert stats["sympy_solve"]["calls"] == 1
+    assert "q_fin_grid" in hxi.summary()
+    assert not hxi.enabled()
+
+def test_exporters(tmp_path):
+    """Tests the JSON lines and cProfile exporters"""
+    lines = str(tmp_path / "stages.jsonl")
+    profile = str(tmp_path / "run.prof")
+    with hxi.instrument(hxi.JsonLinesExporter(lines), hxi.CProfileExporter(profile)):
+        hx.q_tube_grid(50, "input.yaml")
+    with open(lines) as f:
+        records = [json.loads(line) for line in f]
+    
+    assert records[0]["stage"] in ("load_inputs", "wall_resistance_table", "tube_ua_grid")
+    assert records[-1]["report"]["q_tube_grid"]["points"] == 90
+    assert pstats.Stats(profile).total_calls > 0
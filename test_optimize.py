@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+from . import HX_analyze as hx
+from . import HX_boundary_cond as bc
+from . import HX_optimize as opt
+
+def test_optimize_fin_unconstrained():
+    """Tests that the unconstrained finned HX optimum is the largest design of the deck"""
+    q, _, _, _, _ = hx.q_fin_grid(100, "input.yaml")
+    result = opt.optimize(100, "input.yaml", 'fin')
+    
+    assert result.converged
+    assert result.q == pytest.approx(q.max())
+    assert result.params["num_fins"] == 100
+    assert result.evaluations < hx.grid_size(hx.fin_design_axes(bc.resolve_inputs("input.yaml")))
+
+def test_optimize_tube_volume():
+    """Tests that the tubed HX optimum respects the volume limit and matches the grid"""
+    q, _, params = hx.q_tube_grid(100, "input.yaml")
+    volume = opt.tube_volume(params)
+    max_volume = np.median(volume)
+    result = opt.optimize(100, "input.yaml", 'tube', max_volume = max_volume)
+    
+    assert result.volume <= max_volume
+    assert result.q >= q[volume <= max_volume].max()*(1 - 1e-4)
+    assert float(result.params["num_tubes"]).is_integer()
+    
+    result = opt.optimize(100, "input.yaml", 'tube')
+    assert result.evaluations < hx.grid_size(hx.tube_design_axes(bc.resolve_inputs("input.yaml")))
+
+def test_optimize_infeasible():
+    """Tests that a constraint no design can meet is reported"""
+    with pytest.raises(ValueError):
+        opt.optimize(100, "input.yaml", 'fin', max_volume = 0)
+
+def test_pareto_front():
+    """Tests that the pareto front increases in both volume and q"""
+    volume, q, params = opt.pareto_front(100, "input.yaml", [1e-3, 1e-2, 2e-2, 5e-2], 'fin')
+    
+    assert len(volume) == len(q) == len(params) > 1
+    assert np.all(np.diff(volume) > 0)
+    assert np.all(np.diff(q) > 0)
+    
+    front = opt.pareto_front(100, "input.yaml", [0, 1e-3, 1e-2, 2e-2, 5e-2], 'fin')
+    assert np.array_equal(front[0], volume) and np.array_equal(front[1], q)
+    assert len(opt.pareto_front(100, "input.yaml", [0], 'fin')[0]) == 0
+    with pytest.raises(ValueError):
+        opt.pareto_front(100, "input.yaml", [1e-2], 'plate')
+
+def test_objective_gradient():
+    """Tests that the objective gradient matches finite differences of the objective"""
+    fun = opt.objective(100, "input.yaml", 'tube')
+    x = np.array([40, .6, .03, .004])
+    value, gradient = fun(x)
+    
+    assert value == pytest.approx(-100*hx.tube_ua(40, .6, .03, .004, 10, 2.75, 150, 2.75, 200))
+    for column in range(len(x)):
+        step = np.zeros(len(x))
+        step[column] = x[column]*1e-6
+        fd = (fun(x + step)[0] - fun(x - step)[0])/(2*step[column])
+        assert gradient[column] == pytest.approx(fd, rel = 1e-5)
+    assert fun(np.stack([x, x]))[1].shape == (2, 4)
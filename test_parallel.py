@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+from . import HX_parallel as par
+from . import HX_results as hxr
+
+def _assert_same(result, serial):
+    assert list(result.columns) == list(serial.columns)
+    for key, value in serial.columns.items():
+        assert np.array_equal(result.column(key), value)
+
+def test_parallel_threads():
+    """Tests that a threaded sweep matches the serial fin and tube sweeps exactly"""
+    name = "input.yaml"
+    
+    _assert_same(par.parallel_sweep(50, name, 'fin', workers=3, chunk_size=7), hxr.SweepResult.fin(50, name))
+    _assert_same(par.parallel_sweep(50, name, 'tube', workers=3, chunk_size=7), hxr.SweepResult.tube(50, name))
+
+def test_parallel_processes(tmp_path):
+    """Tests that worker processes fill a memory-mapped result identical to the serial sweep"""
+    name = "input.yaml"
+    
+    result = par.parallel_sweep(50, name, 'fin', path=str(tmp_path / "fin"), workers=2,
+                                backend='process', chunk_size=10)
+    _assert_same(result, hxr.SweepResult.fin(50, name))
+    _assert_same(hxr.SweepResult.load(str(tmp_path / "fin")), hxr.SweepResult.fin(50, name))
+
+def test_parallel_invalid():
+    """Tests that an invalid backend, design or a process sweep without a path is rejected"""
+    with pytest.raises(ValueError):
+        par.parallel_sweep(50, "input.yaml", backend='gpu')
+    with pytest.raises(ValueError):
+        par.parallel_sweep(50, "input.yaml", design='plate')
+    with pytest.raises(ValueError):
+        par.parallel_sweep(50, "input.yaml", backend='process')
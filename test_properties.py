@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+from . import HX_analyze as hx
+from . import HX_batch as batch
+from . import HX_boundary_cond as bc
+from . import HX_properties as hxp
+from . import HX_segment as seg
+
+def write_water(path):
+    with open(path, 'w') as f:
+        f.write("temperature,cp,k,mu,rho\n")
+        f.write("0,4217,0.561,1.79e-3,999.8\n")
+        f.write("100,4216,0.679,2.82e-4,958.4\n")
+        f.write("300,4400,0.700,1e-4,800\n")
+
+def test_table_lookup(tmp_path):
+    """Tests the piecewise-linear lookup, clamping and the NPZ round trip"""
+    path = str(tmp_path / "water.csv")
+    write_water(path)
+    table = hxp.load_table(path)
+    values = table.lookup(np.array([-10, 50, 200, 400]))
+    
+    assert table.names == ("cp", "k", "mu", "rho")
+    assert values["cp"] == pytest.approx([4217, 4216.5, 4308, 4400])
+    assert table("rho", 150) == pytest.approx(958.4 - 158.4/4)
+    assert np.array_equal(table.function("k")(values["k"]*0 + 100), [.679]*4)
+    assert not table.temperature.flags.writeable
+    
+    hxp.save_table(table, str(tmp_path / "water.npz"))
+    copy = hxp.load_table(str(tmp_path / "water.npz"))
+    assert np.array_equal(copy("mu", [25, 250]), table("mu", [25, 250]))
+
+def test_table_cache(tmp_path):
+    """Tests that a table is read once and re-read after the file changes"""
+    hxp.clear_table_cache()
+    path = str(tmp_path / "water.csv")
+    write_water(path)
+    assert hxp.load_table(path) is hxp.load_table(path)
+    assert hxp._load_table_cached.cache_info().misses == 1
+    with pytest.raises(ValueError):
+        hxp.PropertyTable([0, 0], {"cp": [1, 2]})
+
+def test_deck_properties(tmp_path):
+    """Tests the tables named in a deck and their use by the segment model"""
+    path = str(tmp_path / "water.csv")
+    write_water(path)
+    values = dict(bc.read_bc("input.yaml"), properties = {"hot": path, "cold": path})
+    inputs = bc.HXInputs(values)
+    
+    assert hxp.deck_properties(inputs, 'cold')["cp"] == pytest.approx(4216.3)
+    params = hx.product_params(hx.fin_design_axes(inputs), hx.FIN_PARAM_DTYPE)
+    result = seg.march(params, inputs, .5, None, .8, None)
+    assert result.converged.all()
+    with pytest.raises(ValueError):
+        hxp.deck_table("input.yaml", 'hot')
+
+def test_deck_relative_table(tmp_path, monkeypatch):
+    """Tests that relative table paths are read from the deck's directory, whatever the working directory"""
+    deck = tmp_path / "deck"
+    deck.mkdir()
+    write_water(str(deck / "water.csv"))
+    with open("input.yaml") as f:
+        text = f.read()
+    (deck / "input.yaml").write_text(text + "\nproperties:\n  hot: water.csv\n  cold: water.csv\n")
+    monkeypatch.chdir(tmp_path)
+    
+    inputs = bc.load_inputs(str(deck / "input.yaml"))
+    assert inputs.source == str(deck / "input.yaml")
+    assert "source" not in bc.read_bc(inputs)
+    assert hxp.deck_table(inputs, 'hot')("cp", 50) == pytest.approx(4216.5)
+    assert hxp.deck_table(bc.load_cases(str(deck / "input.yaml"))[0], 'cold').names[0] == "cp"
+
+def test_mean_properties(tmp_path):
+    """Tests that the opt-in property path evaluates h and wall_k at the mean stream temperatures"""
+    with open(str(tmp_path / "fluid.csv"), 'w') as f:
+        f.write("temperature,cp,h\n0,4217,5\n400,4400,25\n")
+    with open(str(tmp_path / "wall.csv"), 'w') as f:
+        f.write("temperature,k\n0,100\n400,300\n")
+    with open("input.yaml") as f:
+        text = f.read()
+    deck = str(tmp_path / "input.yaml")
+    with open(deck, 'w') as f:
+        f.write(text + "\nproperties:\n  hot: fluid.csv\n  cold: fluid.csv\n  wall: wall.csv\n")
+    inputs = bc.load_inputs(deck)
+    tabulated = hxp.mean_properties(inputs)
+    
+    assert tabulated.h_hot == pytest.approx(5 + 20*hxp.mean_temperature(inputs, 'hot')/400)
+    assert tabulated.h_cold == pytest.approx(5 + 20*hxp.mean_temperature(inputs, 'cold')/400)
+    assert tabulated.wall_k == pytest.approx(100 + 200*hxp.mean_temperature(inputs, 'wall')/400)
+    assert hxp.mean_properties("input.yaml") is bc.load_inputs("input.yaml")
+    
+    q = hx.q_fin_grid(100, inputs)[0]
+    q_tabulated = hx.q_fin_grid(100, inputs, properties = True)[0]
+    assert not np.allclose(q, q_tabulated)
+    assert np.array_equal(q_tabulated, hx.q_fin_grid(100, tabulated)[0])
+    assert not np.allclose(hx.q_tube_grid(100, inputs)[0], hx.q_tube_grid(100, inputs, properties = True)[0])
+    
+    record = batch.analyze_deck(deck)
+    record_tabulated = batch.analyze_deck(deck, properties = True)
+    assert record_tabulated["fin_counter"]["q_max"] != pytest.approx(record["fin_counter"]["q_max"])
+    assert record_tabulated["fin_counter"]["q_max"] == pytest.approx(float(q_tabulated.max())*
+           hx.log_mean_temp_diff_counter(*bc.set_temp_boundary_conditions(inputs))/100)
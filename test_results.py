@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+from . import HX_results as hxr
+from . import HX_sweep as sweep
+
+def test_argmax_ties():
+    """Tests that argmax returns every design with the largest q"""
+    result = hxr.SweepResult.fin(50, "input_test.yaml")
+    
+    assert list(result.argmax()) == list(range(len(result)))
+
+def test_getitem_scalar():
+    """Tests that an integer index gives a one-design result like the matching slice"""
+    result = hxr.SweepResult.fin(50, "input.yaml")
+    
+    for index in (3, np.int64(3), -1):
+        item = result[index]
+        assert isinstance(item, hxr.SweepResult)
+        assert len(item) == 1
+        assert np.array_equal(item.params, result[index:index + 1 or None].params)
+        assert item.q[0] == result.q[index]
+    with pytest.raises(IndexError):
+        result[len(result)]
+
+def test_top_k():
+    """Tests the top k designs against a full sort"""
+    result = hxr.SweepResult.fin(50, "input.yaml")
+    top = result.top_k(5, ties = False)
+    
+    assert len(top) == 5
+    assert np.array_equal(top.q, np.sort(result.q)[::-1][:5])
+    assert np.array_equal(top.column("ua")*50, top.q)
+
+def test_top_k_ties():
+    """Tests that designs tied with the k-th best are kept"""
+    values = np.array([1., 3., 2., 3., 2., 0.])
+    
+    assert list(sweep.top_k_indices(values, 2)) == [1, 3]
+    assert list(sweep.top_k_indices(values, 3)) == [1, 3, 2, 4]
+    assert list(sweep.top_k_indices(values, 3, ties = False)) == [1, 3, 2]
+
+def test_top_k_nan():
+    """Tests that NaN values are skipped instead of hiding the valid designs"""
+    values = np.array([1., np.nan, 2., 3.])
+    
+    assert list(sweep.top_k_indices(values, 1)) == [3]
+    assert list(sweep.top_k_indices(values, 2)) == [3, 2]
+    assert list(sweep.top_k_indices(values, 5)) == [3, 2, 0]
+    assert len(sweep.top_k_indices(np.array([np.nan]), 1)) == 0
+    
+    result = hxr.SweepResult(np.zeros(4, dtype=[("num_fins", np.int32)]), values)
+    assert list(result.argmax()) == [3]
+    top = sweep.TopK(2)
+    top.update(result.params, values)
+    assert np.array_equal(top.result()[1], [3., 2.])
+
+def test_top_k_by_field():
+    """Tests ranking by a design parameter field"""
+    result = hxr.SweepResult.tube(50, "input.yaml")
+    
+    assert np.all(result.top_k(1, by = "num_tubes").params["num_tubes"] == 100)
+
+def test_top_k_stream():
+    """Tests that the chunked top k matches the in-memory top k"""
+    result = hxr.SweepResult.tube(50, "input.yaml")
+    streamed = hxr.top_k_stream(sweep.iter_tube_sweep(50, "input.yaml", chunk_size = 4), 7)
+    
+    assert np.array_equal(streamed.q, result.top_k(7).q)
+    assert np.array_equal(streamed.params, result.top_k(7).params)
+
+def test_columns_typed():
+    """Tests that results are stored as typed, contiguous columns"""
+    result = hxr.SweepResult.fin(50, "input.yaml")
+    
+    assert result.column("num_fins").dtype == np.int32
+    assert result.column("fin_length").dtype == np.float64
+    assert result.q.flags.c_contiguous
+
+def test_save_load_directory(tmp_path):
+    """Tests writing a result as .npy columns and memory-mapping it back"""
+    result = hxr.SweepResult.tube(50, "input.yaml")
+    result.save(str(tmp_path / "tube"))
+    loaded = hxr.SweepResult.load(str(tmp_path / "tube"))
+    
+    assert isinstance(loaded.q, np.memmap)
+    assert np.array_equal(loaded.params, result.params)
+    assert np.array_equal(loaded.column("ua"), result.column("ua"))
+
+def test_save_load_npz(tmp_path):
+    """Tests writing a result as a single .npz archive"""
+    result = hxr.SweepResult.fin(50, "input.yaml")
+    result.save(str(tmp_path / "fin.npz"))
+    loaded = hxr.SweepResult.load(str(tmp_path / "fin.npz"))
+    
+    assert list(loaded.columns) == list(result.columns)
+    assert np.array_equal(loaded.params, result.params)
+
+def test_create_write(tmp_path):
+    """Tests filling a memory-mapped result block by block"""
+    path = str(tmp_path / "stream")
+    full = hxr.SweepResult.fin(50, "input.yaml")
+    result = hxr.SweepResult.create(path, len(full), full.params.dtype)
+    start = 0
+    for params, q in sweep.iter_fin_sweep(50, "input.yaml", chunk_size = 20):
+        result.write(start, params, q = q)
+        start += len(q)
+    result.flush()
+    
+    assert np.array_equal(hxr.SweepResult.load(path).q, full.q)
+
+def test_to_csv(tmp_path):
+    """Tests the CSV export of a small result"""
+    path = str(tmp_path / "single.csv")
+    hxr.SweepResult.fin(50, "input_single.yaml").to_csv(path)
+    with open(path) as f:
+        lines = f.read().splitlines()
+    
+    assert lines[0] == "num_fins,fin_length,fin_width,fin_thickness,q,ua,eta_not_cold,eta_not_hot"
+    assert lines[1].startswith("25,0.008,1.0,0.001,")
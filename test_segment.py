@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+from . import HX_analyze as hx
+from . import HX_boundary_cond as bc
+from . import HX_segment as seg
+
+def test_segment_constant_properties():
+    """Tests that the segment model matches the epsilon-NTU method for constant properties"""
+    inputs = bc.load_inputs("input.yaml")
+    c_hot, c_cold = .5*1000, .8*4000
+    for design, ua in (('fin', hx.fin_ua_cached(inputs)[1]), ('tube', hx.tube_ua_cached(inputs)[1])):
+        for flow in seg.FLOWS:
+            result, params = seg.march_grid(inputs, .5, 1000, .8, 4000, design, flow, segments = 5)
+            epsilon, _ = hx.epsilon_ntu_array(ua/c_hot, c_hot, c_cold, flow)
+            
+            assert result.converged.all()
+            assert len(params) == len(result)
+            assert result.q == pytest.approx(epsilon*c_hot*280, rel = 1e-9)
+            assert result.temp_hot_out == pytest.approx(300 - result.q/c_hot)
+
+def test_segment_temperature_dependent():
+    """Tests the energy balance and boundary temperatures with temperature dependent properties"""
+    inputs = bc.load_inputs("input.yaml")
+    params = hx.product_params(hx.fin_design_axes(inputs), hx.FIN_PARAM_DTYPE)[::10]
+    spec_heat_hot = lambda temp: 1000 + temp
+    result = seg.march(params, inputs, .5, spec_heat_hot, .8, 4000, flow = 'counter', 
+                       h_hot = lambda temp: 100 + temp/6, profiles = True)
+    
+    assert result.temp_hot.shape == (seg.SEGMENTS + 1, len(params))
+    assert result.temp_cold[-1] == pytest.approx(20)
+    assert np.array_equal(result.temp_cold[0], result.temp_cold_out)
+    drop = .5*spec_heat_hot(result.temp_hot[:-1])*-np.diff(result.temp_hot, axis = 0)
+    assert drop.sum(axis = 0) == pytest.approx(result.q)
+    
+    fine = seg.march(params, inputs, .5, spec_heat_hot, .8, 4000, flow = 'counter', 
+                     segments = 4*seg.SEGMENTS, h_hot = lambda temp: 100 + temp/6)
+    assert fine.q == pytest.approx(result.q, rel = 1e-2)
+
+def test_segment_errors():
+    """Tests that invalid flows and segment counts are reported"""
+    params = hx.product_params(hx.fin_design_axes(bc.load_inputs("input.yaml")), hx.FIN_PARAM_DTYPE)
+    with pytest.raises(ValueError):
+        seg.march(params, "input.yaml", 1, 1000, 1, 4000, flow = 'shell')
+    with pytest.raises(ValueError):
+        seg.march(params, "input.yaml", 1, 1000, 1, 4000, segments = 0)
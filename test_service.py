@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import asyncio
+import concurrent.futures
+import threading
+
+import numpy as np
+import pytest
+from . import HX_analyze as hx
+from . import HX_boundary_cond as bc
+from . import HX_service as service
+
+@pytest.fixture(scope="module")
+def address():
+    """Runs a service on a free port in a background thread"""
+    loop = asyncio.new_event_loop()
+    server = service.Service(window=0.05)
+    server.warm(["input.yaml"])
+    host, port = loop.run_until_complete(server.start(port=0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield host, port
+    loop.call_soon_threadsafe(server.close)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+def _fin(num_fins):
+    return {"num_fins": num_fins, "fin_length": .04, "fin_width": 1, "fin_thickness": .004}
+
+def test_service_batching(address):
+    """Tests that concurrent single-point queries are answered correctly in shared batches"""
+    inputs = bc.load_inputs("input.yaml")
+    lmtd = hx.log_mean_temp_diff_counter(*bc.set_temp_boundary_conditions(inputs))
+    
+    def query(num_fins):
+        client = service.Client(*address)
+        try:
+            return client.q("input.yaml", 'fin', **_fin(num_fins))
+        finally:
+            client.close()
+    with concurrent.futures.ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(query, range(20, 36)))
+    
+    params = np.array([tuple(_fin(n).values()) for n in range(20, 36)], dtype=hx.FIN_PARAM_DTYPE)
+    ua = hx.fin_ua_params(params, inputs)[0]
+    assert np.array_equal([r["ua"] for r in results], ua)
+    assert np.allclose([r["q"] for r in results], ua*lmtd, rtol=1e-14)
+    
+    client = service.Client(*address)
+    metrics = client.metrics()
+    assert metrics["points"] >= 16
+    assert metrics["batches"] < metrics["points"]
+    assert metrics["latency_p99"] >= metrics["latency_p50"] > 0
+
+def test_service_points(address):
+    """Tests a list query with per-point operating conditions and the rejection of invalid queries"""
+    client = service.Client(*address)
+    tube = {"num_tubes": 20, "tube_length": .5, "tube_outer_diameter": .02, "tube_thickness": .002}
+    results = client.q_many([dict(_fin(20), deck="input.yaml", temp_lmtd=50),
+                             dict(tube, deck="input.yaml", design="tube", flow="parallel", hot_temp_in=320)])
+    assert results[0]["temp_lmtd"] == 50
+    inputs = bc.load_inputs("input.yaml")
+    lmtd = hx.log_mean_temp_diff_parallel(320, inputs["hot_temp_out"], inputs["cold_temp_in"], inputs["cold_temp_out"])
+    assert np.isclose(results[1]["temp_lmtd"], lmtd, rtol=1e-14)
+    
+    with pytest.raises(ValueError):
+        client.q("input.yaml", 'fin', num_fins=20)
+    with pytest.raises(ValueError):
+        client.q("missing.yaml", 'fin', **_fin(20))
+    assert client.metrics()["errors"] == 2
+
+def test_service_bad_query(address):
+    """Tests that malformed queries in a batch fail alone and leave the valid ones answered"""
+    good = dict(_fin(20), deck="input.yaml", temp_lmtd=50)
+    
+    def query(point):
+        client = service.Client(*address)
+        try:
+            return client.q_many([point])[0]
+        except ValueError as error:
+            return str(error)
+        finally:
+            client.close()
+    bad = [dict(good, temp_lmtd="abc"), dict(good, deck=["x"]), dict(good, design=["fin"]),
+           dict(good, deck="missing.yaml"), dict(good, num_fins=2**40)]
+    with concurrent.futures.ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(query, [good] + bad + [good]))
+    
+    assert results[0] == results[-1]
+    assert results[0]["q"] == pytest.approx(50*results[0]["ua"])
+    assert all(isinstance(result, str) for result in results[1:-1])
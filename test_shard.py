@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+from . import HX_results as hxr
+from . import HX_shard as shard
+from . import HX_sweep as sweep
+
+def _assert_same(result, serial):
+    assert list(result.columns) == list(serial.columns)
+    for key, value in serial.columns.items():
+        assert np.array_equal(result.column(key), value)
+
+def test_shard_processes(tmp_path):
+    """Tests that worker processes standing in for nodes reproduce the serial sweep and its top-k"""
+    name = "input.yaml"
+    root = str(tmp_path / "sweep")
+    
+    shard.plan_shards(50, name, root, 'fin', shards=7)
+    workers = [multiprocessing.Process(target=shard.run_worker, args=(root, "node" + str(i)),
+                                       kwargs={"chunk_size": 3}) for i in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    
+    assert shard.status(root) == {"pending": 0, "claimed": 0, "done": 7}
+    serial = hxr.SweepResult.fin(50, name)
+    result, top = shard.merge(root, str(tmp_path / "result"), k=5)
+    _assert_same(result, serial)
+    assert np.array_equal(top.q, serial.top_k(5).q)
+    assert np.array_equal(top.params, serial.top_k(5).params)
+
+def test_shard_reclaim(tmp_path):
+    """Tests that the shard of a crashed worker is reclaimed after its lease expires"""
+    name = "input.yaml"
+    root = str(tmp_path / "sweep")
+    
+    shard.plan_shards(50, name, root, 'tube', shards=3)
+    crashed = shard.claim(root, "crashed")
+    assert shard.run_worker(root, "node", lease=None) == [1, 2]
+    with pytest.raises(ValueError):
+        shard.merge(root)
+    
+    claimed = os.path.join(root, shard.CLAIMED, "shard-%05d.crashed.json" % crashed["index"])
+    os.utime(claimed, (0, 0))
+    assert shard.run_worker(root, "node", lease=60) == [0]
+    _assert_same(shard.merge(root), hxr.SweepResult.tube(50, name))
+
+def test_sweep_shard():
+    """Tests that the shards of the streaming sweep cover the grid exactly once"""
+    name = "input.yaml"
+    
+    q = np.concatenate([q for _, q in sweep.iter_fin_sweep(50, name)])
+    shards = [np.concatenate([q for _, q in sweep.iter_fin_sweep(50, name, chunk_size=4, shard=(i, 5))])
+              for i in range(5)]
+    assert np.array_equal(np.concatenate(shards), q)
+    with pytest.raises(ValueError):
+        sweep.shard_range(10, 3, 3)
+
+def test_shard_cli(tmp_path, capsys):
+    """Tests the plan, work and merge commands, with and without printing the best designs"""
+    root = str(tmp_path / "sweep")
+    
+    shard.main(["plan", "input.yaml", root, "--shards", "2"])
+    shard.main(["work", root])
+    capsys.readouterr()
+    shard.main(["merge", root, "--top", "0", "--output", str(tmp_path / "result")])
+    assert capsys.readouterr().out == ""
+    shard.main(["merge", root, "--top", "2"])
+    assert len(capsys.readouterr().out.splitlines()) == 2
+    with pytest.raises(SystemExit):
+        shard.main(["merge", root, "--top", "-1"])
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+import os
+import numpy as np
+import pytest
+from . import HX_analyze as hx
+from . import HX_surrogate as surrogate
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("surrogate") / "tables")
+    surrogate.build_tables(path)
+    return path
+
+def test_epsilon_tables(tables):
+    """Tests that the epsilon tables stay within their error bounds, in and out of range"""
+    rng = np.random.default_rng(0)
+    ntu = np.concatenate((rng.uniform(0, 10, 10000), [0, surrogate.NTU_MAX, 80]))
+    c_min = np.concatenate((rng.uniform(0, 1, 10000), [.5, 1, .5]))
+    for hx_type in surrogate.FLOWS:
+        epsilon, invalid = surrogate.epsilon_ntu(ntu, c_min, 1, hx_type, tables)
+        exact, _ = hx.epsilon_ntu_array(ntu, c_min, 1, hx_type)
+        
+        assert not invalid.any()
+        assert np.max(np.abs(epsilon - exact)) <= surrogate.error_bound(hx_type, tables)*(1 + 1e-9)
+        assert surrogate.error_bound(hx_type, tables) < 1e-4
+    assert surrogate.epsilon_ntu(1, 2, 1, 'counter', tables)[1]
+
+def test_lmtd_table(tables, monkeypatch):
+    """Tests the LMTD inverse table and the table backend of the LMTD solvers"""
+    rng = np.random.default_rng(1)
+    lmtd = rng.uniform(1e-2, 1e3, 10000)
+    delta_known = rng.uniform(1, 100, 10000)
+    delta = surrogate.lmtd_delta(lmtd, delta_known, tables)
+    
+    assert np.max(np.abs(delta/hx.lmtd_delta(lmtd, delta_known) - 1)) <= surrogate.error_bound("lmtd_inverse", tables)*(1 + 1e-9)
+    assert np.isnan(surrogate.lmtd_delta(-1, 10, tables))
+    monkeypatch.setenv(surrogate.ENV_VAR, tables)
+    assert hx.temp_lmtd_solver_counter(hx.log_mean_temp_diff_counter(300,150,20,120), 300, 150, 20, 0, 
+                                       temp_type = "cold_out", backend = 'table') == pytest.approx(120, rel = 1e-6)
+    with pytest.raises(ValueError):
+        hx.temp_lmtd_solver_counter(50, 300, 150, 20, 0, temp_type = "cold_out", backend = 'spline')
+
+def test_tables_memory_mapped(tables):
+    """Tests that saved tables are memory-mapped and stale ones rebuilt"""
+    loaded = surrogate.load_tables(tables)
+    
+    assert isinstance(loaded["epsilon_shell"], np.memmap)
+    assert not loaded["epsilon_shell"].flags.writeable
+    assert surrogate.load_tables(tables) is loaded
+    surrogate._loaded.clear()
+    with open(tables + "/" + surrogate.METADATA_FILE, 'w') as f:
+        f.write('{"version": 0}')
+    with pytest.raises(ValueError):
+        surrogate.load_tables(tables, build = False)
+    assert surrogate.load_tables(tables)["version"] == surrogate.VERSION
+    assert os.listdir(os.path.dirname(tables)) == ["tables"]
+
+def test_ntu_from_epsilon():
+    """Tests that ntu_from_epsilon inverts epsilon_ntu_array"""
+    ntu = np.array([0.01, .5, 2, 6])
+    c_min = np.array([0, .3, .9, 1])
+    for hx_type in surrogate.FLOWS:
+        epsilon, _ = hx.epsilon_ntu_array(ntu, c_min, 1, hx_type)
+        inverse, invalid = hx.ntu_from_epsilon(epsilon, c_min, 1, hx_type)
+        assert not invalid.any()
+        assert inverse == pytest.approx(ntu, rel = 1e-6)
+    assert hx.ntu_from_epsilon(.9, 1, 1, 'parallel')[1]
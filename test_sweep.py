@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+from . import HX_analyze as hx
+from . import HX_sweep as sweep
+
+def test_fin_sweep_chunks():
+    """Tests that the chunked finned HX sweep reproduces the full grid"""
+    name = "input.yaml"
+    
+    q, _, _, _, params = hx.q_fin_grid(50, name)
+    blocks = list(sweep.iter_fin_sweep(50, name, chunk_size=7))
+    
+    assert len(blocks) == int(np.ceil(len(q)/7))
+    assert np.array_equal(np.concatenate([b[1] for b in blocks]), q)
+    assert np.array_equal(np.concatenate([b[0] for b in blocks]), params)
+
+def test_tube_sweep_budget():
+    """Tests that the memory budget bounds the block size of the tubed HX sweep"""
+    name = "input.yaml"
+    
+    chunk_size = sweep.chunk_size_for_budget(hx.TUBE_PARAM_DTYPE, 2000)
+    blocks = list(sweep.iter_tube_sweep(50, name, max_bytes=2000))
+    
+    assert max(len(b[1]) for b in blocks) == chunk_size
+    assert sum(len(b[1]) for b in blocks) == len(hx.q_tube_grid(50, name)[0])
+
+def test_reducers():
+    """Tests the top-k, min/max and histogram reducers against the full grid"""
+    name = "input.yaml"
+    
+    q, _, _, _, params = hx.q_fin_grid(50, name)
+    top, extremes, hist = sweep.reduce_sweep(sweep.iter_fin_sweep(50, name, chunk_size=10),
+                                             sweep.TopK(5), sweep.MinMax(), 
+                                             sweep.Histogram(10, (q.min(), q.max())))
+    
+    top_params, top_q = top.result()
+    assert np.array_equal(top_q, np.sort(q)[::-1][:5])
+    assert extremes.result()[0] == q.min()
+    assert extremes.result()[2] == q.max()
+    assert extremes.result()[3] == params[np.argmax(q)]
+    assert hist.result()[0].sum() == len(q)
+
+def test_chunk_size_zero():
+    """Tests that a non-positive chunk size is rejected"""
+    with pytest.raises(ValueError):
+        list(sweep.iter_chunks(10, 0))
+
+def test_min_max_nan():
+    """Tests that NaN values neither hide the min and max of a block nor go uncounted"""
+    params = np.arange(5, dtype=np.int32).view([("num_fins", np.int32)])
+    extremes = sweep.MinMax()
+    extremes.update(params[:3], np.array([1., np.nan, 5.]))
+    extremes.update(params[3:], np.array([np.nan, np.nan]))
+    
+    assert extremes.result()[0] == 1 and extremes.result()[2] == 5
+    assert extremes.result()[1] == params[0] and extremes.result()[3] == params[2]
+    assert extremes.count == 5
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+from . import HX_analyze as hx
+from . import HX_boundary_cond as bc
+from . import HX_uncertainty as mc
+
+def test_monte_carlo_reproducible():
+    """Tests that seeded results do not depend on the chunk size or the percentile method"""
+    report = mc.monte_carlo("input_uncertainty.yaml", 20000, seed = 1)
+    chunked = mc.monte_carlo("input_uncertainty.yaml", 20000, seed = 1, chunk_size = 777)
+    histogram = mc.monte_carlo("input_uncertainty.yaml", 20000, seed = 1, max_bytes = 10**5)
+    q = report["outputs"]["q"]
+    
+    assert report["invalid"] == 0
+    assert chunked["outputs"]["q"]["percentiles"] == q["percentiles"]
+    assert chunked["outputs"]["q"]["mean"] == pytest.approx(q["mean"], rel = 1e-12)
+    for p in mc.PERCENTILES:
+        assert histogram["outputs"]["q"]["percentiles"][p] == pytest.approx(q["percentiles"][p], rel = 1e-3)
+    assert max(q["sensitivity"], key = q["sensitivity"].get) == "h_cold"
+    assert sum(q["sensitivity"].values()) == pytest.approx(q["r_squared"], abs = 1e-2)
+
+def test_monte_carlo_ntu():
+    """Tests the ntu model outputs against a direct evaluation at the mean inputs"""
+    values = bc.read_bc("input_uncertainty.yaml")
+    del values["uncertainty"]
+    inputs = bc.HXInputs(values)
+    report = mc.monte_carlo(inputs, 1000, model = 'ntu', seed = 3)
+    params = hx.fin_ua_cached(inputs)[0][-1]
+    direct = mc.evaluate(mc.nominal_values(inputs, params, 'ntu'), model = 'ntu')
+    
+    assert set(report["outputs"]) == {"q", "temp_hot_out", "temp_cold_out"}
+    for output, value in direct.items():
+        assert report["outputs"][output]["mean"] == pytest.approx(float(value))
+        assert report["outputs"][output]["std"] == pytest.approx(0, abs = 1e-6)
+
+def test_monte_carlo_errors():
+    """Tests that invalid distributions and models are reported"""
+    values = bc.read_bc("input_uncertainty.yaml")
+    with pytest.raises(ValueError):
+        mc.monte_carlo(dict(values, uncertainty = {"h_cold": {"distribution": "beta"}}), 10)
+    with pytest.raises(ValueError):
+        mc.monte_carlo(dict(values, uncertainty = {"h_cold": {"distribution": "uniform", "low": 1}}), 10)
+    with pytest.raises(ValueError):
+        mc.monte_carlo("input.yaml", 10, model = 'ntu')
+    
+def test_lmtd_array():
+    """Tests the array LMTD against the scalar functions"""
+    lmtd, invalid = hx.log_mean_temp_diff_array([300, 300, 100], [150, 150, 150], 20, 120, 'counter')
+    
+    assert lmtd[0] == pytest.approx(hx.log_mean_temp_diff_counter(300,150,20,120))
+    assert lmtd[1] == lmtd[0]
+    assert list(invalid) == [False, False, True]
+    assert hx.log_mean_temp_diff_array(300,150,20,120,'parallel')[0] == pytest.approx(hx.log_mean_temp_diff_parallel(300,150,20,120))